@@ -8,11 +8,11 @@ import random
 import secrets
 import typing  # this can go away when Python 3.8 support is dropped
 from argparse import Namespace
-from collections import Counter, deque
+from collections import deque
 from collections.abc import Collection, MutableSequence
 from enum import IntEnum, IntFlag
-from typing import (AbstractSet, Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Mapping, NamedTuple,
-                    Optional, Protocol, Set, Tuple, Union, Type)
+from typing import (AbstractSet, Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Mapping, MutableMapping,
+                    NamedTuple, Optional, Protocol, Set, Tuple, Union, Type)
 
 from typing_extensions import NotRequired, TypedDict
 
@@ -85,6 +85,7 @@ class MultiWorld():
     item_links: Dict[int, Options.ItemLinks]
 
     game: Dict[int, str]
+    item_name_indexes: Dict[str, ItemNameIndex]
 
     random: random.Random
     per_slot_randoms: Utils.DeprecateDict[int, random.Random]
@@ -161,6 +162,7 @@ class MultiWorld():
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
+        self.item_name_indexes = collections.defaultdict(ItemNameIndex)
 
         for player in range(1, players + 1):
             def set_player_attr(attr: str, val) -> None:
@@ -428,12 +430,15 @@ class MultiWorld():
     def get_location(self, location_name: str, player: int) -> Location:
         return self.regions.location_cache[player][location_name]
 
-    def get_all_state(self, use_cache: bool) -> CollectionState:
+    def get_all_state(self, use_cache: bool, track_paths: bool = False) -> CollectionState:
+        """Returns a state with all items collected.
+        The cache only holds a state without paths, so asking for paths always builds a new one."""
+        use_cache = use_cache and not track_paths
         cached = getattr(self, "_all_state", None)
         if use_cache and cached:
             return cached.copy()
 
-        ret = CollectionState(self)
+        ret = CollectionState(self, track_paths)
 
         for item in self.itempool:
             self.worlds[item.player].collect(ret, item)
@@ -667,25 +672,122 @@ class MultiWorld():
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class ItemNameIndex:
+    """Interns item names into dense integer indexes. One instance is shared by all players of a game."""
+    __slots__ = ("indexes", "names")
+
+    indexes: Dict[str, int]
+    names: List[str]
+
+    def __init__(self) -> None:
+        self.indexes = {}
+        self.names = []
+
+    def intern(self, name: str) -> int:
+        """Returns the index of name, assigning the next free index on first use."""
+        index = self.indexes.get(name)
+        if index is None:
+            index = self.indexes[name] = len(self.names)
+            self.names.append(name)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class ItemCounts(MutableMapping[str, int]):
+    """Item counts of a single player, stored as a vector indexed through an :class:`ItemNameIndex`.
+    Copying only has to clone the vector. Behaves like a ``Counter`` for code indexing by item name,
+    names with a count of 0 are treated as missing.
+    The vector is a list rather than an array, as some worlds store non-integer amounts."""
+    __slots__ = ("index", "counts")
+
+    index: ItemNameIndex
+    counts: List[int]
+
+    def __init__(self, index: ItemNameIndex, counts: Optional[List[int]] = None) -> None:
+        self.index = index
+        self.counts = [] if counts is None else counts
+
+    def __getitem__(self, name: str) -> int:
+        counts = self.counts
+        index = self.index.indexes.get(name, len(counts))
+        return counts[index] if index < len(counts) else 0
+
+    def __setitem__(self, name: str, value: int) -> None:
+        index = self.index.intern(name)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend(itertools.repeat(0, len(self.index) - len(counts)))
+        counts[index] = value
+
+    def __delitem__(self, name: str) -> None:
+        # like Counter, deleting a missing name is not an error
+        counts = self.counts
+        index = self.index.indexes.get(name, len(counts))
+        if index < len(counts):
+            counts[index] = 0
+
+    def __contains__(self, name: object) -> bool:
+        counts = self.counts
+        index = self.index.indexes.get(name, len(counts))  # type: ignore[call-overload]
+        return index < len(counts) and counts[index] != 0
+
+    def __iter__(self) -> Iterator[str]:
+        names = self.index.names
+        return (names[index] for index, count in enumerate(self.counts) if count)
+
+    def __len__(self) -> int:
+        return len(self.counts) - self.counts.count(0)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self)})"
+
+    def copy(self) -> ItemCounts:
+        return ItemCounts(self.index, self.counts[:])
+
+    def clear(self) -> None:
+        self.counts = []
+
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def update(self, other: Union[Mapping[str, int], Iterable[str], None] = None, /, **kwargs: int) -> None:
+        """Adds counts instead of replacing them, like ``Counter.update``."""
+        if other is not None:
+            if isinstance(other, Mapping):
+                for name, count in other.items():
+                    self[name] += count
+            else:
+                for name in other:
+                    self[name] += 1
+        for name, count in kwargs.items():
+            self[name] += count
+
+
 class CollectionState():
-    prog_items: Dict[int, Counter[str]]
+    prog_items: Dict[int, ItemCounts]
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
     blocked_connections: Dict[int, Set[Entrance]]
     advancements: Set[Location]
     path: Dict[Union[Region, Entrance], PathValue]
+    """Only filled if track_paths is set, which the spoiler's paths need but fill and sweeps do not."""
+    track_paths: bool
     locations_checked: Set[Location]
     stale: Dict[int, bool]
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
-    def __init__(self, parent: MultiWorld):
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+    def __init__(self, parent: MultiWorld, track_paths: bool = False):
+        self.prog_items = {player: ItemCounts(parent.item_name_indexes[parent.game[player]])
+                           for player in parent.get_all_ids()}
         self.multiworld = parent
         self.reachable_regions = {player: set() for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
         self.advancements = set()
         self.path = {}
+        self.track_paths = track_paths
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
         for function in self.additional_init_functions:
@@ -715,6 +817,7 @@ class CollectionState():
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        path = self.path if self.track_paths else None
         # run BFS on all connections, and keep track of those blocked by missing items
         while queue:
             connection = queue.popleft()
@@ -727,7 +830,8 @@ class CollectionState():
                 blocked_connections.remove(connection)
                 blocked_connections.update(new_region.exits)
                 queue.extend(new_region.exits)
-                self.path[new_region] = (new_region.name, self.path.get(connection, None))
+                if path is not None:
+                    path[new_region] = (new_region.name, path.get(connection, None))
 
                 # Retry connections if the new region can unblock them
                 for new_entrance in self.multiworld.indirect_connections.get(new_region, set()):
@@ -737,6 +841,7 @@ class CollectionState():
     def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        path = self.path if self.track_paths else None
         new_connection: bool = True
         # run BFS on all connections, and keep track of those blocked by missing items
         while new_connection:
@@ -752,20 +857,23 @@ class CollectionState():
                     blocked_connections.remove(connection)
                     blocked_connections.update(new_region.exits)
                     queue.extend(new_region.exits)
-                    self.path[new_region] = (new_region.name, self.path.get(connection, None))
+                    if path is not None:
+                        path[new_region] = (new_region.name, path.get(connection, None))
                     new_connection = True
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
             queue.extend(blocked_connections)
 
     def copy(self) -> CollectionState:
         ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
+        ret.prog_items = {player: counts.copy() for player, counts in self.prog_items.items()}
         ret.reachable_regions = {player: region_set.copy() for player, region_set in
                                  self.reachable_regions.items()}
         ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
                                    self.blocked_connections.items()}
         ret.advancements = self.advancements.copy()
-        ret.path = self.path.copy()
+        if self.track_paths:
+            ret.track_paths = True
+            ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
         for function in self.additional_copy_functions:
             ret = function(self, ret)
@@ -817,34 +925,64 @@ class CollectionState():
                 self.collect(advancement.item, True, advancement)
 
     # item name related
+    # these look up the interned index of each name directly, ItemCounts.__getitem__ would add a call per item
     def has(self, item: str, player: int, count: int = 1) -> bool:
-        return self.prog_items[player][item] >= count
+        player_counts = self.prog_items[player]
+        counts = player_counts.counts
+        index = player_counts.index.indexes.get(item, len(counts))
+        return (counts[index] if index < len(counts) else 0) >= count
 
     def has_all(self, items: Iterable[str], player: int) -> bool:
         """Returns True if each item name of items is in state at least once."""
-        return all(self.prog_items[player][item] for item in items)
+        player_counts = self.prog_items[player]
+        counts = player_counts.counts
+        size = len(counts)
+        indexes = player_counts.index.indexes
+        for item in items:
+            index = indexes.get(item, size)
+            if index >= size or not counts[index]:
+                return False
+        return True
 
     def has_any(self, items: Iterable[str], player: int) -> bool:
         """Returns True if at least one item name of items is in state at least once."""
-        return any(self.prog_items[player][item] for item in items)
+        player_counts = self.prog_items[player]
+        counts = player_counts.counts
+        size = len(counts)
+        indexes = player_counts.index.indexes
+        for item in items:
+            index = indexes.get(item, size)
+            if index < size and counts[index]:
+                return True
+        return False
 
     def has_all_counts(self, item_counts: Mapping[str, int], player: int) -> bool:
         """Returns True if each item name is in the state at least as many times as specified."""
-        return all(self.prog_items[player][item] >= count for item, count in item_counts.items())
+        player_counts = self.prog_items[player]
+        return all(player_counts[item] >= count for item, count in item_counts.items())
 
     def has_any_count(self, item_counts: Mapping[str, int], player: int) -> bool:
         """Returns True if at least one item name is in the state at least as many times as specified."""
-        return any(self.prog_items[player][item] >= count for item, count in item_counts.items())
+        player_counts = self.prog_items[player]
+        return any(player_counts[item] >= count for item, count in item_counts.items())
 
     def count(self, item: str, player: int) -> int:
-        return self.prog_items[player][item]
+        player_counts = self.prog_items[player]
+        counts = player_counts.counts
+        index = player_counts.index.indexes.get(item, len(counts))
+        return counts[index] if index < len(counts) else 0
 
     def has_from_list(self, items: Iterable[str], player: int, count: int) -> bool:
         """Returns True if the state contains at least `count` items matching any of the item names from a list."""
         found: int = 0
-        player_prog_items = self.prog_items[player]
+        player_counts = self.prog_items[player]
+        counts = player_counts.counts
+        size = len(counts)
+        indexes = player_counts.index.indexes
         for item_name in items:
-            found += player_prog_items[item_name]
+            index = indexes.get(item_name, size)
+            if index < size:
+                found += counts[index]
             if found >= count:
                 return True
         return False
@@ -853,60 +991,48 @@ class CollectionState():
         """Returns True if the state contains at least `count` items matching any of the item names from a list.
         Ignores duplicates of the same item."""
         found: int = 0
-        player_prog_items = self.prog_items[player]
+        player_counts = self.prog_items[player]
+        counts = player_counts.counts
+        size = len(counts)
+        indexes = player_counts.index.indexes
         for item_name in items:
-            found += player_prog_items[item_name] > 0
+            index = indexes.get(item_name, size)
+            if index < size:
+                found += counts[index] > 0
             if found >= count:
                 return True
         return False
 
     def count_from_list(self, items: Iterable[str], player: int) -> int:
         """Returns the cumulative count of items from a list present in state."""
-        return sum(self.prog_items[player][item_name] for item_name in items)
+        player_counts = self.prog_items[player]
+        return sum(player_counts[item_name] for item_name in items)
 
     def count_from_list_unique(self, items: Iterable[str], player: int) -> int:
         """Returns the cumulative count of items from a list present in state. Ignores duplicates of the same item."""
-        return sum(self.prog_items[player][item_name] > 0 for item_name in items)
+        player_counts = self.prog_items[player]
+        return sum(player_counts[item_name] > 0 for item_name in items)
 
     # item name group related
     def has_group(self, item_name_group: str, player: int, count: int = 1) -> bool:
         """Returns True if the state contains at least `count` items present in a specified item group."""
-        found: int = 0
-        player_prog_items = self.prog_items[player]
-        for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
-            found += player_prog_items[item_name]
-            if found >= count:
-                return True
-        return False
+        return self.has_from_list(self.multiworld.worlds[player].item_name_groups[item_name_group], player, count)
 
     def has_group_unique(self, item_name_group: str, player: int, count: int = 1) -> bool:
         """Returns True if the state contains at least `count` items present in a specified item group.
         Ignores duplicates of the same item.
         """
-        found: int = 0
-        player_prog_items = self.prog_items[player]
-        for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
-            found += player_prog_items[item_name] > 0
-            if found >= count:
-                return True
-        return False
+        return self.has_from_list_unique(self.multiworld.worlds[player].item_name_groups[item_name_group],
+                                         player, count)
 
     def count_group(self, item_name_group: str, player: int) -> int:
         """Returns the cumulative count of items from an item group present in state."""
-        player_prog_items = self.prog_items[player]
-        return sum(
-            player_prog_items[item_name]
-            for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
-        )
+        return self.count_from_list(self.multiworld.worlds[player].item_name_groups[item_name_group], player)
 
     def count_group_unique(self, item_name_group: str, player: int) -> int:
         """Returns the cumulative count of items from an item group present in state.
         Ignores duplicates of the same item."""
-        player_prog_items = self.prog_items[player]
-        return sum(
-            player_prog_items[item_name] > 0
-            for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
-        )
+        return self.count_from_list_unique(self.multiworld.worlds[player].item_name_groups[item_name_group], player)
 
     # Item related
     def collect(self, item: Item, prevent_sweep: bool = False, location: Optional[Location] = None) -> bool:
@@ -950,7 +1076,7 @@ class Entrance:
     def can_reach(self, state: CollectionState) -> bool:
         assert self.parent_region, f"called can_reach on an Entrance \"{self}\" with no parent_region"
         if self.parent_region.can_reach(state) and self.access_rule(state):
-            if not self.hide_path and not self in state.path:
+            if state.track_paths and not self.hide_path and self not in state.path:
                 state.path[self] = (self.name, state.path.get(self.parent_region, (self.parent_region.name, None)))
             return True
 
@@ -1398,7 +1524,7 @@ class Spoiler:
         # to build up the correct spheres
 
         required_locations = {item for sphere in collection_spheres for item in sphere}
-        state = CollectionState(multiworld)
+        state = CollectionState(multiworld, track_paths=create_paths)
         collection_spheres = []
         while required_locations:
             sphere = set(filter(state.can_reach, required_locations))
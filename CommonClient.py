@@ -250,8 +250,11 @@ class CommonContext:
 
         def update_game(self, game: str, name_to_id_lookup_table: typing.Dict[str, int]) -> None:
             """Overrides existing lookup tables for a particular game."""
-            id_to_name_lookup_table = Utils.KeyedDefaultDict(self._unknown_item)
-            id_to_name_lookup_table.update({code: name for name, code in name_to_id_lookup_table.items()})
+            self.update_game_id_to_name(game, {code: name for name, code in name_to_id_lookup_table.items()})
+
+        def update_game_id_to_name(self, game: str, id_to_name: typing.Mapping[int, str]) -> None:
+            """Overrides existing lookup tables for a particular game with an already inverted lookup table."""
+            id_to_name_lookup_table = Utils.KeyedDefaultDict(self._unknown_item, id_to_name)
             self._game_store[game] = collections.ChainMap(self._archipelago_lookup, id_to_name_lookup_table)
             self._flat_store.update(id_to_name_lookup_table)  # Only needed for legacy lookup method.
             if game == "Archipelago":
@@ -562,6 +565,7 @@ class CommonContext:
         relevant_games.add("Archipelago")
 
         needed_updates: typing.Set[str] = set()
+        data_package_cache = Utils.DataPackageCache()
         for game in relevant_games:
             if game not in remote_date_package_versions and game not in remote_data_package_checksums:
                 continue
@@ -583,6 +587,8 @@ class CommonContext:
                 if ((remote_checksum or remote_version <= local_version and remote_version != 0)
                         and remote_checksum == local_checksum):
                     self.update_game(network_data_package["games"][game], game)
+                elif remote_checksum and remote_checksum in data_package_cache:
+                    self.update_game_from_cache(data_package_cache[remote_checksum], game)
                 else:
                     cached_game = Utils.load_data_package_for_checksum(game, remote_checksum)
                     cache_version: int = cached_game.get("version", 0)
@@ -602,6 +608,13 @@ class CommonContext:
         self.versions[game] = game_package.get("version", 0)
         self.checksums[game] = game_package.get("checksum")
 
+    def update_game_from_cache(self, cached_game: dict, game: str):
+        """Like update_game, but for an entry of Utils.DataPackageCache with prebuilt id to name lookup tables."""
+        self.item_names.update_game_id_to_name(game, cached_game["item_id_to_name"])
+        self.location_names.update_game_id_to_name(game, cached_game["location_id_to_name"])
+        self.versions[game] = cached_game["version"]
+        self.checksums[game] = cached_game["checksum"]
+
     def update_data_package(self, data_package: dict):
         for game, game_data in data_package["games"].items():
             self.update_game(game_data, game)
@@ -612,8 +625,10 @@ class CommonContext:
         current_cache.update(data_package["games"])
         Utils.persistent_store("datapackage", "games", current_cache)
         logger.info(f"Got new ID/Name DataPackage for {', '.join(data_package['games'])}")
+        data_package_cache = Utils.DataPackageCache()
         for game, game_data in data_package["games"].items():
-            Utils.store_data_package_for_checksum(game, game_data)
+            data_package_cache.add(game, game_data)
+        data_package_cache.store()
 
     # data storage
 
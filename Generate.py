@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import copy
 import logging
 import os
@@ -10,7 +11,7 @@ import sys
 import urllib.parse
 import urllib.request
 from collections import Counter
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from itertools import chain
 
 import ModuleUpdate
@@ -52,6 +53,8 @@ def mystery_argparse():
     parser.add_argument("--skip_output", action="store_true",
                         help="Skips generation assertion and output stages and skips multidata and spoiler output. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--roll_workers", type=int, default=defaults.roll_workers,
+                        help="Processes to read and roll player files with, 0 or 1 does it in this process.")
     args = parser.parse_args()
     if not os.path.isabs(args.weights_file_path):
         args.weights_file_path = os.path.join(args.player_files_path, args.weights_file_path)
@@ -106,17 +109,25 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
             raise Exception("Cannot mix --sameoptions with --meta")
     else:
         meta_weights = None
+    with RollPool(args.roll_workers) as roll_pool:
+        return roll_players(args, seed, seed_name, weights_cache, meta_weights, roll_pool)
+
+
+def roll_players(args: argparse.Namespace, seed: int, seed_name: str, weights_cache: Dict[str, Tuple[Any, ...]],
+                 meta_weights: Optional[Dict[str, Any]], roll_pool: RollPool) -> Tuple[argparse.Namespace, int]:
     player_id = 1
     player_files = {}
+    weights_results: Dict[str, Callable[[], Tuple[Any, ...]]] = {}
     for file in os.scandir(args.player_files_path):
         fname = file.name
         if file.is_file() and not fname.startswith(".") and \
                 os.path.join(args.player_files_path, fname) not in {args.meta_file_path, args.weights_file_path}:
-            path = os.path.join(args.player_files_path, fname)
-            try:
-                weights_cache[fname] = read_weights_yamls(path)
-            except Exception as e:
-                raise ValueError(f"File {fname} is invalid. Please fix your yaml.") from e
+            weights_results[fname] = roll_pool.submit(read_weights_yamls, os.path.join(args.player_files_path, fname))
+    for fname, weights_result in weights_results.items():
+        try:
+            weights_cache[fname] = weights_result()
+        except Exception as e:
+            raise ValueError(f"File {fname} is invalid. Please fix your yaml.") from e
 
     # sort dict for consistent results across platforms:
     weights_cache = {key: value for key, value in sorted(weights_cache.items(), key=lambda k: k[0].casefold())}
@@ -158,9 +169,12 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     erargs.name = {}
     erargs.csv_output = args.csv_output
 
-    settings_cache: Dict[str, Tuple[argparse.Namespace, ...]] = \
-        {fname: (tuple(roll_settings(yaml, args.plando) for yaml in yamls) if args.sameoptions else None)
-         for fname, yamls in weights_cache.items()}
+    # every file or player is rolled with its own random state, so that they can be rolled in any order or process
+    settings_results: Dict[str, Callable[[], Tuple[argparse.Namespace, ...]]] = \
+        {fname: roll_pool.submit(roll_player_settings, yamls, args.plando, random.getrandbits(64))
+         for fname, yamls in weights_cache.items() if args.sameoptions}
+    settings_cache: Dict[str, Optional[Tuple[argparse.Namespace, ...]]] = \
+        {fname: (settings_results[fname]() if args.sameoptions else None) for fname in weights_cache}
 
     if meta_weights:
         for category_name, category_dict in meta_weights.items():
@@ -185,13 +199,23 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     name_counter = Counter()
     erargs.player_options = {}
 
+    # a file's yamls are rolled together, for the players starting at the player of its first yaml
+    player_settings_results: Dict[int, Callable[[], Tuple[argparse.Namespace, ...]]] = {}
+    player = 1
+    while player <= args.multi:
+        path = player_path_cache[player]
+        if path and not settings_cache[path]:
+            player_settings_results[player] = roll_pool.submit(roll_player_settings, weights_cache[path],
+                                                               args.plando, random.getrandbits(64))
+        player += len(weights_cache[path]) if path else 1
+
     player = 1
     while player <= args.multi:
         path = player_path_cache[player]
         if path:
             try:
                 settings: Tuple[argparse.Namespace, ...] = settings_cache[path] if settings_cache[path] else \
-                    tuple(roll_settings(yaml, args.plando) for yaml in weights_cache[path])
+                    player_settings_results[player]()
                 for settingsObject in settings:
                     for k, v in vars(settingsObject).items():
                         if v is not None:
@@ -220,6 +244,80 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     return erargs, seed
 
 
+class RollPool:
+    """
+    Reads and rolls player files on worker processes, or in this process if there are no more than 1 workers.
+    Results are only taken in the order they are needed, which is also when log messages of the workers are logged.
+    """
+    executor: Optional[concurrent.futures.ProcessPoolExecutor]
+    futures: List[concurrent.futures.Future]
+
+    def __init__(self, workers: int) -> None:
+        self.executor = None
+        self.futures = []
+        if workers > 1:
+            import worlds  # noqa: F401  # loaded before starting workers, so forked workers don't each load them
+            self.executor = concurrent.futures.ProcessPoolExecutor(workers)
+
+    def __enter__(self) -> RollPool:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        if self.executor:
+            # shutdown(cancel_futures=True) requires Python 3.9
+            for future in self.futures:
+                future.cancel()
+            self.executor.shutdown()
+
+    def submit(self, function: Callable[..., Any], *args: Any) -> Callable[[], Any]:
+        """Starts function(*args) and returns a callable that waits for its result."""
+        if not self.executor:
+            return lambda: function(*args)
+        future = self.executor.submit(run_logged, logging.getLogger().level, function, *args)
+        self.futures.append(future)
+
+        def result() -> Any:
+            value, records = future.result()
+            for record in records:
+                logging.getLogger(record.name).handle(record)
+            return value
+
+        return result
+
+
+class LogCollector(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # arguments and exception info may not be picklable, so only their text is sent back
+        record.msg = self.format(record)
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        self.records.append(record)
+
+
+def run_logged(log_level: int, function: Callable[..., Any], *args: Any) -> Tuple[Any, List[logging.LogRecord]]:
+    """Runs function(*args) on a worker process of RollPool, collecting what it logs for the main process."""
+    root_logger = logging.getLogger()
+    collector = LogCollector()
+    handlers, root_logger.handlers = root_logger.handlers, [collector]
+    root_logger.setLevel(log_level)
+    try:
+        return function(*args), collector.records
+    finally:
+        root_logger.handlers = handlers
+
+
+def roll_player_settings(yamls: Tuple[Any, ...], plando_options: PlandoOptions,
+                         seed: int) -> Tuple[argparse.Namespace, ...]:
+    """Rolls a file's yamls with their own random state, so the result does not depend on where they are rolled."""
+    random.seed(seed)
+    return tuple(roll_settings(yaml, plando_options) for yaml in yamls)
+
+
 def read_weights_yamls(path) -> Tuple[Any, ...]:
     try:
         if urllib.parse.urlparse(path).scheme in ('https', 'file'):
@@ -2,11 +2,9 @@ import collections
 import concurrent.futures
 import logging
 import os
-import pickle
 import tempfile
 import time
 import zipfile
-import zlib
 from typing import Dict, List, Optional, Set, Tuple, Union
 
 import worlds
@@ -14,7 +12,7 @@ from BaseClasses import CollectionState, Item, Location, LocationProgressType, M
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, distribute_planned, \
     flood_items
 from Options import StartInventoryPool
-from Utils import __version__, output_path, version_tuple, get_settings
+from Utils import __version__, dump_multidata, output_path, version_tuple, get_settings
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
@@ -22,7 +20,11 @@ from worlds.generic.Rules import exclusion_rules, locality_rules
 __all__ = ["main"]
 
 
-def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = None):
+def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = None, embed_data_package: bool = True):
+    """
+    :param embed_data_package: if False, the multidata only references each game's data package by its checksum,
+    for hosts that store the data packages themselves, such as WebHost.
+    """
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
     assert isinstance(baked_server_options, dict)
@@ -308,6 +310,9 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                     game_world.game: worlds.network_data_package["games"][game_world.game]
                     for game_world in multiworld.worlds.values()
                 }
+                if not embed_data_package:
+                    data_package = {game: {"version": game_data.get("version", 0), "checksum": game_data["checksum"]}
+                                    for game, game_data in data_package.items()}
 
                 checks_in_area: Dict[int, Dict[str, Union[int, List[int]]]] = {}
 
@@ -342,11 +347,8 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 }
                 AutoWorld.call_all(multiworld, "modify_multidata", multidata)
 
-                multidata = zlib.compress(pickle.dumps(multidata), 9)
-
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(multidata)
+                    f.write(dump_multidata(multidata))
 
             output_file_futures.append(pool.submit(write_multidata))
             if not check_accessibility_task.result():
@@ -373,7 +375,9 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
                              compresslevel=9) as zf:
             for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
+                # multidata is already compressed, deflating it again only costs time
+                compress_type = zipfile.ZIP_STORED if file.name.endswith(".archipelago") else None
+                zf.write(file.path, arcname=file.name, compress_type=compress_type)
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
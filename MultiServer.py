@@ -156,6 +156,188 @@ class Client(Endpoint):
         return "Deallocated"
 
 
+MetricSample = typing.Tuple[str, str, str, typing.Dict[str, str], float]
+""" (family, type, sample name suffix, labels, value) """
+
+
+class EventLoopLag:
+    """How much later than requested the event loop gets to run a task, a sign of a saturated server.
+    Measured once per event loop, for all contexts running on it."""
+
+    def __init__(self):
+        self.lag = 0.0
+        self.lag_max = 0.0
+
+    async def measure(self, interval: float = 1.0):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            self.lag = max(0.0, loop.time() - start - interval)
+            self.lag_max = max(self.lag_max, self.lag)
+
+
+no_measurement = contextlib.nullcontext()
+
+
+class ServerMetrics:
+    """Runtime metrics of a Context, shown by /metrics and served in Prometheus' text format with --metrics_port.
+    Only collected if enabled, so a server that doesn't serve them does not pay for them."""
+    enabled: bool
+    messages_in: typing.Counter[str]
+    messages_out: typing.Counter[str]
+    timings: typing.Dict[str, typing.List[float]]
+    """ operation -> [count, total seconds, max seconds] """
+    loop_lag: typing.Optional[EventLoopLag] = None
+    """ lag of the event loop the Context runs on, if it is measured """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time.monotonic()
+        self.messages_in = collections.Counter()
+        self.messages_out = collections.Counter()
+        self.bytes_out = 0
+        self.timings = {}
+        self.save_size = 0
+
+    def observe(self, operation: str, seconds: float):
+        timing = self.timings.get(operation)
+        if timing is None:
+            self.timings[operation] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            if seconds > timing[2]:
+                timing[2] = seconds
+
+    def measure(self, operation: str) -> typing.ContextManager[None]:
+        """Times the with block as operation, if enabled"""
+        if not self.enabled:
+            return no_measurement
+        return self._measure(operation)
+
+    @contextlib.contextmanager
+    def _measure(self, operation: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(operation, time.perf_counter() - start)
+
+    def count_out(self, msgs: typing.Iterable[dict], recipients: int = 1):
+        for msg in msgs:
+            self.messages_out[msg.get("cmd", "")] += recipients
+
+    @staticmethod
+    def get_rss() -> typing.Optional[int]:
+        try:
+            import psutil
+        except ImportError:
+            try:
+                with open("/proc/self/statm") as statm:
+                    import os
+                    return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            except (OSError, ValueError, AttributeError):
+                return None
+        return psutil.Process().memory_info().rss
+
+    def get_samples(self, ctx: Context) -> typing.List[MetricSample]:
+        authenticated = sum(1 for endpoint in ctx.endpoints if endpoint.auth)
+        slots = sum(1 for clients in ctx.clients.values() for slot_clients in clients.values() if slot_clients)
+        samples: typing.List[MetricSample] = [
+            ("archipelago_uptime_seconds", "gauge", "", {}, time.monotonic() - self.started),
+            ("archipelago_clients", "gauge", "", {"state": "connected"}, len(ctx.endpoints)),
+            ("archipelago_clients", "gauge", "", {"state": "authenticated"}, authenticated),
+            ("archipelago_slots_connected", "gauge", "", {}, slots),
+            ("archipelago_sent_bytes_total", "counter", "", {}, self.bytes_out),
+            ("archipelago_save_bytes", "gauge", "", {}, self.save_size),
+        ]
+        samples += [("archipelago_messages_received_total", "counter", "", {"cmd": cmd}, count)
+                    for cmd, count in self.messages_in.items()]
+        samples += [("archipelago_messages_sent_total", "counter", "", {"cmd": cmd}, count)
+                    for cmd, count in self.messages_out.items()]
+        for operation, (count, total, maximum) in self.timings.items():
+            samples += [("archipelago_duration_seconds", "summary", "_count", {"operation": operation}, count),
+                        ("archipelago_duration_seconds", "summary", "_sum", {"operation": operation}, total),
+                        ("archipelago_duration_max_seconds", "gauge", "", {"operation": operation}, maximum)]
+        return samples
+
+    def get_summary(self, ctx: Context) -> typing.List[str]:
+        """Human-readable metrics, for /metrics"""
+        def top(counter: typing.Counter[str]) -> str:
+            return ", ".join(f"{cmd}: {count}" for cmd, count in counter.most_common(8)) or "none"
+
+        authenticated = sum(1 for endpoint in ctx.endpoints if endpoint.auth)
+        rss = self.get_rss()
+        lines = [
+            f"Uptime: {datetime.timedelta(seconds=int(time.monotonic() - self.started))}",
+            f"Clients: {len(ctx.endpoints)} connected, {authenticated} authenticated",
+            f"Messages received: {top(self.messages_in)}",
+            f"Messages sent: {top(self.messages_out)}",
+            f"Sent: {Utils.format_SI_prefix(self.bytes_out, 1024)}B, last save: "
+            f"{Utils.format_SI_prefix(self.save_size, 1024)}B",
+        ]
+        if self.loop_lag:
+            lines.append(f"Event loop lag: {self.loop_lag.lag * 1000:.1f} ms, "
+                         f"max {self.loop_lag.lag_max * 1000:.1f} ms")
+        lines += [f"{operation}: {count} times, avg {total / count * 1000:.2f} ms, max {maximum * 1000:.2f} ms"
+                  for operation, (count, total, maximum) in sorted(self.timings.items())]
+        if rss is not None:
+            lines.append(f"Memory: {Utils.format_SI_prefix(rss, 1024)}iB")
+        return lines
+
+
+def format_metrics(contexts: typing.Iterable[typing.Tuple[Context, typing.Dict[str, str]]],
+                   loop_lag: typing.Optional[EventLoopLag] = None) -> str:
+    """Metrics of the contexts, each with additional labels, and of the process they run in,
+    in Prometheus' text exposition format"""
+    families: typing.Dict[str, typing.Tuple[str, typing.List[typing.Tuple[str, typing.Dict[str, str], float]]]] = {}
+    for ctx, context_labels in contexts:
+        for family, kind, suffix, labels, value in ctx.metrics.get_samples(ctx):
+            families.setdefault(family, (kind, []))[1].append((suffix, {**context_labels, **labels}, value))
+    rss = ServerMetrics.get_rss()
+    if rss is not None:
+        families["process_resident_memory_bytes"] = ("gauge", [("", {}, rss)])
+    if loop_lag:
+        families["archipelago_event_loop_lag_seconds"] = ("gauge", [("", {}, loop_lag.lag)])
+        families["archipelago_event_loop_lag_max_seconds"] = ("gauge", [("", {}, loop_lag.lag_max)])
+
+    def format_labels(labels: typing.Dict[str, str]) -> str:
+        if not labels:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+                   for value in labels.values())
+        return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+    lines = []
+    for family, (kind, samples) in families.items():
+        lines.append(f"# TYPE {family} {kind}")
+        lines += [f"{family}{suffix}{format_labels(labels)} {value}" for suffix, labels, value in samples]
+    return "\n".join(lines) + "\n"
+
+
+async def serve_metrics(host: str, port: int, get_metrics: typing.Callable[[], str]) -> asyncio.AbstractServer:
+    """Minimal HTTP server answering GET /metrics, meant to be scraped locally"""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)).strip():
+                pass  # skip headers
+            if request.split(b" ")[:2] == [b"GET", b"/metrics"]:
+                status, body = "200 OK", get_metrics().encode()
+            else:
+                status, body = "404 Not Found", b""
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
 team_slot = typing.Tuple[int, int]
 
 
@@ -199,7 +381,7 @@ class Context:
     def __init__(self, host: str, port: int, server_password: str, password: str, location_check_points: int,
                  hint_cost: int, item_cheat: bool, release_mode: str = "disabled", collect_mode="disabled",
                  remaining_mode: str = "disabled", auto_shutdown: typing.SupportsFloat = 0, compatibility: int = 2,
-                 log_network: bool = False, logger: logging.Logger = logging.getLogger()):
+                 log_network: bool = False, logger: logging.Logger = logging.getLogger(), metrics: bool = False):
         self.logger = logger
         super(Context, self).__init__()
         self.slot_info = {}
@@ -258,6 +440,7 @@ class Context:
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
         self.read_data = {}
         self.spheres = []
+        self.metrics = ServerMetrics(metrics)
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -321,7 +504,8 @@ class Context:
     async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
         if not endpoint.socket or not endpoint.socket.open:
             return False
-        msg = self.dumper(msgs)
+        with self.metrics.measure("encode"):
+            msg = self.dumper(msgs)
         try:
             await endpoint.socket.send(msg)
         except websockets.ConnectionClosed:
@@ -329,6 +513,9 @@ class Context:
             await self.disconnect(endpoint)
             return False
         else:
+            if self.metrics.enabled:
+                self.metrics.count_out(msgs)
+                self.metrics.bytes_out += len(msg)
             if self.log_network:
                 self.logger.info(f"Outgoing message: {msg}")
             return True
@@ -343,6 +530,8 @@ class Context:
             await self.disconnect(endpoint)
             return False
         else:
+            if self.metrics.enabled:
+                self.metrics.bytes_out += len(msg)
             if self.log_network:
                 self.logger.info(f"Outgoing message: {msg}")
             return True
@@ -353,32 +542,35 @@ class Context:
             if endpoint.socket and endpoint.socket.open:
                 sockets.append(endpoint.socket)
         try:
-            websockets.broadcast(sockets, msg)
+            with self.metrics.measure("broadcast"):
+                websockets.broadcast(sockets, msg)
         except RuntimeError:
             self.logger.exception("Exception during broadcast_send_encoded_msgs")
             return False
         else:
+            if self.metrics.enabled:
+                self.metrics.bytes_out += len(msg) * len(sockets)
             if self.log_network:
                 self.logger.info(f"Outgoing broadcast: {msg}")
             return True
 
     def broadcast_all(self, msgs: typing.List[dict]):
-        msgs = self.dumper(msgs)
-        endpoints = (endpoint for endpoint in self.endpoints if endpoint.auth)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.broadcast([endpoint for endpoint in self.endpoints if endpoint.auth], msgs)
 
     def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
         self.logger.info("Notice (all): %s" % text)
         self.broadcast_all([{**{"cmd": "PrintJSON", "data": [{ "text": text }]}, **additional_arguments}])
 
     def broadcast_team(self, team: int, msgs: typing.List[dict]):
-        msgs = self.dumper(msgs)
-        endpoints = (endpoint for endpoint in itertools.chain.from_iterable(self.clients[team].values()))
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        self.broadcast(list(itertools.chain.from_iterable(self.clients[team].values())), msgs)
 
     def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
-        msgs = self.dumper(msgs)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+        endpoints = list(endpoints)
+        with self.metrics.measure("encode"):
+            encoded = self.dumper(msgs)
+        if self.metrics.enabled:
+            self.metrics.count_out(msgs, len(endpoints))
+        async_start(self.broadcast_send_encoded_msgs(endpoints, encoded))
 
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
@@ -419,13 +611,16 @@ class Context:
         self.data_filename = multidatapath
 
     @staticmethod
-    def decompress(data: bytes) -> dict:
+    def decompress(data: bytes) -> typing.MutableMapping[str, typing.Any]:
         format_version = data[0]
-        if format_version > 3:
+        if format_version > Utils.multidata_format_version:
             raise Utils.VersionException("Incompatible multidata.")
-        return restricted_loads(zlib.decompress(data[1:]))
+        if format_version < 4:
+            return restricted_loads(zlib.decompress(data[1:]))
+        return Utils.Multidata(data)
 
-    def _load(self, decoded_obj: dict, game_data_packages: typing.Dict[str, typing.Any],
+    def _load(self, decoded_obj: typing.MutableMapping[str, typing.Any],
+              game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
 
         self.read_data = {}
@@ -522,9 +717,12 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            with self.metrics.measure("save"):
+                encoded_save = zlib.compress(pickle.dumps(self.get_save()))
+                with open(self.save_filename, "wb") as f:
+                    f.write(encoded_save)
+            if self.metrics.enabled:
+                self.metrics.save_size = len(encoded_save)
         except Exception as e:
             self.logger.exception(e)
             return False
@@ -657,12 +855,13 @@ class Context:
         return 0
 
     def recheck_hints(self, team: typing.Optional[int] = None, slot: typing.Optional[int] = None):
-        for hint_team, hint_slot in self.hints:
-            if (team is None or team == hint_team) and (slot is None or slot == hint_slot):
-                self.hints[hint_team, hint_slot] = {
-                    hint.re_check(self, hint_team) for hint in
-                    self.hints[hint_team, hint_slot]
-                }
+        with self.metrics.measure("hint_recheck"):
+            for hint_team, hint_slot in self.hints:
+                if (team is None or team == hint_team) and (slot is None or slot == hint_slot):
+                    self.hints[hint_team, hint_slot] = {
+                        hint.re_check(self, hint_team) for hint in
+                        self.hints[hint_team, hint_slot]
+                    }
 
     def get_rechecked_hints(self, team: int, slot: int):
         self.recheck_hints(team, slot)
@@ -787,6 +986,8 @@ def update_aliases(ctx: Context, team: int):
 
     for clients in ctx.clients[team].values():
         for client in clients:
+            if ctx.metrics.enabled:
+                ctx.metrics.messages_out["RoomUpdate"] += 1
             async_start(ctx.send_encoded_msgs(client, cmd))
 
 
@@ -804,6 +1005,8 @@ async def server(websocket, path: str = "/", ctx: Context = None):
             if ctx.log_network:
                 ctx.logger.info(f"Incoming message: {data}")
             for msg in decode(data):
+                if ctx.metrics.enabled:
+                    ctx.metrics.messages_in[msg.get("cmd", "") if isinstance(msg, dict) else ""] += 1
                 await process_client_cmd(ctx, client, msg)
     except Exception as e:
         if not isinstance(e, websockets.WebSocketException):
@@ -1861,6 +2064,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 if client.team == bounceclient.team and (ctx.games[bounceclient.slot] in games or
                                                          set(bounceclient.tags) & tags or
                                                          bounceclient.slot in slots):
+                    if ctx.metrics.enabled:
+                        ctx.metrics.messages_out["Bounced"] += 1
                     await ctx.send_encoded_msgs(bounceclient, msg)
 
         elif cmd == "Get":
@@ -1958,6 +2163,15 @@ class ServerCommandProcessor(CommonCommandProcessor):
             self.output(get_status_string(self.ctx, team, tag))
         return True
 
+    def _cmd_metrics(self) -> bool:
+        """Get runtime metrics of the server, such as message counts, timings and event loop lag"""
+        if not self.ctx.metrics.enabled:
+            self.output("Metrics are not collected, start the server with a metrics_port to collect them.")
+            return False
+        for line in self.ctx.metrics.get_summary(self.ctx):
+            self.output(line)
+        return True
+
     def _cmd_exit(self) -> bool:
         """Shutdown the server"""
         self.ctx.server.ws_server.close()
@@ -2315,6 +2529,9 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--metrics_port', default=defaults["metrics_port"], type=int,
+                        help="serve runtime metrics in Prometheus' text format at http://127.0.0.1:<port>/metrics, "
+                             "0 to disable")
     args = parser.parse_args()
     return args
 
@@ -2359,7 +2576,7 @@ async def main(args: argparse.Namespace):
     ctx = Context(args.host, args.port, args.server_password, args.password, args.location_check_points,
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
                   args.remaining_mode,
-                  args.auto_shutdown, args.compatibility, args.log_network)
+                  args.auto_shutdown, args.compatibility, args.log_network, metrics=bool(args.metrics_port))
     data_filename = args.multidata
 
     if not data_filename:
@@ -2399,11 +2616,23 @@ async def main(args: argparse.Namespace):
                                                  'No password' if not ctx.password else 'Password: %s' % ctx.password))
 
     await ctx.server
+    loop_lag_task: typing.Optional[asyncio.Task] = None
+    metrics_server: typing.Optional[asyncio.AbstractServer] = None
+    if args.metrics_port:
+        ctx.metrics.loop_lag = EventLoopLag()
+        loop_lag_task = asyncio.create_task(ctx.metrics.loop_lag.measure())
+        metrics_server = await serve_metrics("127.0.0.1", args.metrics_port,
+                                             lambda: format_metrics([(ctx, {})], ctx.metrics.loop_lag))
+        logging.info(f"Serving metrics at http://127.0.0.1:{args.metrics_port}/metrics")
     console_task = asyncio.create_task(console(ctx))
     if ctx.auto_shutdown:
         ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, [console_task]))
     await ctx.exit_event.wait()
     console_task.cancel()
+    if loop_lag_task:
+        loop_lag_task.cancel()
+    if metrics_server:
+        metrics_server.close()
     if ctx.shutdown_task:
         await ctx.shutdown_task
 
@@ -13,7 +13,6 @@ from worlds.oot.Cosmetics import patch_cosmetics
 from worlds.oot.Options import cosmetic_options, sfx_options
 from worlds.oot.Rom import Rom, compress_rom_file
 from worlds.oot.N64Patch import apply_patch_file
-from worlds.oot.Utils import data_path
 from Utils import local_path
 
 logger = logging.getLogger('OoTAdjuster')
@@ -239,7 +238,6 @@ def adjust(args):
         decomp_path = path_pieces[0] + '-adjusted-decomp.n64'
         comp_path = path_pieces[0] + '-adjusted.n64'
         rom.write_to_file(decomp_path)
-        os.chdir(data_path("Compress"))
         compress_rom_file(decomp_path, comp_path)
         os.remove(decomp_path)
     finally:
@@ -9,6 +9,7 @@ import subprocess
 import base64
 import logging
 import asyncio
+import bisect
 import enum
 import typing
 
@@ -511,7 +512,25 @@ async def snes_recv_loop(ctx: SNIContext) -> None:
             ctx.snes_autoreconnect_task = asyncio.create_task(snes_autoreconnect(ctx), name="snes auto-reconnect")
 
 
-async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional[bytes]:
+snes_read_batch_size = 8
+"""maximum (address, size) pairs sent in a single GetAddress request"""
+
+
+def coalesce_reads(reads: typing.Iterable[typing.Tuple[int, int]]) -> typing.List[typing.Tuple[int, int]]:
+    """Merges overlapping and adjacent (address, size) reads, sorted by address"""
+    merged: typing.List[typing.Tuple[int, int]] = []
+    for address, size in sorted(reads):
+        if merged and address <= merged[-1][0] + merged[-1][1]:
+            start, length = merged[-1]
+            merged[-1] = (start, max(length, address + size - start))
+        else:
+            merged.append((address, size))
+    return merged
+
+
+async def _snes_get(ctx: SNIContext, reads: typing.List[typing.Tuple[int, int]]) -> typing.Optional[bytes]:
+    """Sends GetAddress requests for all reads without waiting for replies in between,
+    then returns the replies' data concatenated in order of the reads."""
     try:
         await ctx.snes_request_lock.acquire()
 
@@ -523,16 +542,19 @@ async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional
         ):
             return None
 
-        GetAddress_Request: SNESRequest = {
-            "Opcode": "GetAddress",
-            "Space": "SNES",
-            "Operands": [hex(address)[2:], hex(size)[2:]]
-        }
         try:
-            await ctx.snes_socket.send(dumps(GetAddress_Request))
+            for batch_start in range(0, len(reads), snes_read_batch_size):
+                GetAddress_Request: SNESRequest = {
+                    "Opcode": "GetAddress",
+                    "Space": "SNES",
+                    "Operands": [hex(value)[2:] for read in reads[batch_start:batch_start + snes_read_batch_size]
+                                 for value in read]
+                }
+                await ctx.snes_socket.send(dumps(GetAddress_Request))
         except ConnectionClosed:
             return None
 
+        size = sum(size for _, size in reads)
         data: bytes = bytes()
         while len(data) < size:
             try:
@@ -541,7 +563,8 @@ async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional
                 break
 
         if len(data) != size:
-            snes_logger.error('Error reading %s, requested %d bytes, received %d' % (hex(address), size, len(data)))
+            snes_logger.error('Error reading %s, requested %d bytes, received %d' %
+                              (", ".join(hex(address) for address, _ in reads), size, len(data)))
             if len(data):
                 snes_logger.error(str(data))
                 snes_logger.warning('Communication Failure with SNI')
@@ -554,6 +577,34 @@ async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional
         ctx.snes_request_lock.release()
 
 
+async def snes_read(ctx: SNIContext, address: int, size: int) -> typing.Optional[bytes]:
+    return await _snes_get(ctx, [(address, size)])
+
+
+async def snes_read_many(ctx: SNIContext, reads: typing.Sequence[typing.Tuple[int, int]]) \
+        -> typing.Optional[typing.List[bytes]]:
+    """Reads all (address, size) ranges at once, coalesced into as few requests as possible.
+    Returns the data of each range in the given order, or None if reading failed."""
+    ranges = coalesce_reads(reads)
+    data = await _snes_get(ctx, ranges)
+    if data is None:
+        return None
+
+    starts: typing.List[int] = []
+    offsets: typing.List[int] = []
+    offset = 0
+    for start, size in ranges:
+        starts.append(start)
+        offsets.append(offset)
+        offset += size
+    results: typing.List[bytes] = []
+    for address, size in reads:
+        index = bisect.bisect_right(starts, address) - 1
+        position = offsets[index] + address - starts[index]
+        results.append(data[position:position + size])
+    return results
+
+
 async def snes_write(ctx: SNIContext, write_list: typing.List[typing.Tuple[int, bytes]]) -> bool:
     try:
         await ctx.snes_request_lock.acquire()
@@ -15,6 +15,7 @@ import collections
 import importlib
 import logging
 import warnings
+import zlib
 
 from argparse import Namespace
 from settings import Settings, get_settings
@@ -353,6 +354,7 @@ def load_data_package_for_checksum(game: str, checksum: typing.Optional[str]) ->
 
 
 def store_data_package_for_checksum(game: str, data: typing.Dict[str, Any]) -> None:
+    """Not used by CommonClient anymore, which stores to DataPackageCache, but kept for clients that still call it."""
     checksum = data.get("checksum")
     if checksum and game:
         if checksum != get_file_safe_name(checksum):
@@ -366,6 +368,79 @@ def store_data_package_for_checksum(game: str, data: typing.Dict[str, Any]) -> N
             logging.debug(f"Could not store data package: {e}")
 
 
+data_package_cache_format_version = 1
+
+
+class DataPackageCache(typing.Mapping[str, Dict[str, Any]]):
+    """
+    Cache of the id to name lookup tables of data packages by checksum, stored in a single binary file.
+    Layout: format version byte, 4 byte little endian header size, pickled header {checksum: (offset, size)}, entries.
+    Each entry is a pickled dict of game, version, checksum, item_id_to_name and location_id_to_name.
+    The file is loaded in one read and entries are only unpickled when accessed.
+    """
+    _entries: Dict[str, Union[bytes, memoryview]]
+    path: str
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self._entries = {}
+        self.path = path if path else cache_path("datapackage", "lookup_tables.bin")
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "rb") as f:
+                    view = memoryview(f.read())
+                if view[0] != data_package_cache_format_version:
+                    raise ValueError(f"Unknown data package cache format version {view[0]}")
+                entries_start = 5 + int.from_bytes(view[1:5], "little")
+                for checksum, (offset, size) in restricted_loads(view[5:entries_start]).items():
+                    self._entries[checksum] = view[entries_start + offset:entries_start + offset + size]
+            except Exception as e:
+                self._entries.clear()
+                logging.debug(f"Could not load data package cache: {e}")
+
+    def __getitem__(self, checksum: str) -> Dict[str, Any]:
+        return restricted_loads(self._entries[checksum])
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, game: str, data: typing.Mapping[str, Any]) -> None:
+        """Adds the lookup tables of a game's data package, unless it has no checksum."""
+        checksum = data.get("checksum")
+        if checksum and game and checksum not in self._entries:
+            self._entries[checksum] = pickle.dumps({
+                "game": game,
+                "version": data.get("version", 0),
+                "checksum": checksum,
+                "item_id_to_name": {code: name for name, code in data["item_name_to_id"].items()},
+                "location_id_to_name": {code: name for name, code in data["location_name_to_id"].items()},
+            })
+
+    def store(self) -> None:
+        """Writes the cache, keeping the entries other clients stored since it was loaded."""
+        for checksum, entry in DataPackageCache(self.path)._entries.items():
+            self._entries.setdefault(checksum, entry)
+        header: Dict[str, typing.Tuple[int, int]] = {}
+        offset = 0
+        for checksum, entry in self._entries.items():
+            header[checksum] = offset, len(entry)
+            offset += len(entry)
+        encoded_header = pickle.dumps(header)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(bytes([data_package_cache_format_version]))
+                f.write(len(encoded_header).to_bytes(4, "little"))
+                f.write(encoded_header)
+                f.writelines(self._entries.values())
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logging.debug(f"Could not store data package cache: {e}")
+
+
 def get_default_adjuster_settings(game_name: str) -> Namespace:
     import LttPAdjuster
     adjuster_settings = Namespace()
@@ -445,6 +520,75 @@ def restricted_loads(s: bytes) -> Any:
     return RestrictedUnpickler(io.BytesIO(s)).load()
 
 
+multidata_format_version = 4
+multidata_compression_level = 6
+
+
+class Multidata(typing.MutableMapping[str, Any]):
+    """
+    Multidata of format version 4, in which every top level key is a separately compressed section.
+    Layout: format version byte, 4 byte little endian header size, pickled header {key: (offset, size)}, sections.
+    Sections are only decompressed and unpickled when first accessed, so reading a few keys stays cheap.
+    """
+    _sections: Dict[str, Any]
+    _encoded: Set[str]
+    """keys of sections that are still a view into the raw multidata"""
+
+    def __init__(self, data: Union[bytes, memoryview, None] = None) -> None:
+        self._sections = {}
+        self._encoded = set()
+        if data is not None:
+            view = memoryview(data)
+            header_size = int.from_bytes(view[1:5], "little")
+            sections_start = 5 + header_size
+            for key, (offset, size) in restricted_loads(view[5:sections_start]).items():
+                self._sections[key] = view[sections_start + offset:sections_start + offset + size]
+                self._encoded.add(key)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._sections[key]
+        if key in self._encoded:
+            value = self._sections[key] = restricted_loads(zlib.decompress(value))
+            self._encoded.remove(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._sections[key] = value
+        self._encoded.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        del self._sections[key]
+        self._encoded.discard(key)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._sections)
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def get_encoded(self, key: str) -> Union[bytes, memoryview]:
+        """Returns the compressed section, which is only compressed again if it was accessed."""
+        if key in self._encoded:
+            return self._sections[key]
+        return zlib.compress(pickle.dumps(self._sections[key]), multidata_compression_level)
+
+
+def dump_multidata(multidata: typing.Mapping[str, Any]) -> bytes:
+    """Encodes multidata in the current format version, see Multidata."""
+    if isinstance(multidata, Multidata):
+        sections = [multidata.get_encoded(key) for key in multidata]
+    else:
+        sections = [zlib.compress(pickle.dumps(value), multidata_compression_level) for value in multidata.values()]
+    header: Dict[str, typing.Tuple[int, int]] = {}
+    offset = 0
+    for key, section in zip(multidata, sections):
+        header[key] = offset, len(section)
+        offset += len(section)
+    encoded_header = pickle.dumps(header)
+    return b"".join((bytes([multidata_format_version]), len(encoded_header).to_bytes(4, "little"), encoded_header,
+                     *sections))
+
+
 class ByValue:
     """
     Mixin for enums to pickle value instead of name (restores pre-3.11 behavior). Use as left-most parent.
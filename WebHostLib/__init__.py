@@ -23,7 +23,13 @@ app.jinja_env.filters['all'] = all
 
 app.config["SELFHOST"] = True  # application process is in charge of running the websites
 app.config["GENERATORS"] = 8  # maximum concurrent world gens
+app.config["GENERATOR_RECYCLE"] = 10  # amount of world gens after which a generator process gets replaced
+app.config["GENERATOR_MEMORY_LIMIT"] = None  # bytes of memory after which a generator process gets replaced
 app.config["HOSTERS"] = 8  # maximum concurrent room hosters
+# first local port to serve room hoster metrics on at /metrics, the hosters use consecutive ports. None to disable.
+app.config["METRICS_PORT"] = None
+# move a room to the least busy hoster while another hosts more than this many rooms more than it. None to disable.
+app.config["HOSTER_REBALANCE"] = None
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
@@ -32,12 +38,17 @@ app.config["DEBUG"] = False
 app.config["PORT"] = 80
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024  # 64 megabyte limit
+# folder to store patch files and multidata in, deduplicated by their hash, instead of in the database
+app.config["BLOB_FOLDER"] = None
 # if you want to deploy, make sure you have a non-guessable secret key
 app.config["SECRET_KEY"] = bytes(socket.gethostname(), encoding="utf-8")
 # at what amount of worlds should scheduling be used, instead of rolling in the web-thread
 app.config["JOB_THRESHOLD"] = 1
 # after what time in seconds should generation be aborted, freeing the queue slot. Can be set to None to disable.
 app.config["JOB_TIME"] = 600
+# CPU time in seconds and memory in bytes after which generation is aborted. None to disable, CPU time needs Unix.
+app.config["JOB_CPU_TIME"] = None
+app.config["JOB_MEMORY_LIMIT"] = None
 app.config['SESSION_PERMANENT'] = True
 
 # waitress uses one thread for I/O, these are for processing of views that then get sent
@@ -0,0 +1,21 @@
+from typing import Any, Dict
+
+from flask import request
+
+from WebHostLib import cache
+from . import api_endpoints
+from ..stats import MAX_DAYS, get_db_data
+
+
+@api_endpoints.route('/stats')
+@cache.cached(timeout=60 * 60, query_string=True)
+def get_stats() -> Dict[str, Any]:
+    """Games played per day and in total over the last `days` (default 30) days."""
+    from worlds import network_data_package
+    days = min(max(request.args.get("days", 30, type=int), 1), MAX_DAYS)
+    total_games, games_played = get_db_data(set(network_data_package["games"]), days)
+    return {
+        "days": days,
+        "total": dict(total_games.most_common()),
+        "daily": {day.isoformat(): dict(games_played[day]) for day in sorted(games_played)},
+    }
@@ -0,0 +1,64 @@
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from flask import abort, request
+
+from WebHostLib import cache
+from . import api_endpoints
+from ..models import Room, TrackerState
+from ..tracker import TRACKER_CACHE_TIMEOUT_IN_SECONDS, TrackerData
+
+
+@api_endpoints.route('/tracker/<suuid:tracker>')
+def tracker_data(tracker: UUID) -> Dict[str, Any]:
+    """State of all slots in a room, by item, location and player ids.
+    Names can be looked up in the data packages of the listed checksums, see /api/datapackage/<checksum>.
+    With `since=<version>` only slots that changed after that version are listed."""
+    room = Room.get(tracker=tracker)
+    if room is None:
+        return abort(404)
+
+    # read the version before the save data, so it never claims data the response does not contain yet
+    state = TrackerState.get(room_id=room.id)
+    version = state.version if state else 0
+    since: Optional[int] = request.args.get("since", type=int)
+    if since is None or not state or since > version:
+        since = None
+
+    key = f"api_tracker_{tracker}_{version}_{since}"
+    response: Optional[Dict[str, Any]] = cache.get(key)
+    if response is None:
+        response = get_tracker_data(TrackerData(room), version, state.slot_versions if state else {}, since)
+        cache.set(key, response, TRACKER_CACHE_TIMEOUT_IN_SECONDS)
+    return response
+
+
+def get_tracker_data(tracker_data: TrackerData, version: int, slot_versions: Dict[str, int],
+                     since: Optional[int]) -> Dict[str, Any]:
+    slots = []
+    for team, players in tracker_data.get_all_slots().items():
+        for player in players:
+            slot_version = slot_versions.get(f"{team}_{player}", 0)
+            if since is not None and slot_version <= since:
+                continue
+            slots.append({
+                "team": team,
+                "player": player,
+                "version": slot_version,
+                "game": tracker_data.get_player_game(team, player),
+                "alias": tracker_data.get_player_alias(team, player),
+                "status": tracker_data.get_player_client_status(team, player),
+                "total_locations": len(tracker_data.get_player_locations(team, player)),
+                "checked_locations": sorted(tracker_data.get_player_checked_locations(team, player)),
+                "received_items": [list(item) for item in tracker_data.get_player_received_items(team, player)],
+                "hints": [list(hint) for hint in sorted(tracker_data.get_player_hints(team, player))],
+            })
+
+    return {
+        "version": version,
+        "since": since,
+        "datapackage": tracker_data.get_room_datapackage_checksums(),
+        "activity": [[team, player, timestamp]
+                     for (team, player), timestamp in tracker_data.get_room_activity_timestamps().items()],
+        "slots": slots,
+    }
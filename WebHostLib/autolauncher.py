@@ -1,19 +1,23 @@
 from __future__ import annotations
 
+import heapq
 import json
 import logging
 import multiprocessing
+import queue
 import typing
 from datetime import timedelta, datetime
 from threading import Event, Thread
 from uuid import UUID
 
-from pony.orm import db_session, select, commit
+from pony.orm import db_session, exists, select, commit
 
 from Utils import restricted_loads
+from . import app
 from .locker import Locker, AlreadyRunningException
 
 _stop_event = Event()
+_room_activity: "queue.SimpleQueue[typing.Optional[UUID]]" = queue.SimpleQueue()
 
 
 def stop():
@@ -22,6 +26,13 @@ def stop():
     stop_event = _stop_event
     _stop_event = Event()  # new event for new threads
     stop_event.set()
+    _room_activity.put(None)  # wake up the room scheduler
+
+
+def notify_room_activity(room_id: UUID):
+    """Lets an autohost running in this process react to a Room's new last_activity right away,
+    instead of on its next refresh from the database."""
+    _room_activity.put(room_id)
 
 
 def handle_generation_success(seed_id):
@@ -35,16 +46,12 @@ def handle_generation_failure(result: BaseException):
         logging.exception(e)
 
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation):
+def launch_generator(pool: GeneratorPool, generation: Generation):
     try:
         meta = json.loads(generation.meta)
         options = restricted_loads(generation.options)
         logging.info(f"Generating {generation.id} for {len(options)} players")
-        pool.apply_async(gen_game, (options,),
-                         {"meta": meta,
-                          "sid": generation.id,
-                          "owner": generation.owner},
-                         handle_generation_success, handle_generation_failure)
+        pool.submit(options, meta=meta, sid=generation.id, owner=generation.owner)
     except Exception as e:
         generation.state = STATE_ERROR
         commit()
@@ -58,6 +65,115 @@ def init_db(pony_config: dict):
     db.generate_mapping()
 
 
+generator_worker_config = ("PONY", "JOB_TIME", "JOB_CPU_TIME", "JOB_MEMORY_LIMIT", "BLOB_FOLDER")
+"""app.config keys a generator worker needs, the rest of the config is not sent to it"""
+
+no_job = bytes(16)
+
+
+def run_generator_worker(config: dict, jobs: multiprocessing.Queue, current_job, max_jobs: int,
+                         memory_limit: typing.Optional[int]):
+    """Generates jobs from the queue, keeping the id of the one in progress in current_job
+    so the pool can take care of it should this process die"""
+    app.config.update(config)  # a spawned worker only has the defaults
+    init_db(config["PONY"])
+    for _ in range(max_jobs):
+        job = jobs.get()
+        if job is None:
+            break
+        options, kwargs = job
+        sid: typing.Optional[UUID] = kwargs.get("sid")
+        current_job.raw = sid.bytes if sid else no_job
+        try:
+            handle_generation_success(gen_game(options, **kwargs))
+        except Exception as e:
+            handle_generation_failure(e)
+        current_job.raw = no_job
+        if memory_limit:
+            rss = get_rss()
+            if rss is None:
+                warn_memory_limit_not_enforced("GENERATOR_MEMORY_LIMIT")
+            elif rss > memory_limit:
+                logging.info(f"Generator worker exceeded memory limit with {rss} bytes, recycling.")
+                break
+
+
+class GeneratorPool:
+    """Keeps GENERATORS worker processes running, each of which generates up to GENERATOR_RECYCLE seeds
+    or until it exceeds GENERATOR_MEMORY_LIMIT, after which it is replaced.
+    Where available, workers are forked from a server process that imported the worlds once,
+    so a replaced worker is ready to generate without re-importing every world.
+    A Generation whose worker died while generating it is queued again once, then marked as failed."""
+    max_worker_deaths: typing.ClassVar[int] = 1
+    """times a Generation gets queued again after its worker died, before it is marked as failed"""
+
+    def __init__(self, config: dict):
+        self.context = self.get_context()
+        self.size: int = config["GENERATORS"]
+        self.jobs = self.context.Queue()
+        self.worker_config = {key: config[key] for key in generator_worker_config}
+        self.max_jobs: int = config["GENERATOR_RECYCLE"]
+        self.memory_limit: typing.Optional[int] = config["GENERATOR_MEMORY_LIMIT"]
+        self.workers: typing.List[typing.Tuple[multiprocessing.Process, typing.Any]] = []
+        """worker processes and the id of the Generation each is working on"""
+
+    @staticmethod
+    def get_context() -> multiprocessing.context.BaseContext:
+        return get_preloaded_context()
+
+    def maintain(self):
+        """Replaces workers that have exited since the last call"""
+        running = []
+        for worker, current_job in self.workers:
+            if worker.is_alive():
+                running.append((worker, current_job))
+                continue
+            worker.join()
+            if current_job.raw != no_job:
+                logging.error(f"{worker.name} exited with code {worker.exitcode} during a generation.")
+                self.handle_worker_death(UUID(bytes=current_job.raw))
+        self.workers = running
+        while len(self.workers) < self.size:
+            current_job = self.context.Array("c", len(no_job), lock=False)
+            worker = self.context.Process(target=run_generator_worker,
+                                          args=(self.worker_config, self.jobs, current_job, self.max_jobs,
+                                                self.memory_limit),
+                                          name=f"Generator{len(self.workers)}")
+            worker.start()
+            self.workers.append((worker, current_job))
+
+    def handle_worker_death(self, sid: UUID):
+        with db_session:
+            generation = Generation.get(id=sid)
+            if generation is None or generation.state != STATE_STARTED:
+                return  # finished or already handled elsewhere
+            meta = json.loads(generation.meta)
+            meta["worker_deaths"] = meta.get("worker_deaths", 0) + 1
+            if meta["worker_deaths"] > self.max_worker_deaths:
+                generation.state = STATE_ERROR
+                meta["error"] = "Generator process exited unexpectedly."
+            else:
+                generation.state = STATE_QUEUED
+            generation.meta = json.dumps(meta)
+
+    def submit(self, options: dict, **kwargs):
+        self.jobs.put((options, kwargs))
+
+    def close(self):
+        for worker, _ in self.workers:
+            worker.terminate()
+        for worker, _ in self.workers:
+            worker.join()
+        self.workers.clear()
+
+    def __enter__(self) -> GeneratorPool:
+        self.maintain()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 def cleanup():
     """delete unowned user-content"""
     with db_session:
@@ -67,8 +183,15 @@ def cleanup():
         seeds = Seed.select(lambda seed: seed.owner == UUID(int=0) and not seed.rooms).delete(bulk=True)
         slots = Slot.select(lambda slot: not slot.seed).delete(bulk=True)
         # Command gets deleted by ponyorm Cascade Delete, as Room is Required
+        # TrackerState only holds the id of its Room, so it has to be deleted separately
+        TrackerState.select(lambda state: not exists(room for room in Room if room.id == state.room_id)) \
+            .delete(bulk=True)
     if rooms or seeds or slots:
         logging.info(f"{rooms} Rooms, {seeds} Seeds and {slots} Slots have been deleted.")
+    if get_blob_folder():
+        blobs = collect_blobs(migrate_blobs())
+        if blobs:
+            logging.info(f"{blobs} unreferenced blobs have been deleted.")
 
 
 def autohost(config: dict):
@@ -83,15 +206,9 @@ def autohost(config: dict):
                     hosters.append(hoster)
                     hoster.start()
 
-                while not stop_event.wait(0.1):
-                    with db_session:
-                        rooms = select(
-                            room for room in Room if
-                            room.last_activity >= datetime.utcnow() - timedelta(days=3))
-                        for room in rooms:
-                            # we have to filter twice, as the per-room timeout can't currently be PonyORM transpiled.
-                            if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout + 5):
-                                hosters[room.id.int % len(hosters)].start_room(room.id)
+                scheduler = RoomScheduler(hosters, config["HOSTER_REBALANCE"])
+                while not stop_event.is_set():
+                    scheduler.run_once()
 
         except AlreadyRunningException:
             logging.info("Autohost reports as already running, not starting another.")
@@ -99,14 +216,132 @@ def autohost(config: dict):
     Thread(target=keep_running, name="AP_Autohost").start()
 
 
+class RoomScheduler:
+    """Keeps every Room that should currently be hosted in a heap ordered by when it times out.
+    Only Rooms with new activity are fetched from the database, so idle Rooms cost nothing until they expire."""
+    refresh_interval: typing.ClassVar[float] = 1.0
+    """seconds between checks for activity that was not announced through notify_room_activity"""
+    grace: typing.ClassVar[timedelta] = timedelta(seconds=5)
+    """time past a Room's timeout during which it is still considered active"""
+    overlap: typing.ClassVar[timedelta] = timedelta(seconds=5)
+    """how far before the newest seen activity to look again, for transactions that committed late"""
+
+    def __init__(self, hosters: typing.List[MultiworldInstance], rebalance_threshold: typing.Optional[int] = None):
+        self.hosters = hosters
+        self.rebalance_threshold = rebalance_threshold
+        self.deadlines: typing.Dict[UUID, datetime] = {}
+        self.heap: typing.List[typing.Tuple[datetime, UUID]] = []
+        self.watermark: datetime = datetime.utcnow() - timedelta(days=3)
+        self.migrations: typing.Dict[UUID, MultiworldInstance] = {}
+        """Rooms that are being handed over, to the hoster taking them over"""
+
+    def hoster_for(self, room_id: UUID) -> MultiworldInstance:
+        """The hoster currently hosting the Room, otherwise the one it is handed over to or the least busy one"""
+        for hoster in self.hosters:
+            if room_id in hoster.room_ids:
+                return hoster
+        if room_id in self.migrations:
+            return self.migrations[room_id]
+        return min(self.hosters, key=lambda hoster: len(hoster.room_ids))
+
+    def schedule(self, room_id: UUID, last_activity: datetime, timeout: int, now: datetime):
+        deadline = last_activity + timedelta(seconds=timeout) + self.grace
+        if deadline > now and deadline > self.deadlines.get(room_id, now):
+            self.deadlines[room_id] = deadline
+            heapq.heappush(self.heap, (deadline, room_id))
+            self.hoster_for(room_id).start_room(room_id)
+
+    def refresh(self):
+        """Picks up Rooms with activity since the last refresh and starts them"""
+        now = datetime.utcnow()
+        since = self.watermark - self.overlap
+        with db_session:
+            rooms = select((room.id, room.last_activity, room.timeout) for room in Room
+                           if room.last_activity > since)[:]
+        for room_id, last_activity, timeout in rooms:
+            self.watermark = max(self.watermark, last_activity)
+            self.schedule(room_id, last_activity, timeout, now)
+
+    def expire(self):
+        """Forgets Rooms that timed out, they shut themselves down"""
+        now = datetime.utcnow()
+        while self.heap and self.heap[0][0] <= now:
+            deadline, room_id = heapq.heappop(self.heap)
+            if self.deadlines.get(room_id) == deadline:  # otherwise there was newer activity
+                del self.deadlines[room_id]
+
+    def restart_shut_down(self):
+        """Starts Rooms again that got new activity while they were shutting down"""
+        shut_down = [room_id for hoster in self.hosters for room_id in hoster.collect_shutdowns()]
+        if not shut_down:
+            return
+        now = datetime.utcnow()
+        with db_session:
+            rooms = select((room.id, room.last_activity, room.timeout) for room in Room
+                           if room.id in shut_down)[:]
+        for room_id, last_activity, timeout in rooms:
+            self.deadlines.pop(room_id, None)
+            self.schedule(room_id, last_activity, timeout, now)
+        for room_id in shut_down:
+            self.migrations.pop(room_id, None)
+
+    def forget_kept_rooms(self):
+        """Forgets handovers of Rooms that their hoster did not release, such as ones that were still starting"""
+        for hoster in self.hosters:
+            for room_id in hoster.collect_kept_rooms():
+                if self.migrations.pop(room_id, None):
+                    logging.info(f"{hoster.name} kept room {room_id} instead of handing it over.")
+
+    def migrate(self, room_id: UUID, target: MultiworldInstance) -> bool:
+        """Moves a hosted Room to target without ending it.
+        Its hoster saves and closes it without marking it inactive, then restart_shut_down starts it on target,
+        which listens on the Room's last port again, so its clients reconnect to the same address."""
+        source = next((hoster for hoster in self.hosters if room_id in hoster.room_ids), None)
+        if source is None or source is target or room_id in self.migrations:
+            return False
+        self.migrations[room_id] = target
+        source.release_room(room_id)
+        return True
+
+    def rebalance(self):
+        """Moves one Room from the busiest to the least busy hoster, if they differ by more than rebalance_threshold"""
+        if not self.rebalance_threshold or self.migrations:
+            return
+        busiest = max(self.hosters, key=lambda hoster: len(hoster.room_ids))
+        least_busy = min(self.hosters, key=lambda hoster: len(hoster.room_ids))
+        if len(busiest.room_ids) - len(least_busy.room_ids) > self.rebalance_threshold:
+            # Rooms that are still starting can't be handed over yet
+            room_id = next(iter(busiest.running_rooms()), None)
+            if room_id is None:
+                return
+            logging.info(f"Moving room {room_id} from {busiest.name} to {least_busy.name}.")
+            self.migrate(room_id, least_busy)
+
+    def run_once(self):
+        self.refresh()
+        self.expire()
+        self.restart_shut_down()
+        self.forget_kept_rooms()
+        self.rebalance()
+        timeout = self.refresh_interval
+        if self.heap:
+            timeout = min(timeout, max(0.0, (self.heap[0][0] - datetime.utcnow()).total_seconds()))
+        try:
+            _room_activity.get(timeout=timeout)
+        except queue.Empty:
+            pass
+        else:  # collapse a burst of activity into a single refresh
+            while not _room_activity.empty():
+                _room_activity.get_nowait()
+
+
 def autogen(config: dict):
     def keep_running():
         stop_event = _stop_event
         try:
             with Locker("autogen"):
 
-                with multiprocessing.Pool(config["GENERATORS"], initializer=init_db,
-                                          initargs=(config["PONY"],), maxtasksperchild=10) as generator_pool:
+                with GeneratorPool(config) as generator_pool:
                     with db_session:
                         to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
 
@@ -123,6 +358,7 @@ def autogen(config: dict):
                         select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
 
                     while not stop_event.wait(0.1):
+                        generator_pool.maintain()
                         with db_session:
                             # for update locks the database row(s) during transaction, preventing writes from elsewhere
                             to_start = select(
@@ -142,13 +378,20 @@ multiworlds: typing.Dict[type(Room.id), MultiworldInstance] = {}
 class MultiworldInstance():
     def __init__(self, config: dict, id: int):
         self.room_ids = set()
+        self.running_room_ids: typing.Set[UUID] = set()
+        """Rooms the hosting process reported as running, the ones it can hand over"""
         self.process: typing.Optional[multiprocessing.Process] = None
         self.ponyconfig = config["PONY"]
         self.cert = config["SELFLAUNCHCERT"]
         self.key = config["SELFLAUNCHKEY"]
         self.host = config["HOST_ADDRESS"]
+        self.blob_folder = config["BLOB_FOLDER"]
+        self.metrics_port = config["METRICS_PORT"] + id if config["METRICS_PORT"] else None
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
+        self.rooms_to_release = multiprocessing.Queue()
+        self.rooms_running = multiprocessing.Queue()
+        self.rooms_kept = multiprocessing.Queue()
         self.name = f"MultiHoster{id}"
 
     def start(self):
@@ -158,20 +401,52 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down, self.blob_folder,
+                                                self.metrics_port, self.rooms_to_release, self.rooms_running,
+                                                self.rooms_kept),
                                           name=self.name)
         process.start()
         self.process = process
 
-    def start_room(self, room_id):
+    def collect_shutdowns(self) -> typing.List[UUID]:
+        """Forgets Rooms that the hosting process reported as shut down and returns them"""
+        shut_down = []
         while not self.rooms_shutting_down.empty():
-            self.room_ids.remove(self.rooms_shutting_down.get(block=True, timeout=None))
+            room_id = self.rooms_shutting_down.get(block=True, timeout=None)
+            self.room_ids.remove(room_id)
+            self.running_room_ids.discard(room_id)
+            shut_down.append(room_id)
+        return shut_down
+
+    def running_rooms(self) -> typing.Set[UUID]:
+        """Rooms that are hosted and done starting, taking in what the hosting process reported since the last call"""
+        while not self.rooms_running.empty():
+            room_id = self.rooms_running.get(block=True, timeout=None)
+            if room_id in self.room_ids:  # otherwise it shut down since
+                self.running_room_ids.add(room_id)
+        return self.running_room_ids
+
+    def collect_kept_rooms(self) -> typing.List[UUID]:
+        """Rooms the hosting process did not release when asked to, as they were not running"""
+        kept = []
+        while not self.rooms_kept.empty():
+            kept.append(self.rooms_kept.get(block=True, timeout=None))
+        return kept
+
+    def start_room(self, room_id):
+        # Rooms that shut down are left to the scheduler's collect_shutdowns, which decides whether to restart them
         if room_id in self.room_ids:
             pass  # should already be hosted currently.
         else:
             self.room_ids.add(room_id)
             self.rooms_to_start.put(room_id)
 
+    def release_room(self, room_id):
+        """Asks the hosting process to save and close the Room for another hoster to take it over.
+        It is reported through collect_shutdowns once its port is free, or through collect_kept_rooms if it was not
+        running."""
+        self.rooms_to_release.put(room_id)
+
     def stop(self):
         if self.process:
             self.process.terminate()
@@ -185,6 +460,7 @@ class MultiworldInstance():
         self.process = None
 
 
-from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
+from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot, TrackerState
 from .customserver import run_server_process, get_static_server_data
-from .generate import gen_game
+from .generate import gen_game, get_preloaded_context, get_rss, warn_memory_limit_not_enforced
+from .blobstore import collect_blobs, get_blob_folder, migrate_blobs
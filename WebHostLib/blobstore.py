@@ -0,0 +1,107 @@
+"""Content-addressed storage of large binary columns, such as Slot.data and Seed.multidata, outside the database.
+The column then only holds a reference to the file, and identical data is only stored once."""
+import hashlib
+import os
+import tempfile
+import time
+import typing
+
+from . import app
+
+BLOB_REFERENCE = b"\x00blob:"
+"""prefix of a reference stored in place of the data. Neither multidata nor any patch format starts with a NUL."""
+REFERENCE_LENGTH = len(BLOB_REFERENCE) + hashlib.sha256().digest_size * 2
+
+
+def get_blob_folder() -> typing.Optional[str]:
+    return app.config["BLOB_FOLDER"]
+
+
+def is_reference(value: typing.Optional[bytes]) -> bool:
+    return bool(value) and value.startswith(BLOB_REFERENCE)
+
+
+def get_blob_path(value: bytes) -> str:
+    """Returns the file a reference points to"""
+    folder = get_blob_folder()
+    if not folder:
+        raise Exception("Data is stored as blob, but BLOB_FOLDER is not configured.")
+    key = value[len(BLOB_REFERENCE):].decode("ascii")
+    return os.path.join(folder, key[:2], key)
+
+
+def store_blob(data: typing.Optional[bytes]) -> typing.Optional[bytes]:
+    """Moves data into the blob store, if one is configured, and returns what should be stored in the database."""
+    folder = get_blob_folder()
+    if not folder or not data:
+        return data
+    key = hashlib.sha256(data).hexdigest()
+    reference = BLOB_REFERENCE + key.encode("ascii")
+    path = get_blob_path(reference)
+    if os.path.exists(path):
+        os.utime(path)  # keep a blob that is about to be referenced again from being collected
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first, so a blob is never seen half written
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as f:
+            f.write(data)
+        os.replace(f.name, path)
+    return reference
+
+
+def load_blob(value: typing.Optional[bytes]) -> typing.Optional[bytes]:
+    """Returns the data stored in a database column, following a reference into the blob store if it is one."""
+    if not is_reference(value):
+        return value
+    with open(get_blob_path(value), "rb") as f:
+        return f.read()
+
+
+def migrate_blobs(batch_size: int = 100) -> typing.List[bytes]:
+    """Moves Slot.data and Seed.multidata still stored in the database into the blob store
+    and returns all blob references, for collect_blobs.
+    Only values that can't be a reference, by their length, are loaded in full."""
+    from pony.orm import db_session, raw_sql, select
+    from .models import Seed, Slot, db
+
+    references: typing.List[bytes] = []
+    for entity, attribute in ((Slot, Slot.data), (Seed, Seed.multidata)):
+        length = f"length({db.provider.quote_name('row')}.{db.provider.quote_name(attribute.column)})"
+        with db_session:
+            ids = list(select(row.id for row in entity if raw_sql(length) != REFERENCE_LENGTH))
+            for row_id, value in select((row.id, getattr(row, attribute.name)) for row in entity
+                                        if raw_sql(length) == REFERENCE_LENGTH):
+                if is_reference(value):
+                    references.append(value)
+                else:
+                    ids.append(row_id)
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            with db_session:
+                for row in entity.select(lambda row: row.id in batch):
+                    value = getattr(row, attribute.name)
+                    if value and not is_reference(value):
+                        value = store_blob(value)
+                        setattr(row, attribute.name, value)
+                    if is_reference(value):
+                        references.append(value)
+    return references
+
+
+def collect_blobs(references: typing.Iterable[bytes], min_age: float = 3600) -> int:
+    """Deletes blobs that are not referenced anymore and returns how many were deleted.
+    Blobs younger than min_age seconds are kept, as their upload may not have been committed yet."""
+    folder = get_blob_folder()
+    if not folder or not os.path.isdir(folder):
+        return 0
+    referenced = {os.path.basename(get_blob_path(reference)) for reference in references if is_reference(reference)}
+    cutoff = time.time() - min_age
+    deleted = 0
+    for shard in os.scandir(folder):
+        if not shard.is_dir():
+            continue
+        for blob in os.scandir(shard.path):
+            if blob.name not in referenced and blob.stat().st_mtime < cutoff:
+                os.remove(blob.path)
+                deleted += 1
+    return deleted
@@ -13,16 +13,20 @@ import threading
 import time
 import typing
 import sys
+import uuid
 
 import websockets
 from pony.orm import commit, db_session, select
 
 import Utils
 
-from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
+from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert, \
+    EventLoopLag, format_metrics, serve_metrics
 from Utils import restricted_loads, cache_argsless
+from . import app
+from .blobstore import load_blob
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, GameDataPackage, Room, TrackerState, db
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -60,17 +64,19 @@ class DBCommandProcessor(ServerCommandProcessor):
 class WebHostContext(Context):
     room_id: int
 
-    def __init__(self, static_server_data: dict, logger: logging.Logger):
+    def __init__(self, static_server_data: dict, logger: logging.Logger, metrics: bool = False):
         # static server data is used during _load_game_data to load required data,
         # without needing to import worlds system, which takes quite a bit of memory
         self.static_server_data = static_server_data
         super(WebHostContext, self).__init__("", 0, "", "", 1,
                                              40, True, "enabled", "enabled",
-                                             "enabled", 0, 2, logger=logger)
+                                             "enabled", 0, 2, logger=logger, metrics=metrics)
         del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
         self.tags = ["AP", "WebHost"]
+        self.tracker_fingerprints: typing.Dict[str, tuple] = {}
+        self.handing_over = False  # set when another hoster takes the room over, instead of it shutting down
 
     def __del__(self):
         try:
@@ -108,7 +114,7 @@ class WebHostContext(Context):
         else:
             self.port = get_random_port()
 
-        multidata = self.decompress(room.seed.multidata)
+        multidata = self.decompress(load_blob(room.seed.multidata))
         game_data_packages = {}
 
         static_gamespackage = self.gamespackage  # this is shared across all rooms
@@ -156,12 +162,44 @@ class WebHostContext(Context):
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
         room = Room.get(id=self.room_id)
-        room.multisave = pickle.dumps(self.get_save())
+        with self.metrics.measure("save"):
+            room.multisave = multisave = pickle.dumps(self.get_save())
+            self.update_tracker_state()
+        if self.metrics.enabled:
+            self.metrics.save_size = len(multisave)
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = datetime.datetime.utcnow()
         return True
 
+    def get_tracker_fingerprints(self) -> typing.Dict[str, tuple]:
+        """Cheap summary of the save data each slot's tracker shows, to find the slots that changed between saves."""
+        aliases = tuple(sorted(self.name_aliases.items()))  # shown in hints, so part of every slot
+        fingerprints = {}
+        for team, slot in self.player_names:
+            hints = self.hints.get((team, slot), ())
+            fingerprints[f"{team}_{slot}"] = (
+                len(self.location_checks.get((team, slot), ())),
+                len(self.received_items.get((team, slot, True), ())),
+                self.client_game_state.get((team, slot), 0),
+                len(hints), sum(hint.found for hint in hints),
+                aliases,
+            )
+        return fingerprints
+
+    def update_tracker_state(self) -> None:
+        """Bumps the room's tracker version and the versions of the slots that changed since the last save.
+        Has to be called within the db_session saving the room."""
+        state = TrackerState.get(room_id=self.room_id) or TrackerState(room_id=self.room_id)
+        state.version += 1
+        state.modified = datetime.datetime.utcnow()
+        fingerprints = self.get_tracker_fingerprints()
+        changed = {slot: state.version for slot, fingerprint in fingerprints.items()
+                   if self.tracker_fingerprints.get(slot) != fingerprint}
+        if changed:
+            state.slot_versions = {**state.slot_versions, **changed}
+        self.tracker_fingerprints = fingerprints
+
     def get_save(self) -> dict:
         d = super(WebHostContext, self).get_save()
         d["video"] = [(tuple(playerslot), videodata) for playerslot, videodata in self.video.items()]
@@ -223,8 +261,13 @@ def set_up_logging(room_id) -> logging.Logger:
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       blob_folder: typing.Optional[str] = None, metrics_port: typing.Optional[int] = None,
+                       rooms_to_release: typing.Optional[multiprocessing.Queue] = None,
+                       rooms_running: typing.Optional[multiprocessing.Queue] = None,
+                       rooms_kept: typing.Optional[multiprocessing.Queue] = None):
     Utils.init_logging(name)
+    app.config["BLOB_FOLDER"] = blob_folder
     try:
         import resource
     except ModuleNotFoundError:
@@ -249,14 +292,19 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    hosted_rooms: typing.Dict[uuid.UUID, WebHostContext] = {}
+    loop_lag: typing.Optional[EventLoopLag] = EventLoopLag() if metrics_port else None
 
-    async def start_room(room_id):
+    async def host_room(room_id) -> bool:
+        """Hosts the Room until it shuts down, returns whether it was handed over to another hoster instead"""
         with Locker(f"RoomLocker {room_id}"):
             try:
                 logger = set_up_logging(room_id)
-                ctx = WebHostContext(static_server_data, logger)
+                ctx = WebHostContext(static_server_data, logger, metrics=bool(metrics_port))
+                ctx.metrics.loop_lag = loop_lag
                 ctx.load(room_id)
                 ctx.init_save()
+                hosted_rooms[room_id] = ctx
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
@@ -286,11 +334,17 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     ctx.logger.exception("Could not determine port. Likely hosting failure.")
                 with db_session:
                     ctx.auto_shutdown = Room.get(id=room_id).timeout
+                if rooms_running:
+                    rooms_running.put(room_id)
                 if ctx.saving:
                     setattr(asyncio.current_task(), "save", lambda: ctx._save(True))
                 assert ctx.shutdown_task is None
                 ctx.shutdown_task = asyncio.create_task(auto_shutdown(ctx, []))
                 await ctx.shutdown_task
+                if ctx.handing_over:
+                    # free the port for the hoster taking over, the clients reconnect to it there
+                    ctx.server.ws_server.close()
+                    await ctx.server.ws_server.wait_closed()
 
             except (KeyboardInterrupt, SystemExit):
                 if ctx.saving:
@@ -307,19 +361,47 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     ctx._save()
                     setattr(asyncio.current_task(), "save", None)
             finally:
-                try:
-                    ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
-                    ctx.exit_event.set()  # make sure the saving thread stops at some point
-                    # NOTE: async saving should probably be an async task and could be merged with shutdown_task
+                hosted_rooms.pop(room_id, None)
+                ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
+                ctx.exit_event.set()  # make sure the saving thread stops at some point
+                # NOTE: async saving should probably be an async task and could be merged with shutdown_task
+                if ctx.handing_over:
+                    logging.info(f"Handing over room {room_id} from {name}.")
+                else:
                     with (db_session):
                         # ensure the Room does not spin up again on its own, minute of safety buffer
                         room = Room.get(id=room_id)
                         room.last_activity = datetime.datetime.utcnow() - \
                                              datetime.timedelta(minutes=1, seconds=room.timeout)
                     logging.info(f"Shutting down room {room_id} on {name}.")
-                finally:
-                    await asyncio.sleep(5)
-                    rooms_shutting_down.put(room_id)
+        return ctx.handing_over
+
+    async def start_room(room_id):
+        handed_over = False
+        try:
+            handed_over = await host_room(room_id)
+        finally:
+            if not handed_over:
+                await asyncio.sleep(5)
+            # reported once the lock is released, so that another hoster can start the Room right away
+            rooms_shutting_down.put(room_id)
+
+    def release_room(room_id):
+        """Ends hosting a Room like a shutdown would, but keeps it active for another hoster to take over"""
+        ctx = hosted_rooms.get(room_id)
+        if ctx and ctx.shutdown_task and not ctx.exit_event.is_set():
+            ctx.logger.info("Moving room to another host process.")
+            ctx.handing_over = True
+            ctx.exit_event.set()
+        else:
+            # still starting or already shutting down, the scheduler has to know it stays here
+            logging.info(f"Keeping room {room_id} on {name}, it is not running.")
+            if rooms_kept:
+                rooms_kept.put(room_id)
+
+    def receive_releases():
+        while 1:
+            loop.call_soon_threadsafe(release_room, rooms_to_release.get(block=True, timeout=None))
 
     class Starter(threading.Thread):
         _tasks: typing.List[asyncio.Future]
@@ -342,9 +424,19 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 logging.info(f"Starting room {next_room} on {name}.")
                 del task  # delete reference to task object
 
+    if metrics_port:
+        loop.run_until_complete(serve_metrics(
+            "127.0.0.1", metrics_port,
+            lambda: format_metrics(((ctx, {"room": str(ctx.room_id)}) for ctx in list(hosted_rooms.values())),
+                                   loop_lag)))
+        loop.create_task(loop_lag.measure())  # once for all rooms, as they share this event loop
+        logging.info(f"Serving metrics of {name} at http://127.0.0.1:{metrics_port}/metrics")
+
     starter = Starter()
     starter.daemon = True
     starter.start()
+    if rooms_to_release:
+        threading.Thread(target=receive_releases, name="Releaser", daemon=True).start()
     try:
         loop.run_forever()
     finally:
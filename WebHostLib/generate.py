@@ -1,12 +1,18 @@
-import concurrent.futures
+import functools
 import json
+import logging
+import multiprocessing
 import os
 import pickle
 import random
+import signal
 import tempfile
+import threading
+import time
 import zipfile
 from collections import Counter
-from typing import Any, Dict, List, Optional, Union, Set
+from multiprocessing.connection import Connection
+from typing import Any, ClassVar, Dict, List, Optional, Union, Set
 
 from flask import flash, redirect, render_template, request, session, url_for
 from pony.orm import commit, db_session
@@ -22,6 +28,8 @@ from .check import get_yaml_data, roll_options
 from .models import Generation, STATE_ERROR, STATE_QUEUED, Seed, UUID
 from .upload import upload_zip_to_db
 
+cpu_limit_signal: Optional[int] = getattr(signal, "SIGXCPU", None)
+
 
 def get_meta(options_source: dict, race: bool = False) -> Dict[str, Union[List[str], Dict[str, Any]]]:
     plando_options: Set[str] = set()
@@ -104,15 +112,71 @@ def start_generation(options: Dict[str, Union[dict, str]], meta: Dict[str, Any])
         return redirect(url_for("view_seed", seed=seed_id))
 
 
-def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=None, sid=None):
-    if not meta:
-        meta: Dict[str, Any] = {}
+class JobLimitExceeded(Exception):
+    pass
 
-    meta.setdefault("server_options", {}).setdefault("hint_cost", 10)
-    race = meta.setdefault("generator_options", {}).setdefault("race", False)
 
-    def task():
-        target = tempfile.TemporaryDirectory()
+def get_rss(pid: Optional[int] = None) -> Optional[int]:
+    """Returns the resident memory of a process in bytes, or None if it can't be determined"""
+    try:
+        import psutil
+    except ImportError:
+        try:
+            with open(f"/proc/{pid or 'self'}/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, AttributeError, ValueError):
+            return None
+    try:
+        return psutil.Process(pid).memory_info().rss
+    except psutil.Error:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def warn_memory_limit_not_enforced(setting: str) -> None:
+    """Warns once per setting that memory can't be measured here, for which psutil or /proc is needed"""
+    logging.warning(f"{setting} is set, but memory usage can't be measured without psutil, so it is not enforced.")
+
+
+def get_preloaded_context() -> multiprocessing.context.BaseContext:
+    """Where available, processes are forked from a server process that imported the worlds once"""
+    try:
+        context = multiprocessing.get_context("forkserver")
+    except ValueError:  # not available on Windows
+        return multiprocessing.get_context()
+    context.set_forkserver_preload(["worlds", "Main", "WebHostLib.generate"])
+    return context
+
+
+def get_cpu_time(pid: int) -> Optional[float]:
+    """Returns the user and system CPU time used so far by a process in seconds, or None if it can't be determined.
+    Also works for a process that exited but was not joined yet."""
+    try:
+        import psutil
+    except ImportError:
+        try:
+            with open(f"/proc/{pid}/stat") as stat:
+                # the process name in parentheses may contain spaces, the fields after it don't
+                fields = stat.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        except (OSError, AttributeError, ValueError, IndexError):
+            return None
+    try:
+        cpu_times = psutil.Process(pid).cpu_times()
+    except psutil.Error:
+        return None
+    return cpu_times.user + cpu_times.system
+
+
+def generate_to_folder(gen_options: dict, meta: Dict[str, Any], target: str, connection: Connection,
+                       cpu_time: Optional[int]):
+    """Generates the multiworld into target. Runs in its own process, so it can be killed when exceeding limits."""
+    error: Optional[BaseException] = None
+    try:
+        if cpu_time:
+            import resource
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_time, resource.getrlimit(resource.RLIMIT_CPU)[1]))
+        race = meta["generator_options"]["race"]
         playercount = len(gen_options)
         seed = get_seed()
 
@@ -129,7 +193,7 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
         erargs.spoiler = meta["generator_options"].get("spoiler", 0)
         erargs.race = race
         erargs.outputname = seedname
-        erargs.outputpath = target.name
+        erargs.outputpath = target
         erargs.teams = 1
         erargs.plando_options = PlandoOptions.from_set(meta.setdefault("plando_options",
                                                                        {"bosses", "items", "connections", "texts"}))
@@ -151,37 +215,119 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
             erargs.name[player] = handle_name(erargs.name[player], player, name_counter)
         if len(set(erargs.name.values())) != len(erargs.name):
             raise Exception(f"Names have to be unique. Names: {Counter(erargs.name.values())}")
-        ERmain(erargs, seed, baked_server_options=meta["server_options"])
+        # data packages are stored by upload_to_db, so the multidata does not need to carry them
+        ERmain(erargs, seed, baked_server_options=meta["server_options"], embed_data_package=False)
+    except BaseException as e:
+        # a SystemExit or KeyboardInterrupt here should only end the generation, not the process waiting on it
+        error = e if isinstance(e, Exception) else Exception(f"{e.__class__.__name__}: {e}")
+    try:
+        connection.send(error)
+    except (pickle.PicklingError, TypeError, AttributeError):  # exception can't be sent, send its description
+        connection.send(Exception(f"{error.__class__.__name__}: {error}"))
 
-        return upload_to_db(target.name, sid, owner, race)
-    thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
-    thread = thread_pool.submit(task)
 
-    try:
-        return thread.result(app.config["JOB_TIME"])
-    except concurrent.futures.TimeoutError as e:
-        if sid:
-            with db_session:
-                gen = Generation.get(id=sid)
-                if gen is not None:
-                    gen.state = STATE_ERROR
-                    meta = json.loads(gen.meta)
-                    meta["error"] = (
-                            "Allowed time for Generation exceeded, please consider generating locally instead. " +
-                            e.__class__.__name__ + ": " + str(e))
-                    gen.meta = json.dumps(meta)
-                    commit()
-    except BaseException as e:
-        if sid:
-            with db_session:
-                gen = Generation.get(id=sid)
-                if gen is not None:
-                    gen.state = STATE_ERROR
-                    meta = json.loads(gen.meta)
-                    meta["error"] = (e.__class__.__name__ + ": " + str(e))
-                    gen.meta = json.dumps(meta)
-                    commit()
-        raise
+class GenerationJob:
+    """Runs a generation in its own process, killing it once it exceeds
+    JOB_TIME seconds, JOB_CPU_TIME seconds of CPU time or JOB_MEMORY_LIMIT bytes of memory."""
+    poll_interval: ClassVar[float] = 0.5
+    usage: Dict[str, Union[int, float]]
+    """resources the generation used: wall_time and, where they can be measured, cpu_time and peak_rss.
+    Stored as "resources" in the meta of the resulting Seed, or of the Generation if it failed."""
+
+    def __init__(self, gen_options: dict, meta: Dict[str, Any], target: str):
+        self.gen_options = gen_options
+        self.meta = meta
+        self.target = target
+        self.usage = {}
+
+    @staticmethod
+    def get_context() -> multiprocessing.context.BaseContext:
+        # the generation does not touch the database, so forking keeps the already imported worlds,
+        # but a fork of a process with other threads, like the web server's request threads, can deadlock on their locks
+        if "fork" in multiprocessing.get_all_start_methods() and threading.active_count() == 1:
+            return multiprocessing.get_context("fork")
+        return get_preloaded_context()
+
+    def measure_cpu_time(self, process: multiprocessing.Process):
+        cpu_time = get_cpu_time(process.pid)
+        if cpu_time is not None:
+            self.usage["cpu_time"] = round(max(cpu_time, self.usage.get("cpu_time", 0)), 3)
+
+    def run(self):
+        context = self.get_context()
+        receiver, sender = context.Pipe(duplex=False)
+        cpu_limit: Optional[int] = app.config["JOB_CPU_TIME"]
+        process = context.Process(target=generate_to_folder, name="Generation", daemon=True,
+                                  args=(self.gen_options, self.meta, self.target, sender, cpu_limit))
+        time_limit: Optional[float] = app.config["JOB_TIME"]
+        memory_limit: Optional[int] = app.config["JOB_MEMORY_LIMIT"]
+        if memory_limit and get_rss() is None:
+            warn_memory_limit_not_enforced("JOB_MEMORY_LIMIT")
+        start = time.perf_counter()
+        process.start()
+        sender.close()
+        # CPU time is sampled here instead of reported by the process, so a killed process still has it recorded
+        reaped = False
+        try:
+            while not receiver.poll(self.poll_interval):
+                self.measure_cpu_time(process)
+                if not process.is_alive():
+                    reaped = True
+                    if receiver.poll():  # sent right before exiting
+                        break
+                    if cpu_limit_signal is not None and process.exitcode == -cpu_limit_signal:
+                        self.usage["cpu_time"] = max(cpu_limit, self.usage.get("cpu_time", 0))
+                        raise JobLimitExceeded("Allowed CPU time for Generation exceeded, "
+                                               "please consider generating locally instead.")
+                    raise Exception(f"Generation process exited unexpectedly with code {process.exitcode}.")
+                rss = get_rss(process.pid)
+                if rss is not None:
+                    self.usage["peak_rss"] = max(self.usage.get("peak_rss", 0), rss)
+                    if memory_limit and rss > memory_limit:
+                        raise JobLimitExceeded("Allowed memory for Generation exceeded, "
+                                               "please consider generating locally instead.")
+                if time_limit and time.perf_counter() - start > time_limit:
+                    raise JobLimitExceeded("Allowed time for Generation exceeded, "
+                                           "please consider generating locally instead.")
+            error = receiver.recv()
+            if error:
+                raise error
+        finally:
+            self.usage["wall_time"] = round(time.perf_counter() - start, 3)
+            if not reaped:  # an exited process can still be measured until it is joined
+                self.measure_cpu_time(process)
+            if process.is_alive():
+                process.kill()
+            process.join()
+            receiver.close()
+
+
+def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=None, sid=None):
+    if not meta:
+        meta: Dict[str, Any] = {}
+
+    meta.setdefault("server_options", {}).setdefault("hint_cost", 10)
+    race = meta.setdefault("generator_options", {}).setdefault("race", False)
+
+    with tempfile.TemporaryDirectory() as target:
+        job = GenerationJob(gen_options, meta, target)
+        try:
+            job.run()
+            seed_id = upload_to_db(target, sid, owner, {"race": race, "resources": job.usage})
+        except BaseException as e:
+            if sid:
+                with db_session:
+                    gen = Generation.get(id=sid)
+                    if gen is not None:
+                        gen.state = STATE_ERROR
+                        meta = json.loads(gen.meta)
+                        meta["error"] = (e.__class__.__name__ + ": " + str(e))
+                        meta["resources"] = job.usage
+                        gen.meta = json.dumps(meta)
+                        commit()
+            raise
+    logging.info(f"Generated {seed_id} using {job.usage}")
+    return seed_id
 
 
 @app.route('/wait/<suuid:seed>')
@@ -199,13 +345,13 @@ def wait_seed(seed: UUID):
     return render_template("waitSeed.html", seed_id=seed_id)
 
 
-def upload_to_db(folder, sid, owner, race):
+def upload_to_db(folder, sid, owner, meta: Dict[str, Any]):
     for file in os.listdir(folder):
         file = os.path.join(folder, file)
         if file.endswith(".zip"):
             with db_session:
                 with zipfile.ZipFile(file) as zfile:
-                    res = upload_zip_to_db(zfile, owner, {"race": race}, sid)
+                    res = upload_zip_to_db(zfile, owner, meta, sid)
                 if type(res) == "str":
                     raise Exception(res)
                 elif res:
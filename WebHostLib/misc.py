@@ -173,6 +173,8 @@ def host_room(room: UUID):
                       or room.last_activity < now - datetime.timedelta(seconds=room.timeout))
     with db_session:
         room.last_activity = now  # will trigger a spinup, if it's not already running
+    from .autolauncher import notify_room_activity
+    notify_room_activity(room.id)
 
     browser_tokens = "Mozilla", "Chrome", "Safari"
     automated = ("update" in request.args
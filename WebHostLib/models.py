@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
 from uuid import UUID, uuid4
-from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr
+from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, Json, LongStr
 
 db = Database()
 
@@ -61,3 +61,27 @@ class Generation(db.Entity):
 class GameDataPackage(db.Entity):
     checksum = PrimaryKey(str)
     data = Required(bytes)
+
+
+class DailyGameStats(db.Entity):
+    """Slots of Rooms created per day and game, for /stats"""
+    date = Required(date)
+    game = Required(str)
+    played = Required(int, default=0)
+    PrimaryKey(date, game)
+
+
+class StatsCursor(db.Entity):
+    """Up to which creation_time Rooms have been counted into DailyGameStats"""
+    name = PrimaryKey(str)
+    position = Required(datetime)
+
+
+class TrackerState(db.Entity):
+    """Versions of a Room's save data, bumped by the room's server on every save, for tracker caching.
+    slot_versions maps "team_slot" to the version in which that slot's tracked data last changed.
+    Only holds the id of its Room, rows of deleted Rooms are removed by autolauncher.cleanup."""
+    room_id = PrimaryKey(UUID)
+    version = Required(int, default=0)
+    modified = Required(datetime, default=lambda: datetime.utcnow())
+    slot_versions = Required(Json, default=dict)
@@ -10,25 +10,60 @@ from bokeh.models import HoverTool
 from bokeh.plotting import figure, ColumnDataSource
 from bokeh.resources import INLINE
 from flask import render_template
-from pony.orm import select
+from pony.orm import commit, rollback, select
+from pony.orm.core import TransactionError
 
 from . import app, cache
-from .models import Room
+from .models import DailyGameStats, Room, Slot, StatsCursor
 
 PLOT_WIDTH = 600
-
-
-def get_db_data(known_games: typing.Set[str]) -> typing.Tuple[typing.Counter[str],
-                                                              typing.DefaultDict[datetime.date, typing.Dict[str, int]]]:
+MAX_DAYS = 365
+"""how far back stats are kept track of"""
+
+
+def update_daily_stats() -> None:
+    """Counts the slots of Rooms created since the last update into DailyGameStats."""
+    cursor = StatsCursor.get(name="rooms")
+    # leave a margin for Rooms whose creation has not been committed yet
+    until = datetime.utcnow() - timedelta(minutes=1)
+    if cursor:
+        since = cursor.position
+    else:
+        since = datetime.combine(date.today() - timedelta(days=MAX_DAYS), datetime.min.time())
+    if until <= since:
+        return
+    played: typing.Counter[typing.Tuple[date, str]] = Counter()
+    for creation_time, game in select((room.creation_time, slot.game) for room in Room for slot in Slot
+                                      if slot.seed == room.seed and room.creation_time > since
+                                      and room.creation_time <= until).without_distinct():
+        played[creation_time.date(), game] += 1
+    for (day, game), count in played.items():
+        stats = DailyGameStats.get(date=day, game=game)
+        if stats:
+            stats.played += count
+        else:
+            DailyGameStats(date=day, game=game, played=count)
+    if cursor:
+        cursor.position = until
+    else:
+        StatsCursor(name="rooms", position=until)
+    try:
+        commit()
+    except TransactionError:  # another process updated the stats concurrently
+        rollback()
+
+
+def get_db_data(known_games: typing.Set[str], days: int = 30) -> \
+        typing.Tuple[typing.Counter[str], typing.DefaultDict[datetime.date, typing.Dict[str, int]]]:
+    update_daily_stats()
     games_played = defaultdict(Counter)
     total_games = Counter()
-    cutoff = date.today() - timedelta(days=30)
-    room: Room
-    for room in select(room for room in Room if room.creation_time >= cutoff):
-        for slot in room.seed.slots:
-            if slot.game in known_games:
-                total_games[slot.game] += 1
-                games_played[room.creation_time.date()][slot.game] += 1
+    cutoff = date.today() - timedelta(days=days)
+    stats: DailyGameStats
+    for stats in select(stats for stats in DailyGameStats if stats.date >= cutoff):
+        if stats.game in known_games:
+            total_games[stats.game] += stats.played
+            games_played[stats.date][stats.game] += stats.played
     return total_games, games_played
 
 
@@ -10,12 +10,15 @@ from werkzeug.exceptions import abort
 
 from MultiServer import Context, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
-from Utils import restricted_loads, KeyedDefaultDict
+from Utils import restricted_loads, KeyedDefaultDict, __version__
 from . import app, cache
-from .models import GameDataPackage, Room
+from .blobstore import load_blob
+from .models import GameDataPackage, Room, TrackerState
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
+# Player trackers are cached per version of their slot, so they only expire to free the cache.
+PLAYER_TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60 * 60
 
 _multidata_cache = {}
 _multiworld_trackers: Dict[str, Callable] = {}
@@ -56,7 +59,7 @@ class TrackerData:
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
+        self._multidata = Context.decompress(load_blob(room.seed.multidata))
         self._multisave = restricted_loads(room.multisave) if room.multisave else {}
         self._tracker_cache = {}
 
@@ -280,6 +283,19 @@ class TrackerData:
 
         return last_activity
 
+    @_cache_results
+    def get_room_activity_timestamps(self) -> Dict[TeamPlayer, float]:
+        """Retrieves a dictionary of all players and the UTC timestamp of their last activity.
+        Does not include players who have no activity recorded.
+        """
+        return {(team, player): timestamp
+                for (team, player), timestamp in self._multisave.get("client_activity_timers", [])}
+
+    @_cache_results
+    def get_room_datapackage_checksums(self) -> Dict[str, str]:
+        """Retrieves a dictionary of the data package checksum of each game in this room."""
+        return {game: game_package["checksum"] for game, game_package in self._multidata["datapackage"].items()}
+
     @_cache_results
     def get_room_videos(self) -> Dict[TeamPlayer, Tuple[str, str]]:
         """Retrieves a dictionary of any players who have video streaming enabled and their feeds.
@@ -298,10 +314,30 @@ class TrackerData:
         return self._multidata.get("spheres", [])
 
 
-def _process_if_request_valid(incoming_request, room: Optional[Room]) -> Optional[Response]:
+def get_tracker_version(room: Room, team: Optional[int] = None, player: Optional[int] = None) -> str:
+    """Returns a token that changes whenever the save data shown by the room's trackers changes.
+    If a slot is given, the token only changes when that slot's tracked data changes."""
+    state = TrackerState.get(room_id=room.id)
+    if not state:
+        # room was not saved since versions were introduced
+        return f"{__version__}-a{room.last_activity.timestamp():.0f}"
+    if player is None:
+        return f"{__version__}-{state.version}"
+    return f"{__version__}-s{state.slot_versions.get(f'{team}_{player}', 0)}"
+
+
+def _process_if_request_valid(incoming_request, room: Optional[Room], etag: Optional[str] = None) \
+        -> Optional[Response]:
     if not room:
         abort(404)
 
+    if incoming_request.if_none_match:
+        if etag and incoming_request.if_none_match.contains(etag):
+            response = make_response("", 304)
+            response.set_etag(etag)
+            return response
+        return None
+
     if_modified = incoming_request.headers.get("If-Modified-Since", None)
     if if_modified:
         if_modified = parsedate_to_datetime(if_modified)
@@ -312,22 +348,28 @@ def _process_if_request_valid(incoming_request, room: Optional[Room]) -> Optiona
 
 @app.route("/tracker/<suuid:tracker>/<int:tracked_team>/<int:tracked_player>")
 def get_player_tracker(tracker: UUID, tracked_team: int, tracked_player: int, generic: bool = False) -> Response:
-    key = f"{tracker}_{tracked_team}_{tracked_player}_{generic}"
-    response: Optional[Response] = cache.get(key)
-    if response:
-        return response
-
     # Room must exist.
     room = Room.get(tracker=tracker)
+    if not room:
+        abort(404)
 
-    response = _process_if_request_valid(request, room)
+    # the page only depends on the tracked slot's data, so it stays valid while other slots progress
+    version = get_tracker_version(room, tracked_team, tracked_player)
+    etag = f"{version}-{generic:d}"
+    response = _process_if_request_valid(request, room, etag)
     if response:
         return response
 
-    timeout, last_modified, tracker_page = get_timeout_and_player_tracker(room, tracked_team, tracked_player, generic)
+    key = f"{tracker}_{tracked_team}_{tracked_player}_{generic}_{version}"
+    response: Optional[Response] = cache.get(key)
+    if response:
+        return response
+
+    _, last_modified, tracker_page = get_timeout_and_player_tracker(room, tracked_team, tracked_player, generic)
     response = make_response(tracker_page)
     response.last_modified = last_modified
-    cache.set(key, response, timeout)
+    response.set_etag(etag)
+    cache.set(key, response, PLAYER_TRACKER_CACHE_TIMEOUT_IN_SECONDS)
     return response
 
 
@@ -354,21 +396,28 @@ def get_generic_game_tracker(tracker: UUID, tracked_team: int, tracked_player: i
 @app.route("/tracker/<suuid:tracker>", defaults={"game": "Generic"})
 @app.route("/tracker/<suuid:tracker>/<game>")
 def get_multiworld_tracker(tracker: UUID, game: str) -> Response:
-    key = f"{tracker}_{game}"
-    response: Optional[Response] = cache.get(key)
-    if response:
-        return response
-
     # Room must exist.
     room = Room.get(tracker=tracker)
+    if not room:
+        abort(404)
 
-    response = _process_if_request_valid(request, room)
+    # The page is rendered again as a whole whenever any slot changed. Composing it from cached per-slot fragments
+    # is out of scope, as the game specific multiworld trackers render all of their slots in one template.
+    version = get_tracker_version(room)
+    key = f"{tracker}_{game}_{version}"
+    response: Optional[Response] = cache.get(key)
+    # activity timers are relative to the time of rendering, so the ETag is only valid while the render is cached
+    etag = response.get_etag()[0] if response else None
+    not_modified = _process_if_request_valid(request, room, etag)
+    if not_modified:
+        return not_modified
     if response:
         return response
 
     timeout, last_modified, tracker_page = get_timeout_and_multiworld_tracker(room, game)
     response = make_response(tracker_page)
     response.last_modified = last_modified
+    response.set_etag(f"{version}-{datetime.datetime.utcnow().timestamp():.0f}")
     cache.set(key, response, timeout)
     return response
 
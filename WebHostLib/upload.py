@@ -4,7 +4,6 @@ import pickle
 import typing
 import uuid
 import zipfile
-import zlib
 
 from io import BytesIO
 from flask import request, flash, redirect, url_for, session, render_template, abort
@@ -15,11 +14,12 @@ import schema
 
 import MultiServer
 from NetUtils import SlotType
-from Utils import VersionException, __version__
-from worlds import GamesPackage
+from Utils import VersionException, __version__, dump_multidata
+from worlds import GamesPackage, network_data_package
 from worlds.Files import AutoPatchRegister
 from worlds.AutoWorld import data_package_checksum
 from . import app
+from .blobstore import store_blob
 from .models import Seed, Room, Slot, GameDataPackage
 
 banned_extensions = (".sfc", ".z64", ".n64", ".nes", ".smc", ".sms", ".gb", ".gbc", ".gba")
@@ -48,17 +48,38 @@ def banned_file(filename: str) -> bool:
     return filename.endswith(banned_extensions)
 
 
+def store_static_data_package(game: str, checksum: str) -> None:
+    """Makes sure a data package referenced only by its checksum is in the database,
+    taking it from the installed worlds if it is missing."""
+    if GameDataPackage.exists(checksum=checksum):
+        return
+    game_data = network_data_package["games"].get(game, {})
+    if game_data.get("checksum") != checksum:
+        raise Exception(f"Data package {checksum} for game {game} is neither embedded nor known to this host.")
+    GameDataPackage(checksum=checksum, data=pickle.dumps(game_data))
+    try:
+        commit()  # commit game data package
+    except TransactionIntegrityError:
+        rollback()
+
+
 def process_multidata(compressed_multidata, files={}):
     game_data: GamesPackage
 
     decompressed_multidata = MultiServer.Context.decompress(compressed_multidata)
+    # only multidata that had data packages stripped needs to be compressed again
+    modified = False
 
     slots: typing.Set[Slot] = set()
     if "datapackage" in decompressed_multidata:
         # strip datapackage from multidata, leaving only the checksums
         game_data_packages: typing.List[GameDataPackage] = []
         for game, game_data in decompressed_multidata["datapackage"].items():
-            if game_data.get("checksum"):
+            if game_data.keys() <= {"version", "checksum"} and game_data.get("checksum"):
+                # already stripped, for example by WebHost generation
+                store_static_data_package(game, game_data["checksum"])
+            elif game_data.get("checksum"):
+                modified = True
                 original_checksum = game_data.pop("checksum")
                 game_data = games_package_schema.validate(game_data)
                 game_data = {key: value for key, value in sorted(game_data.items())}
@@ -86,13 +107,15 @@ def process_multidata(compressed_multidata, files={}):
             # Ignore Player Groups (e.g. item links)
             if slot_info.type == SlotType.group:
                 continue
-            slots.add(Slot(data=files.get(slot, None),
+            slots.add(Slot(data=store_blob(files.get(slot, None)),
                            player_name=slot_info.name,
                            player_id=slot,
                            game=slot_info.game))
         flush()  # commit slots
 
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
+    if modified:
+        # sections that were never accessed are copied over without being decompressed
+        compressed_multidata = dump_multidata(decompressed_multidata)
     return slots, compressed_multidata
 
 
@@ -165,7 +188,7 @@ def upload_zip_to_db(zfile: zipfile.ZipFile, owner=None, meta={"race": False}, s
     if multidata:
         slots, multidata = process_multidata(multidata, files)
 
-        seed = Seed(multidata=multidata, spoiler=spoiler, slots=slots, owner=owner, meta=json.dumps(meta),
+        seed = Seed(multidata=store_blob(multidata), spoiler=spoiler, slots=slots, owner=owner, meta=json.dumps(meta),
                     id=sid if sid else uuid.uuid4())
         flush()  # create seed
         for slot in slots:
@@ -209,7 +232,7 @@ def uploads():
                     except Exception as e:
                         flash(f"Could not load multidata. File may be corrupted or incompatible. ({e})")
                     else:
-                        seed = Seed(multidata=multidata, slots=slots, owner=session["_id"])
+                        seed = Seed(multidata=store_blob(multidata), slots=slots, owner=session["_id"])
                         flush()  # place into DB and generate ids
                         return redirect(url_for("view_seed", seed=seed.id))
             else:
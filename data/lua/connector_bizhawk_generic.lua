@@ -20,7 +20,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 ]]
 
-local SCRIPT_VERSION = 1
+local SCRIPT_VERSION = 2
 
 -- Set to log incoming requests
 -- Will cause lag due to large console output
@@ -37,6 +37,17 @@ field `type`. The value of `type` determines what other fields may exist.
 To get the script version, instead of JSON, send "VERSION" to get the script
 version directly (e.g. "2").
 
+A list of requests can also be sent as an object with an `id` and the list as
+`requests`. Its responses are then sent as an object with the same `id` and
+the list of responses as `responses`. This lets a client send more lists of
+requests without waiting for the responses to earlier ones. All lists of
+requests that arrived by a frame are handled on that frame, in the order they
+were sent.
+
+Memory watches registered with `WATCH` are checked at the end of every frame.
+The bytes that changed since the last check are sent without a request, as a
+`WATCH_UPDATE` object (not inside a list), see Ex. 5.
+
 #### Ex. 1
 
 Request: `[{"type": "PING"}]`
@@ -97,6 +108,28 @@ Response:
 
 ---
 
+#### Ex. 5
+
+Request:
+
+```json
+{"id": 7, "requests": [{"type": "WATCH", "address": 500, "size": 4, "domain": "RAM"}]}
+```
+
+Response:
+
+```json
+{"id": 7, "responses": [{"type": "WATCH_RESPONSE", "watch": 1, "value": "dGVzdA=="}]}
+```
+
+After the second byte of the watched memory changed to 0:
+
+```json
+{"type": "WATCH_UPDATE", "changes": [[1, 1, "AA=="]]}
+```
+
+---
+
 ### Supported Request Types
 
 - `PING`  
@@ -170,6 +203,27 @@ Response:
     - `domain` (`string`): The name of the memory domain the address
     corresponds to
 
+- `WATCH`  
+    Starts watching an array of bytes at the provided address. Changes to
+    it are sent in `WATCH_UPDATE` messages until it is unwatched or the
+    client disconnects.
+
+    Expected Response Type: `WATCH_RESPONSE`
+
+    Additional Fields:
+    - `address` (`int`): The address of the memory to watch
+    - `size` (`int`): The number of bytes to watch
+    - `domain` (`string`): The name of the memory domain the address
+    corresponds to
+
+- `UNWATCH`  
+    Stops watching memory.
+
+    Expected Response Type: `UNWATCH_RESPONSE`
+
+    Additional Fields:
+    - `watch` (`int`): The id of the watch from its `WATCH_RESPONSE`
+
 - `DISPLAY_MESSAGE`  
     Adds a message to the message queue which will be displayed using
     `gui.addmessage` according to the message interval.
@@ -240,6 +294,17 @@ Response:
 - `WRITE_RESPONSE`  
     Acknowledges `WRITE`.
 
+- `WATCH_RESPONSE`  
+    Contains the id of a new watch and the current data of its memory.
+
+    Additional Fields:
+    - `watch` (`int`): The id of the watch, used in `WATCH_UPDATE` and
+    `UNWATCH`
+    - `value` (`string`): A base64 string representing the watched data
+
+- `UNWATCH_RESPONSE`  
+    Acknowledges `UNWATCH`.
+
 - `DISPLAY_MESSAGE_RESPONSE`  
     Acknowledges `DISPLAY_MESSAGE`.
 
@@ -251,6 +316,16 @@ Response:
 
     Additional Fields:
     - `err` (`string`): A description of the problem
+
+### Messages Sent Without Request
+
+- `WATCH_UPDATE`  
+    Contains the bytes of watched memory that changed during the last frame.
+
+    Additional Fields:
+    - `changes` (`[[int, int, string]]`): For every run of changed bytes,
+    the id of its watch, the offset of the run from the watch's address and
+    a base64 string representing the new data of the run
 ]]
 
 local bizhawk_version = client.getversion()
@@ -297,6 +372,9 @@ local locked = false
 
 local rom_hash = nil
 
+local watches = {}
+local next_watch_id = 0
+
 function queue_push (self, value)
     self[self.right] = value
     self.right = self.right + 1
@@ -432,6 +510,29 @@ request_handlers = {
         return res
     end,
 
+    ["WATCH"] = function (req)
+        local res = {}
+        local data = memory.read_bytes_as_array(req["address"], req["size"], req["domain"])
+
+        next_watch_id = next_watch_id + 1
+        watches[next_watch_id] = {address = req["address"], size = req["size"], domain = req["domain"], value = data}
+
+        res["type"] = "WATCH_RESPONSE"
+        res["watch"] = next_watch_id
+        res["value"] = base64.encode(data)
+
+        return res
+    end,
+
+    ["UNWATCH"] = function (req)
+        local res = {}
+
+        res["type"] = "UNWATCH_RESPONSE"
+        watches[req["watch"]] = nil
+
+        return res
+    end,
+
     ["DISPLAY_MESSAGE"] = function (req)
         local res = {}
 
@@ -468,7 +569,60 @@ function process_request (req)
     end
 end
 
--- Receive data from AP client and send message back
+function process_requests (data)
+    local res = {}
+    local failed_guard_response = nil
+    for i, req in ipairs(data) do
+        if failed_guard_response ~= nil then
+            res[i] = failed_guard_response
+        else
+            -- An error is more likely to cause an NLua exception than to return an error here
+            local status, response = pcall(process_request, req)
+            if status then
+                res[i] = response
+
+                -- If the GUARD validation failed, skip the remaining commands
+                if response["type"] == "GUARD_RESPONSE" and not response["value"] then
+                    failed_guard_response = response
+                end
+            else
+                if type(response) ~= "string" then response = "Unknown error" end
+                res[i] = {type = "ERROR", err = response}
+            end
+        end
+    end
+    return res
+end
+
+-- Send the changed runs of bytes of all watched memory
+function send_watch_updates ()
+    local changes = {}
+    for watch_id, watch in pairs(watches) do
+        local data = memory.read_bytes_as_array(watch.address, watch.size, watch.domain)
+        local run_start = nil
+        for i = 1, watch.size + 1 do
+            if i <= watch.size and data[i] ~= watch.value[i] then
+                if run_start == nil then
+                    run_start = i
+                end
+            elseif run_start ~= nil then
+                local run = {}
+                for j = run_start, i - 1 do
+                    run[#run + 1] = data[j]
+                end
+                changes[#changes + 1] = {watch_id, run_start - 1, base64.encode(run)}
+                run_start = nil
+            end
+        end
+        watch.value = data
+    end
+
+    if #changes > 0 then
+        client_socket:send(json.encode({type = "WATCH_UPDATE", changes = changes}).."\n")
+    end
+end
+
+-- Receive data from AP client and send message back, returns whether a message was received
 function send_receive ()
     local message, err = client_socket:receive()
 
@@ -478,15 +632,15 @@ function send_receive ()
             print("Connection to client closed")
         end
         current_state = STATE_NOT_CONNECTED
-        return
+        return false
     elseif err == "timeout" then
         unlock()
-        return
+        return false
     elseif err ~= nil then
         print(err)
         current_state = STATE_NOT_CONNECTED
         unlock()
-        return
+        return false
     end
 
     -- Reset timeout timer
@@ -500,31 +654,15 @@ function send_receive ()
     if message == "VERSION" then
         client_socket:send(tostring(SCRIPT_VERSION).."\n")
     else
-        local res = {}
         local data = json.decode(message)
-        local failed_guard_response = nil
-        for i, req in ipairs(data) do
-            if failed_guard_response ~= nil then
-                res[i] = failed_guard_response
-            else
-                -- An error is more likely to cause an NLua exception than to return an error here
-                local status, response = pcall(process_request, req)
-                if status then
-                    res[i] = response
-
-                    -- If the GUARD validation failed, skip the remaining commands
-                    if response["type"] == "GUARD_RESPONSE" and not response["value"] then
-                        failed_guard_response = response
-                    end
-                else
-                    if type(response) ~= "string" then response = "Unknown error" end
-                    res[i] = {type = "ERROR", err = response}
-                end
-            end
+        if data["requests"] ~= nil then
+            client_socket:send(json.encode({id = data["id"], responses = process_requests(data["requests"])}).."\n")
+        else
+            client_socket:send(json.encode(process_requests(data)).."\n")
         end
-
-        client_socket:send(json.encode(res).."\n")
     end
+
+    return true
 end
 
 function initialize_server ()
@@ -584,15 +722,22 @@ function main ()
                     print("Client connected")
                     current_state = STATE_CONNECTED
                     client_socket = client
+                    watches = {}
                     server:close()
                     server = nil
                     client_socket:settimeout(0)
                 end
             end
         else
+            -- handle every message that arrived, clients may send more before getting responses
+            local received
             repeat
-                send_receive()
-            until not locked
+                received = send_receive()
+            until not locked and not received
+
+            if current_state == STATE_CONNECTED then
+                send_watch_updates()
+            end
 
             if timeout_timer <= 0 then
                 print("Client timed out")
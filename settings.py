@@ -586,6 +586,12 @@ class ServerOptions(Group):
         OFF = 0
         ON = 1
 
+    class MetricsPort(int):
+        """
+        Serve runtime metrics of the server, such as message counts and event loop lag,
+        at http://127.0.0.1:<port>/metrics for a local Prometheus to scrape. 0 to disable
+        """
+
     host: Optional[str] = None
     port: int = 38281
     password: Optional[str] = None
@@ -603,6 +609,7 @@ class ServerOptions(Group):
     auto_shutdown: AutoShutdown = AutoShutdown(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
+    metrics_port: MetricsPort = MetricsPort(0)
 
 
 class GeneratorOptions(Group):
@@ -662,6 +669,12 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class RollWorkers(int):
+        """
+        Processes used to read and roll player files in parallel, 0 or 1 rolls them in the generator's process.
+        The rolled options are the same either way. Pays off for hundreds of player files.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -671,6 +684,7 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    roll_workers: RollWorkers = RollWorkers(0)
 
 
 class SNIOptions(Group):
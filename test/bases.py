@@ -20,7 +20,7 @@ class TestBase(unittest.TestCase):
     def get_state(self, items):
         if (self.multiworld, tuple(items)) in self._state_cache:
             return self._state_cache[self.multiworld, tuple(items)]
-        state = CollectionState(self.multiworld)
+        state = CollectionState(self.multiworld, track_paths=True)
         for item in items:
             item.classification = ItemClassification.progression
             state.collect(item, prevent_sweep=True)
@@ -249,7 +249,7 @@ class WorldTestBase(unittest.TestCase):
          one of the provided combinations"""
         all_items = [item_name for item_names in possible_items for item_name in item_names]
 
-        state = CollectionState(self.multiworld)
+        state = CollectionState(self.multiworld, track_paths=True)
         self.collect_all_but(all_items, state)
         if only_check_listed:
             for location in locations:
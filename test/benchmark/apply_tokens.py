@@ -0,0 +1,87 @@
+from typing import Dict
+
+
+class TokenFile:
+    def __init__(self, files: Dict[str, bytes]) -> None:
+        self.files = files
+
+    def get_file(self, file: str) -> bytes:
+        return self.files[file]
+
+
+def apply_tokens_per_token(rom: bytes, token_data: bytes) -> bytes:
+    """Applies every token on its own, how tokens have always been applied"""
+    from worlds.Files import APTokenTypes
+
+    rom_data = bytearray(rom)
+    token_count = int.from_bytes(token_data[0:4], "little")
+    bpr = 4
+    for _ in range(token_count):
+        token_type = token_data[bpr]
+        offset = int.from_bytes(token_data[bpr + 1:bpr + 5], "little")
+        size = int.from_bytes(token_data[bpr + 5:bpr + 9], "little")
+        data = token_data[bpr + 9:bpr + 9 + size]
+        if token_type == APTokenTypes.AND_8:
+            rom_data[offset] &= data[0]
+        elif token_type == APTokenTypes.OR_8:
+            rom_data[offset] |= data[0]
+        elif token_type == APTokenTypes.XOR_8:
+            rom_data[offset] ^= data[0]
+        elif token_type in (APTokenTypes.COPY, APTokenTypes.RLE):
+            length = int.from_bytes(data[:4], "little")
+            value = int.from_bytes(data[4:], "little")
+            if token_type == APTokenTypes.COPY:
+                rom_data[offset:offset + length] = rom_data[value:value + length]
+            else:
+                rom_data[offset:offset + length] = bytes([value] * length)
+        else:
+            rom_data[offset:offset + len(data)] = data
+        bpr += 9 + size
+    return bytes(rom_data)
+
+
+def run_apply_tokens_benchmark(token_count: int = 50000, rom_size: int = 2 * 1024 * 1024, rounds: int = 5):
+    """Times applying a synthetic token file resembling a large patch:
+    mostly single byte writes, partly to consecutive bytes, with some bitwise, COPY and RLE tokens in between."""
+    import logging
+    import random
+
+    from Utils import init_logging
+    from worlds.Files import APPatchExtension, APTokenMixin, APTokenTypes
+    from time_it import TimeIt
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    rng = random.Random(0)
+    rom = rng.getrandbits(8 * rom_size).to_bytes(rom_size, "little")
+    tokens = APTokenMixin()
+    offset = 0
+    for _ in range(token_count):
+        offset = offset + 1 if rng.random() < 0.8 else rng.randrange(rom_size - 16)
+        roll = rng.random()
+        if roll < 0.85:
+            tokens.write_token(APTokenTypes.WRITE, offset, bytes((rng.randrange(256),)))
+        elif roll < 0.95:
+            tokens.write_token(rng.choice((APTokenTypes.AND_8, APTokenTypes.OR_8, APTokenTypes.XOR_8)), offset,
+                               rng.randrange(256))
+        elif roll < 0.98:
+            tokens.write_token(APTokenTypes.RLE, offset, (8, 0))
+        else:
+            tokens.write_token(APTokenTypes.COPY, offset, (8, rng.randrange(rom_size - 8)))
+    token_data = tokens.get_token_binary()
+    caller = TokenFile({"token_data.bin": token_data})
+
+    with TimeIt(f"{rounds} rounds of applying {token_count} tokens in runs", logger):
+        for _ in range(rounds):
+            result = APPatchExtension.apply_tokens(caller, rom, "token_data.bin")  # type: ignore
+    with TimeIt(f"{rounds} rounds of applying {token_count} tokens one by one", logger):
+        for _ in range(rounds):
+            expected = apply_tokens_per_token(rom, token_data)
+    assert result == expected
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_apply_tokens_benchmark()
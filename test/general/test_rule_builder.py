@@ -0,0 +1,95 @@
+import unittest
+
+from BaseClasses import CollectionState, Location, MultiWorld, Region
+from test.general import generate_test_multiworld
+from worlds.generic.Rules import add_rule, set_rule
+from worlds.generic.RuleBuilder import (And, CanReach, False_, Has, HasAll, HasAny, HasFromList, HasGroup, Or, True_,
+                                        get_item_dependencies, register_region_dependencies)
+
+
+class TestRuleBuilder(unittest.TestCase):
+    multiworld: MultiWorld
+    player: int = 1
+
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.state = CollectionState(self.multiworld)
+
+    def test_simplification(self) -> None:
+        """Tests that combining rules flattens, merges and drops constants"""
+        self.assertEqual(Has("A", 1) & True_, Has("A", 1))
+        self.assertIs(Has("A", 1) & False_, False_)
+        self.assertIs(Has("A", 1) | True_, True_)
+        self.assertEqual(Has("A", 1) & Has("B", 1) & Has("A", 1), HasAll(("A", "B"), 1))
+        self.assertEqual(Has("A", 1) | Has("B", 1), HasAny(("A", "B"), 1))
+        self.assertEqual(Has("A", 1, 2) & Has("A", 1, 3), Has("A", 1, 3))
+        self.assertEqual(Has("A", 1, 2) | Has("A", 1, 3), Has("A", 1, 2))
+        self.assertIsInstance(Has("A", 1) & CanReach("Region", 1), And)
+        self.assertIsInstance(Has("A", 1, 2) | CanReach("Region", 1), Or)
+
+    def test_dependencies(self) -> None:
+        rule = (Has("A", 1) & CanReach("Cave", 1)) | HasFromList(("B", "C"), 2, 2)
+        self.assertEqual(rule.item_dependencies, {1: frozenset({"A"}), 2: frozenset({"B", "C"})})
+        self.assertEqual(rule.region_dependencies, {1: frozenset({"Cave"})})
+
+        rule = Has("A", 1) & HasGroup("Everything", 1)
+        self.assertEqual(rule.group_dependencies, {1: frozenset({"Everything"})})
+        items = get_item_dependencies(self.multiworld, rule)[1]
+        self.assertIn("A", items)
+        self.assertTrue(self.multiworld.worlds[1].item_name_groups["Everything"] <= items)
+
+    def test_multiple_multiworlds(self) -> None:
+        """Tests that a rule evaluated for another multiworld does not use what it resolved for the first one"""
+        rule = Has("B", self.player)
+        self.multiworld.item_name_indexes[self.multiworld.game[self.player]].intern("A")
+        self.state.prog_items[self.player]["B"] = 1
+        self.assertTrue(rule(self.state))
+
+        # interned in the opposite order, so "B" of the first multiworld has the index of "A" here
+        other = generate_test_multiworld()
+        other_state = CollectionState(other)
+        other.item_name_indexes[other.game[self.player]].intern("B")
+        other_state.prog_items[self.player]["A"] = 1
+        self.assertFalse(rule(other_state))
+        other_state.prog_items[self.player]["B"] = 1
+        self.assertTrue(rule(other_state))
+
+    def test_evaluation(self) -> None:
+        """Tests that compiled rules agree with the equivalent CollectionState helpers"""
+        rules = {
+            Has("A", 1, 2): lambda state: state.has("A", 1, 2),
+            HasAll(("A", "B"), 1): lambda state: state.has_all(("A", "B"), 1),
+            HasAny(("B", "C"), 1): lambda state: state.has_any(("B", "C"), 1),
+            HasFromList(("A", "B", "C"), 1, 3): lambda state: state.has_from_list(("A", "B", "C"), 1, 3),
+            HasFromList(("A", "B", "C"), 1, 2, True): lambda state: state.has_from_list_unique(("A", "B", "C"), 1, 2),
+        }
+        for collected in ("A", "C", "A", "B"):
+            self.state.prog_items[self.player][collected] += 1
+            for rule, expected in rules.items():
+                with self.subTest(rule=rule, collected=dict(self.state.prog_items[self.player])):
+                    self.assertEqual(rule(self.state), expected(self.state))
+
+    def test_regions(self) -> None:
+        menu = self.multiworld.get_region("Menu", self.player)
+        cave = Region("Cave", self.player, self.multiworld)
+        self.multiworld.regions.append(cave)
+        entrance = menu.connect(cave, "Cave Entrance", Has("Lamp", self.player))
+        location = Location(self.player, "Chest", None, menu)
+        menu.locations.append(location)
+        set_rule(location, CanReach("Cave", self.player))
+        register_region_dependencies(self.multiworld, entrance, location.access_rule)
+        self.assertEqual(self.multiworld.indirect_connections[cave], {entrance})
+
+        self.assertFalse(location.can_reach(self.state))
+        self.state.prog_items[self.player]["Lamp"] = 1
+        self.state.stale[self.player] = True
+        self.assertTrue(location.can_reach(self.state))
+
+    def test_add_rule(self) -> None:
+        """Tests that add_rule keeps combined declarative rules introspectable"""
+        location = Location(self.player, "Chest")
+        set_rule(location, Has("A", self.player))
+        add_rule(location, Has("B", self.player))
+        self.assertEqual(location.access_rule, HasAll(("B", "A"), self.player))
+        add_rule(location, CanReach("Menu", self.player), "or")
+        self.assertIsInstance(location.access_rule, Or)
@@ -0,0 +1,112 @@
+import unittest
+
+from BaseClasses import CollectionState, ItemCounts, ItemNameIndex, MultiWorld, Region
+from test.general import generate_test_multiworld
+
+
+class TestItemCounts(unittest.TestCase):
+    def test_mapping_behavior(self) -> None:
+        """Tests that ItemCounts behaves like the Counter it replaced for name-based access"""
+        counts = ItemCounts(ItemNameIndex())
+        self.assertEqual(counts["Missing"], 0)
+        self.assertNotIn("Missing", counts)
+        counts["Sword"] += 1
+        counts["Sword"] += 1
+        counts["Shield"] = 3
+        self.assertEqual(counts["Sword"], 2)
+        self.assertEqual(dict(counts), {"Sword": 2, "Shield": 3})
+        self.assertEqual(len(counts), 2)
+        self.assertEqual(counts.total(), 5)
+        counts.update({"Sword": 1}, Bow=2)
+        self.assertEqual(counts["Sword"], 3)
+        self.assertEqual(counts.get("Bow"), 2)
+        del counts["Sword"]
+        del counts["Never Collected"]
+        self.assertNotIn("Sword", counts)
+        self.assertEqual(counts.get("Sword", 0), 0)
+        counts.clear()
+        self.assertEqual(len(counts), 0)
+        counts["Soul"] += 0.5
+        self.assertEqual(counts["Soul"], 0.5)
+
+    def test_shared_index(self) -> None:
+        """Tests that names interned through another player's counts read as 0 instead of going out of bounds"""
+        index = ItemNameIndex()
+        first = ItemCounts(index)
+        second = ItemCounts(index)
+        second["Late Item"] = 1
+        first["Early Item"] = 1
+        second["Newest Item"] = 1
+        self.assertEqual(first["Newest Item"], 0)
+        self.assertEqual(first["Late Item"], 0)
+        self.assertEqual(second["Early Item"], 0)
+        self.assertEqual(index.intern("Late Item"), 0)
+
+    def test_copy_independent(self) -> None:
+        counts = ItemCounts(ItemNameIndex())
+        counts["Sword"] = 1
+        copy = counts.copy()
+        copy["Sword"] += 1
+        self.assertEqual(counts["Sword"], 1)
+        self.assertEqual(copy["Sword"], 2)
+        self.assertEqual(counts, {"Sword": 1})
+
+
+class TestCollectionStateCounts(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = MultiWorld(2)
+        self.multiworld.game = {1: "Game A", 2: "Game A"}
+        self.state = CollectionState(self.multiworld)
+
+    def test_has_helpers(self) -> None:
+        self.state.prog_items[1]["Sword"] = 2
+        self.state.prog_items[1]["Shield"] = 1
+        self.state.prog_items[2]["Bow"] = 1
+        self.assertTrue(self.state.has("Sword", 1, 2))
+        self.assertFalse(self.state.has("Sword", 1, 3))
+        self.assertFalse(self.state.has("Bow", 1))
+        self.assertTrue(self.state.has_all(("Sword", "Shield"), 1))
+        self.assertFalse(self.state.has_all(("Sword", "Bow"), 1))
+        self.assertTrue(self.state.has_any(("Bow", "Shield"), 1))
+        self.assertFalse(self.state.has_any(("Bow", "Unknown"), 1))
+        self.assertEqual(self.state.count("Sword", 1), 2)
+        self.assertEqual(self.state.count("Unknown", 1), 0)
+        self.assertTrue(self.state.has_from_list(("Unknown", "Sword", "Shield"), 1, 3))
+        self.assertFalse(self.state.has_from_list_unique(("Unknown", "Sword", "Shield"), 1, 3))
+        self.assertEqual(self.state.count_from_list(("Sword", "Shield", "Bow"), 1), 3)
+        self.assertEqual(self.state.count_from_list_unique(("Sword", "Shield", "Bow"), 1), 2)
+        self.assertTrue(self.state.has_all_counts({"Sword": 2, "Shield": 1}, 1))
+        self.assertFalse(self.state.has_any_count({"Sword": 3, "Bow": 1}, 1))
+
+    def test_copy(self) -> None:
+        self.state.prog_items[1]["Sword"] = 1
+        copy = self.state.copy()
+        copy.prog_items[1]["Sword"] += 1
+        copy.prog_items[2]["Bow"] += 1
+        self.assertEqual(self.state.count("Sword", 1), 1)
+        self.assertEqual(self.state.count("Bow", 2), 0)
+        self.assertEqual(copy.count("Sword", 1), 2)
+        self.assertEqual(copy.count("Bow", 2), 1)
+
+
+class TestCollectionStatePaths(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        menu = self.multiworld.get_region("Menu", 1)
+        self.cave = Region("Cave", 1, self.multiworld)
+        self.multiworld.regions.append(self.cave)
+        self.entrance = menu.connect(self.cave, "Cave Entrance")
+
+    def test_paths_off_by_default(self) -> None:
+        state = CollectionState(self.multiworld)
+        self.assertTrue(state.can_reach_region("Cave", 1))
+        self.assertEqual(state.path, {})
+        self.assertEqual(state.copy().path, {})
+
+    def test_track_paths(self) -> None:
+        state = CollectionState(self.multiworld, track_paths=True)
+        self.assertTrue(state.can_reach_region("Cave", 1))
+        self.assertEqual(state.path[self.cave], ("Cave", ("Cave Entrance", ("Menu", None))))
+        copy = state.copy()
+        self.assertTrue(copy.track_paths)
+        self.assertEqual(copy.path, state.path)
@@ -0,0 +1,37 @@
+import random
+import unittest
+
+from test.benchmark.apply_tokens import TokenFile, apply_tokens_per_token
+from worlds.Files import APPatchExtension, APTokenMixin, APTokenTypes
+
+
+def random_tokens(rng: random.Random, rom_size: int, count: int) -> APTokenMixin:
+    """Tokens of all types, partly on consecutive or the same bytes"""
+    tokens = APTokenMixin()
+    offset = 0
+    for _ in range(count):
+        offset = offset + rng.choice((1, 1, 2)) if rng.random() < 0.7 else rng.randrange(rom_size - 16)
+        offset %= rom_size - 16
+        token_type = rng.choice(list(APTokenTypes))
+        if token_type == APTokenTypes.WRITE:
+            size = rng.randint(1, 3)
+            tokens.write_token(token_type, offset, rng.getrandbits(8 * size).to_bytes(size, "little"))
+        elif token_type == APTokenTypes.COPY:
+            tokens.write_token(token_type, offset, (rng.randint(1, 8), rng.randrange(rom_size - 8)))
+        elif token_type == APTokenTypes.RLE:
+            tokens.write_token(token_type, offset, (rng.randint(1, 8), rng.randrange(256)))
+        else:
+            tokens.write_token(token_type, offset, rng.randrange(256))
+    return tokens
+
+
+class TestApplyTokens(unittest.TestCase):
+    def test_same_result(self) -> None:
+        """Tests that tokens applied in runs give the same file as tokens applied one by one"""
+        rng = random.Random(42)
+        for _ in range(20):
+            rom = rng.getrandbits(8 * 512).to_bytes(512, "little")
+            token_data = random_tokens(rng, len(rom), 300).get_token_binary()
+            caller = TokenFile({"token_data.bin": token_data})
+            self.assertEqual(APPatchExtension.apply_tokens(caller, rom, "token_data.bin"),  # type: ignore
+                             apply_tokens_per_token(rom, token_data))
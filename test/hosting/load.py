@@ -0,0 +1,356 @@
+# Load test for MultiServer and the WebHost room host (customserver).
+# This spawns processes and opens many connections, so this is not run as part of unit testing.
+# Run with `python -m test.hosting.load --players 100 --clients 1000 --duration 60`, see --help for all options.
+# Exits with 1 if any action failed or --max-p99 was exceeded, so it can be scripted in CI.
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "LoadClient",
+    "LoadStats",
+    "run_load",
+]
+
+ACTIONS: Sequence[Tuple[str, float]] = (
+    ("LocationChecks", 3),
+    ("Say", 1),
+    ("Bounce", 2),
+    ("Get", 3),
+    ("Set", 3),
+    ("Reconnect", 0.1),
+)
+"""actions a client takes and their relative weight"""
+
+
+def get_rss(pid: int, children_only: bool = False) -> Optional[int]:
+    """Resident memory of a process and its children in bytes, if it can be determined"""
+    try:
+        import psutil
+    except ImportError:
+        if children_only:
+            return None
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            return None
+    try:
+        process = psutil.Process(pid)
+        processes = process.children(recursive=True)
+        if not children_only:
+            processes.append(process)
+        return sum(p.memory_info().rss for p in processes)
+    except psutil.Error:
+        return None
+
+
+def percentile(values: List[float], p: float) -> float:
+    """values have to be sorted"""
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+class LoadStats:
+    latencies: Dict[str, List[float]]
+    errors: Counter
+    first_errors: Dict[str, str]
+    rss: List[int]
+
+    def __init__(self) -> None:
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.first_errors = {}
+        self.rss = []
+
+    def record(self, action: str, latency: float) -> None:
+        self.latencies[action].append(latency)
+
+    def record_error(self, action: str, error: BaseException) -> None:
+        self.errors[action] += 1
+        self.first_errors.setdefault(action, f"{type(error).__name__}: {error}")
+
+    def report(self, duration: float) -> Dict[str, Any]:
+        actions = {}
+        for action in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies[action])
+            actions[action] = {
+                "count": len(latencies),
+                "errors": self.errors[action],
+                **{f"p{int(p * 100)}_ms": percentile(latencies, p) * 1000 for p in (.5, .9, .99)},
+                "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+                "first_error": self.first_errors.get(action),
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "duration": duration,
+            "actions": actions,
+            "throughput": total / duration if duration else 0.0,
+            "errors": sum(self.errors.values()),
+            "rss_start": self.rss[0] if self.rss else None,
+            "rss_peak": max(self.rss) if self.rss else None,
+            "rss_end": self.rss[-1] if self.rss else None,
+        }
+
+
+class LoadClient:
+    """Minimal asyncio client for the AP network protocol, replaying traffic of a connected game client.
+    Each action is followed by a Get, which the server answers after processing the action,
+    to measure the latency of commands that have no reply of their own."""
+
+    timeout = 30.0
+
+    def __init__(self, address: str, game: str, slot: int, stats: LoadStats, rng: random.Random,
+                 deathlink: bool = False) -> None:
+        self.address = address
+        self.game = game
+        self.slot = slot
+        self.stats = stats
+        self.rng = rng
+        self.tags = ["DeathLink"] if deathlink else []
+        self.locations: List[int] = []
+        self._ws: Any = None
+        self._reader: Optional["asyncio.Task[None]"] = None
+        self._pending: Dict[int, "asyncio.Future[None]"] = {}
+        self._sequence = 0
+
+    async def connect(self) -> None:
+        import websockets
+        from Utils import version_tuple
+
+        start = time.perf_counter()
+        self._ws = await websockets.connect(f"ws://{self.address}", max_size=None, ping_interval=None,
+                                            open_timeout=self.timeout)
+        await asyncio.wait_for(self._ws.recv(), self.timeout)  # RoomInfo
+        await self._ws.send(json.dumps([{
+            "cmd": "Connect",
+            "game": self.game,
+            "name": f"Player{self.slot}",
+            "password": None,
+            "uuid": f"load{self.slot}",
+            "version": {"class": "Version", **version_tuple._asdict()},
+            "items_handling": 0b111,
+            "tags": self.tags,
+            "slot_data": False,
+        }]))
+        while True:
+            for msg in json.loads(await asyncio.wait_for(self._ws.recv(), self.timeout)):
+                if msg["cmd"] == "Connected":
+                    self.locations = msg["missing_locations"] + msg["checked_locations"]
+                    self._reader = asyncio.create_task(self._read())
+                    self.stats.record("Connect", time.perf_counter() - start)
+                    return
+                if msg["cmd"] == "ConnectionRefused":
+                    raise ConnectionError(", ".join(msg.get("errors", ["ConnectionRefused"])))
+
+    async def close(self) -> None:
+        if self._ws:
+            await self._ws.close()
+        if self._reader:
+            await self._reader
+
+    async def _read(self) -> None:
+        from websockets import ConnectionClosed
+
+        try:
+            async for message in self._ws:
+                # everything else, such as PrintJSON broadcasts, is only received to keep the connection flowing
+                for msg in json.loads(message):
+                    if msg["cmd"] == "Retrieved" and "load_barrier" in msg:
+                        future = self._pending.pop(msg["load_barrier"], None)
+                        if future and not future.done():
+                            future.set_result(None)
+        except ConnectionClosed:
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+            self._pending.clear()
+
+    async def request(self, packets: List[Dict[str, Any]]) -> None:
+        self._sequence += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._sequence] = future
+        await self._ws.send(json.dumps(packets + [{"cmd": "Get", "keys": [], "load_barrier": self._sequence}]))
+        await asyncio.wait_for(future, self.timeout)
+
+    def get_packets(self, action: str) -> List[Dict[str, Any]]:
+        if action == "LocationChecks":
+            # burst of checks, already checked ones included, as clients resend them after reconnecting
+            return [{"cmd": "LocationChecks",
+                     "locations": self.rng.sample(self.locations, self.rng.randint(1, len(self.locations)))}]
+        if action == "Say":
+            return [{"cmd": "Say", "text": f"load test message from {self.slot}"}]
+        if action == "Bounce":
+            return [{"cmd": "Bounce", "tags": ["DeathLink"],
+                     "data": {"time": time.time(), "source": f"Player{self.slot}", "cause": "load test"}}]
+        if action == "Get":
+            return [{"cmd": "Get", "keys": [f"load_{self.slot}", "load_counter", f"_read_hints_0_{self.slot}"]}]
+        if action == "Set":
+            return [{"cmd": "Set", "key": "load_counter", "default": 0, "want_reply": False,
+                     "operations": [{"operation": "add", "value": 1}]},
+                    {"cmd": "Set", "key": f"load_{self.slot}", "default": {}, "want_reply": True,
+                     "operations": [{"operation": "update", "value": {"time": time.time()}}]}]
+        raise KeyError(action)
+
+    async def act(self, action: str) -> None:
+        start = time.perf_counter()
+        if action == "Reconnect":
+            await self.close()
+            await self.connect()
+        else:
+            if action == "LocationChecks" and not self.locations:
+                action = "Get"
+            await self.request(self.get_packets(action))
+        self.stats.record(action, time.perf_counter() - start)
+
+    async def run(self, deadline: float, rate: float) -> None:
+        actions, weights = zip(*ACTIONS)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.rng.expovariate(rate))
+            action = self.rng.choices(actions, weights)[0]
+            try:
+                await self.act(action)
+            except Exception as e:
+                self.stats.record_error(action, e)
+                await self.close()
+                try:
+                    await self.connect()
+                except Exception as e:
+                    self.stats.record_error("Connect", e)
+                    return
+
+
+async def run_load(address: str, game: str, players: int, clients: int, duration: float, rate: float,
+                   connect_rate: float, deathlink: float, server_pid: Optional[int], seed: int,
+                   children_only: bool = False) -> Dict[str, Any]:
+    stats = LoadStats()
+    rng = random.Random(seed)
+
+    async def sample_rss() -> None:
+        while server_pid is not None:
+            rss = get_rss(server_pid, children_only)
+            if rss is not None:
+                stats.rss.append(rss)
+            await asyncio.sleep(1)
+
+    sampler = asyncio.create_task(sample_rss())
+    load_clients = [LoadClient(address, game, n % players + 1, stats, random.Random(rng.random()),
+                               rng.random() < deathlink) for n in range(clients)]
+    connected: List[LoadClient] = []
+    for client in load_clients:
+        try:
+            await client.connect()
+            connected.append(client)
+        except Exception as e:
+            stats.record_error("Connect", e)
+        await asyncio.sleep(1 / connect_rate)
+    print(f"Connected {len(connected)}/{clients} clients")
+
+    start = time.monotonic()
+    await asyncio.gather(*(client.run(start + duration, rate) for client in connected))
+    elapsed = time.monotonic() - start
+    await asyncio.gather(*(client.close() for client in connected), return_exceptions=True)
+    sampler.cancel()
+    return stats.report(elapsed)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    def format_bytes(value: Optional[int]) -> str:
+        return "n/a" if value is None else f"{value / 1024 / 1024:.1f} MiB"
+
+    print(f"{'action':<16}{'count':>9}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for action, data in report["actions"].items():
+        print(f"{action:<16}{data['count']:>9}{data['errors']:>8}{data['p50_ms']:>10.1f}{data['p90_ms']:>10.1f}"
+              f"{data['p99_ms']:>10.1f}{data['max_ms']:>10.1f}")
+        if data["first_error"]:
+            print(f"    first error: {data['first_error']}")
+    print(f"throughput: {report['throughput']:.1f} actions/s over {report['duration']:.1f}s")
+    print(f"server RSS: {format_bytes(report['rss_start'])} at start, {format_bytes(report['rss_peak'])} peak, "
+          f"{format_bytes(report['rss_end'])} at end")
+
+
+def raise_file_limit() -> None:
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main() -> int:
+    import argparse
+    import warnings
+
+    parser = argparse.ArgumentParser(description="Load test MultiServer or the WebHost room host.")
+    parser.add_argument("--target", choices=("multiserver", "webhost"), default="multiserver")
+    parser.add_argument("--multidata", type=Path, help="existing multiworld to serve instead of generating one")
+    parser.add_argument("--game", default="Clique", help="game of every slot of the generated multiworld")
+    parser.add_argument("--players", type=int, default=50, help="slots of the generated multiworld")
+    parser.add_argument("--clients", type=int, default=500, help="clients to connect, distributed over the slots")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to replay traffic for")
+    parser.add_argument("--rate", type=float, default=0.5, help="actions per client per second")
+    parser.add_argument("--connect-rate", type=float, default=200, help="new connections per second")
+    parser.add_argument("--deathlink", type=float, default=0.1, help="fraction of clients with the DeathLink tag")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="file to write the report to")
+    parser.add_argument("--max-p99", type=float, help="fail if any action's p99 latency exceeds this many ms")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", ResourceWarning)
+    raise_file_limit()
+
+    with TemporaryDirectory() as tempdir:
+        multidata = args.multidata
+        if not multidata:
+            from test.hosting.generate import generate_local
+
+            print(f"Generating {args.players} slots of {args.game}")
+            multidata = generate_local([args.game] * args.players, tempdir)
+
+        def run(address: str, server_pid: Optional[int], children_only: bool = False) -> Dict[str, Any]:
+            return asyncio.run(run_load(address, args.game, args.players, args.clients, args.duration, args.rate,
+                                        args.connect_rate, args.deathlink, server_pid, args.seed, children_only))
+
+        report: Dict[str, Any]
+        if args.target == "multiserver":
+            from test.hosting.serve import LocalServeGame
+
+            with LocalServeGame(multidata) as host:
+                report = run(host.address, host.pid)
+        else:
+            from test.hosting.serve import WebHostServeGame
+            from test.hosting.webhost import create_room, get_app, stop_autohost, upload_multidata
+            from WebHostLib.autolauncher import autohost
+
+            webapp = get_app(tempdir)
+            webhost_client = webapp.test_client()
+            room = create_room(webhost_client, upload_multidata(webhost_client, multidata))
+            autohost(webapp.config)
+            try:
+                with WebHostServeGame(webhost_client, room) as host:
+                    # rooms are hosted in children of this process
+                    report = run(host.address, os.getpid(), True)
+            finally:
+                stop_autohost(False)
+
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    failed = report["errors"] > 0
+    if args.max_p99 is not None:
+        failed |= any(data["p99_ms"] > args.max_p99 for data in report["actions"].values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 import sys
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     from threading import Event
@@ -15,6 +15,8 @@ __all__ = [
 
 class ServeGame:
     address: str
+    pid: Optional[int] = None
+    """process that hosts the game, if it runs in a process of its own"""
 
 
 def _launch_multiserver(multidata: Path, ready: "Event", stop: "Event") -> None:
@@ -80,6 +82,7 @@ class LocalServeGame(ServeGame):
         self._proc = Process(target=_launch_multiserver, args=(self._multidata, ready, self._stop))
         try:
             self._proc.start()
+            self.pid = self._proc.pid
             ready.wait(30)
             self.address = "localhost:38281"
             return self
@@ -0,0 +1,101 @@
+import asyncio
+import base64
+import json
+import unittest
+from typing import Any, Dict, List
+
+from worlds._bizhawk import BizHawkContext, ConnectionStatus, disconnect, read, unwatch, watch
+
+
+class FakeConnector:
+    """Handles requests like connector_bizhawk_generic.lua, once per frame for everything that arrived by then"""
+    frame_time: float = 0.01
+
+    def __init__(self) -> None:
+        self.memory = bytearray(0x100)
+        self.watches: Dict[int, List[Any]] = {}
+        self.busy_frames = 0
+        """frames on which requests were handled"""
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        address = request.get("address", 0)
+        if request["type"] == "READ":
+            return {"type": "READ_RESPONSE",
+                    "value": base64.b64encode(self.memory[address:address + request["size"]]).decode()}
+        if request["type"] == "WATCH":
+            watch_id = len(self.watches) + 1
+            value = bytes(self.memory[address:address + request["size"]])
+            self.watches[watch_id] = [address, value]
+            return {"type": "WATCH_RESPONSE", "watch": watch_id, "value": base64.b64encode(value).decode()}
+        if request["type"] == "UNWATCH":
+            del self.watches[request["watch"]]
+            return {"type": "UNWATCH_RESPONSE"}
+        return {"type": "ERROR", "err": f"Unknown command: {request['type']}"}
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        received: "asyncio.Queue[bytes]" = asyncio.Queue()
+
+        async def receive() -> None:
+            while line := await reader.readline():
+                received.put_nowait(line)
+
+        receiver = asyncio.create_task(receive())
+        while not receiver.done():
+            await asyncio.sleep(self.frame_time)
+            lines = []
+            while not received.empty():
+                lines.append(received.get_nowait())
+            if lines:
+                self.busy_frames += 1
+            for line in lines:
+                message = json.loads(line)
+                responses = [self.handle(request) for request in message["requests"]]
+                writer.write(json.dumps({"id": message["id"], "responses": responses}).encode() + b"\n")
+            changes = []
+            for watch_id, (address, value) in self.watches.items():
+                current = bytes(self.memory[address:address + len(value)])
+                for offset, (old, new) in enumerate(zip(value, current)):
+                    if old != new:
+                        changes.append([watch_id, offset, base64.b64encode(bytes([new])).decode()])
+                self.watches[watch_id][1] = current
+            if changes:
+                writer.write(json.dumps({"type": "WATCH_UPDATE", "changes": changes}).encode() + b"\n")
+            await writer.drain()
+
+
+class TestConnectorProtocol(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.connector = FakeConnector()
+        self.server = await asyncio.start_server(self.connector.serve, "127.0.0.1", 0)
+        self.ctx = BizHawkContext()
+        self.ctx.streams = await asyncio.open_connection("127.0.0.1", self.server.sockets[0].getsockname()[1])
+        self.ctx.connection_status = ConnectionStatus.TENTATIVE
+
+    async def asyncTearDown(self) -> None:
+        disconnect(self.ctx)
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def test_pipelined_requests(self) -> None:
+        """Tests that requests from different tasks are handled on the same frame and get their own responses"""
+        self.connector.memory[:4] = b"\x01\x02\x03\x04"
+        results = await asyncio.gather(*(read(self.ctx, [(address, 1, "RAM")]) for address in range(4)))
+        self.assertEqual(results, [[b"\x01"], [b"\x02"], [b"\x03"], [b"\x04"]])
+        self.assertEqual(self.connector.busy_frames, 1)
+        self.assertEqual(self.ctx.connection_status, ConnectionStatus.CONNECTED)
+
+    async def test_watch(self) -> None:
+        """Tests that watched memory is kept up to date by the connector's updates"""
+        self.connector.memory[0x10:0x14] = b"test"
+        memory_watch = await watch(self.ctx, 0x10, 4, "RAM")
+        self.assertEqual(memory_watch.value, b"test")
+        self.connector.memory[0x11] = 0
+        for _ in range(100):
+            if memory_watch.value != b"test":
+                break
+            await asyncio.sleep(self.connector.frame_time)
+        self.assertEqual(memory_watch.value, b"t\x00st")
+
+        await unwatch(self.ctx, memory_watch)
+        self.assertEqual(self.ctx.watches, {})
+        self.assertEqual(self.connector.watches, {})
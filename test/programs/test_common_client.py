@@ -1,6 +1,9 @@
+import os
+import tempfile
 import unittest
 
 import NetUtils
+import Utils
 from CommonClient import CommonContext
 
 
@@ -104,3 +107,56 @@ class TestCommonContext(unittest.IsolatedAsyncioTestCase):
         assert self.ctx.item_names.lookup_in_slot(-1, 3) == "Nothing"
         assert self.ctx.item_names.lookup_in_game(-1, "__TestGame1") == "Nothing"
         assert self.ctx.item_names.lookup_in_game(-1, "__TestGame2") == "Nothing"
+
+
+class TestDataPackageCache(unittest.IsolatedAsyncioTestCase):
+    async def test_round_trip(self) -> None:
+        """Tests that stored lookup tables are found by checksum and produce the same lookups as the data package"""
+        game_package = {
+            "location_name_to_id": {"Test Location": 2**54 + 1},
+            "item_name_to_id": {"Test Item": 2**54 + 1},
+            "version": 0,
+            "checksum": "0123abcd",
+        }
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "datapackage", "lookup_tables.bin")
+            cache = Utils.DataPackageCache(path)
+            cache.add("__TestGame1", game_package)
+            cache.add("__TestGame2", {**game_package, "checksum": None})
+            cache.store()
+            cache = Utils.DataPackageCache(path)
+            self.assertEqual(list(cache), ["0123abcd"])
+
+            ctx = CommonContext()
+            ctx.update_game_from_cache(cache["0123abcd"], "__TestGame1")
+        self.assertEqual(ctx.item_names.lookup_in_game(2**54 + 1, "__TestGame1"), "Test Item")
+        self.assertEqual(ctx.location_names.lookup_in_game(2**54 + 1, "__TestGame1"), "Test Location")
+        self.assertEqual(ctx.item_names.lookup_in_game(-1, "__TestGame1"), "Nothing")
+        self.assertEqual(ctx.checksums["__TestGame1"], "0123abcd")
+
+    async def test_concurrent_store(self) -> None:
+        """Tests that clients that loaded the cache at the same time don't drop each other's entries when storing"""
+        game_package = {
+            "location_name_to_id": {"Test Location": 1},
+            "item_name_to_id": {"Test Item": 1},
+            "version": 0,
+        }
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "lookup_tables.bin")
+            first = Utils.DataPackageCache(path)
+            second = Utils.DataPackageCache(path)
+            first.add("__TestGame1", {**game_package, "checksum": "0123abcd"})
+            second.add("__TestGame2", {**game_package, "checksum": "4567ef01"})
+            first.store()
+            second.store()
+            cache = Utils.DataPackageCache(path)
+            self.assertEqual(sorted(cache), ["0123abcd", "4567ef01"])
+            self.assertEqual(cache["0123abcd"]["game"], "__TestGame1")
+
+    async def test_corrupt(self) -> None:
+        """Tests that an unreadable cache is treated as empty"""
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, "lookup_tables.bin")
+            with open(path, "wb") as f:
+                f.write(b"\xff\x00")
+            self.assertEqual(len(Utils.DataPackageCache(path)), 0)
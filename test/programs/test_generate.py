@@ -92,3 +92,25 @@ class TestGenerateMain(unittest.TestCase):
             user_path.cached_path = user_path_backup
 
         self.assertOutput(self.output_tempdir.name)
+
+    def test_roll_workers(self):
+        """Tests that rolling player files on worker processes rolls the same options as rolling them serially"""
+        with TemporaryDirectory() as players_dir:
+            for player in range(1, 5):
+                with open(os.path.join(players_dir, f"{player}.yaml"), "w") as f:
+                    f.write(f"name: Player{player}\n"
+                            f"game:\n  Timespinner: 1\n  Clique: 1\n"
+                            f"Timespinner:\n  start_with_jewelry_box: random\n  damage_rando: random\n"
+                            f"Clique:\n  hard_mode: random\n  color: random\n")
+            rolled_options = []
+            for roll_workers in ("0", "2"):
+                sys.argv = [sys.argv[0], '--seed', '0',
+                            '--player_files_path', players_dir,
+                            '--outputpath', self.output_tempdir.name,
+                            '--roll_workers', roll_workers]
+                erargs, seed = Generate.main()
+                rolled_options.append({key: {player: getattr(option, "value", option)
+                                             for player, option in options.items()}
+                                       for key, options in vars(erargs).items() if isinstance(options, dict)})
+        self.assertEqual(rolled_options[0], rolled_options[1])
+        self.assertEqual(len(set(rolled_options[0]["game"].values())), 2)
@@ -1,5 +1,12 @@
+import asyncio
+import pickle
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+import zlib
+from unittest import mock
+
+from MultiServer import Context, EventLoopLag, ServerCommandProcessor, format_metrics, no_measurement, serve_metrics
+from NetUtils import NetworkSlot, SlotType
+from Utils import Multidata, dump_multidata
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +45,96 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestServerMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        with mock.patch.object(Context, "_load_game_data"):  # no game data needed
+            self.ctx = Context("", 0, "", "", 0, 0, False, metrics=True)
+
+    def test_format(self) -> None:
+        self.ctx.metrics.messages_in["Say"] += 2
+        self.ctx.metrics.count_out([{"cmd": "PrintJSON"}], recipients=3)
+        self.ctx.recheck_hints()
+        text = format_metrics([(self.ctx, {"room": 'a"b'})])
+        self.assertIn('# TYPE archipelago_messages_received_total counter', text)
+        self.assertIn('archipelago_messages_received_total{room="a\\"b",cmd="Say"} 2', text)
+        self.assertIn('archipelago_messages_sent_total{room="a\\"b",cmd="PrintJSON"} 3', text)
+        self.assertIn('archipelago_duration_seconds_count{room="a\\"b",operation="hint_recheck"} 1', text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_loop_lag(self) -> None:
+        """Tests that the lag of the event loop is reported once, not per context"""
+        loop_lag = EventLoopLag()
+        loop_lag.lag = 0.5
+        self.ctx.metrics.loop_lag = loop_lag
+        text = format_metrics([(self.ctx, {"room": "a"}), (self.ctx, {"room": "b"})], loop_lag)
+        self.assertEqual(text.count("archipelago_event_loop_lag_seconds"), 2)  # type and sample
+        self.assertIn("archipelago_event_loop_lag_seconds 0.5\n", text)
+
+    def test_disabled(self) -> None:
+        """Tests that nothing is measured without metrics enabled"""
+        with mock.patch.object(Context, "_load_game_data"):
+            ctx = Context("", 0, "", "", 0, 0, False)
+        self.assertIs(ctx.metrics.measure("hint_recheck"), no_measurement)
+        ctx.recheck_hints()
+        self.assertEqual(ctx.metrics.timings, {})
+        processor = ServerCommandProcessor(ctx)
+        with mock.patch.object(processor, "output"):
+            self.assertFalse(processor("/metrics"))
+
+    def test_command(self) -> None:
+        self.ctx.metrics.observe("save", 0.25)
+        processor = ServerCommandProcessor(self.ctx)
+        with mock.patch.object(processor, "output") as output:
+            self.assertTrue(processor("/metrics"))
+        lines = [call.args[0] for call in output.call_args_list]
+        self.assertIn("save: 1 times, avg 250.00 ms, max 250.00 ms", lines)
+
+    def test_serve(self) -> None:
+        async def get(path: str) -> bytes:
+            metrics_server = await serve_metrics("127.0.0.1", 0, lambda: "archipelago_clients 0\n")
+            try:
+                port = metrics_server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+                response = await reader.read()
+                writer.close()
+                return response
+            finally:
+                metrics_server.close()
+
+        response = asyncio.run(get("/metrics"))
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+        self.assertTrue(response.endswith(b"\r\n\r\narchipelago_clients 0\n"))
+        self.assertTrue(asyncio.run(get("/")).startswith(b"HTTP/1.1 404"))
+
+
+class TestMultidata(unittest.TestCase):
+    multidata = {
+        "slot_info": {1: NetworkSlot("Player1", "Clique", SlotType.player)},
+        "locations": {1: {69696969: (69696969, 1, 0)}},
+        "seed_name": "12345",
+    }
+
+    def test_sections(self) -> None:
+        """Tests that format 4 multidata only decodes the sections that are accessed"""
+        multidata = Context.decompress(dump_multidata(self.multidata))
+        self.assertIsInstance(multidata, Multidata)
+        self.assertEqual(list(multidata), list(self.multidata))
+        self.assertEqual(multidata["slot_info"], self.multidata["slot_info"])
+        self.assertEqual(multidata._encoded, {"locations", "seed_name"})
+        self.assertEqual(multidata.pop("locations"), self.multidata["locations"])
+        self.assertEqual(dict(multidata), {key: value for key, value in self.multidata.items() if key != "locations"})
+
+    def test_dump(self) -> None:
+        """Tests that dumping multidata again keeps unmodified sections as they were"""
+        data = dump_multidata(self.multidata)
+        multidata = Context.decompress(data)
+        self.assertEqual(dump_multidata(multidata), data)
+        multidata["seed_name"] = "54321"
+        self.assertEqual(Context.decompress(dump_multidata(multidata))["seed_name"], "54321")
+
+    def test_format_3(self) -> None:
+        multidata = Context.decompress(bytes([3]) + zlib.compress(pickle.dumps(self.multidata)))
+        self.assertEqual(multidata, self.multidata)
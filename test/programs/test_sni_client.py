@@ -0,0 +1,89 @@
+import asyncio
+import json
+import time
+import unittest
+from typing import List, Optional, Tuple
+
+import websockets
+
+from SNIClient import SNIContext, coalesce_reads, snes_connect, snes_disconnect, snes_read, snes_read_many
+
+
+class MockSNI:
+    """SNI endpoint answering GetAddress from memory after a fixed latency.
+    A round trip is counted for every request that arrives while no reply is outstanding."""
+    latency: float = 0.02
+
+    def __init__(self) -> None:
+        self.memory = bytes(address % 251 for address in range(0x10000))
+        self.requests = 0
+        self.round_trips = 0
+        self.outstanding = 0
+
+    async def handler(self, websocket, *args) -> None:
+        replies: "asyncio.Queue[Tuple[float, bytes]]" = asyncio.Queue()
+        writer = asyncio.create_task(self.reply(websocket, replies))
+        try:
+            async for message in websocket:
+                request = json.loads(message)
+                if request["Opcode"] == "DeviceList":
+                    await websocket.send(json.dumps({"Results": ["Mock SNES"]}))
+                elif request["Opcode"] == "AppVersion":
+                    await websocket.send(json.dumps({"Results": ["SNI mock"]}))
+                elif request["Opcode"] == "GetAddress":
+                    operands = [int(operand, 16) for operand in request["Operands"]]
+                    self.requests += 1
+                    if not self.outstanding:
+                        self.round_trips += 1
+                    self.outstanding += 1
+                    replies.put_nowait((time.monotonic() + self.latency,
+                                        b"".join(self.memory[address:address + size]
+                                                 for address, size in zip(operands[::2], operands[1::2]))))
+        finally:
+            writer.cancel()
+
+    async def reply(self, websocket, replies: "asyncio.Queue[Tuple[float, bytes]]") -> None:
+        while True:
+            due, data = await replies.get()
+            await asyncio.sleep(max(0.0, due - time.monotonic()))
+            self.outstanding -= 1
+            await websocket.send(data)
+
+
+class TestCoalesceReads(unittest.TestCase):
+    def test_coalesce(self) -> None:
+        self.assertEqual(coalesce_reads([(0x20, 4), (0x10, 0x10), (0x12, 2), (0x30, 1), (0x40, 1)]),
+                         [(0x10, 0x14), (0x30, 1), (0x40, 1)])
+
+
+class TestBatchedReads(unittest.IsolatedAsyncioTestCase):
+    ranges: List[Tuple[int, int]] = [(0x100 * index, 4) for index in range(10)] + [(0x102, 8), (0x100, 1)]
+
+    async def asyncSetUp(self) -> None:
+        self.sni = MockSNI()
+        self.server = await websockets.serve(self.sni.handler, "localhost", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.ctx = SNIContext(f"ws://localhost:{port}", "", "")
+        await snes_connect(self.ctx, self.ctx.snes_address)
+
+    async def asyncTearDown(self) -> None:
+        self.ctx.snes_reconnect_address = None
+        await snes_disconnect(self.ctx)
+        self.server.close()
+        await self.server.wait_closed()
+
+    def expected(self) -> List[bytes]:
+        return [self.sni.memory[address:address + size] for address, size in self.ranges]
+
+    async def test_read_many(self) -> None:
+        """Tests that a batch of reads costs a single round trip and returns each range's data in order"""
+        data: Optional[List[bytes]] = await snes_read_many(self.ctx, self.ranges)
+        self.assertEqual(data, self.expected())
+        self.assertEqual(self.sni.requests, 2)  # 10 ranges after coalescing, in batches of 8
+        self.assertEqual(self.sni.round_trips, 1)
+
+    async def test_read(self) -> None:
+        """Tests that separate reads keep costing a round trip each"""
+        data = [await snes_read(self.ctx, address, size) for address, size in self.ranges]
+        self.assertEqual(data, self.expected())
+        self.assertEqual(self.sni.round_trips, len(self.ranges))
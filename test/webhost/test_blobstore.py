@@ -0,0 +1,83 @@
+import os
+import tempfile
+from uuid import uuid4
+
+from flask import url_for
+
+from . import TestBase
+
+
+class TestBlobStore(TestBase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.folder = tempfile.TemporaryDirectory()
+        self.app.config["BLOB_FOLDER"] = self.folder.name
+
+    def tearDown(self) -> None:
+        self.app.config["BLOB_FOLDER"] = None
+        self.folder.cleanup()
+
+    def test_deduplicated(self) -> None:
+        from WebHostLib.blobstore import is_reference, load_blob, store_blob
+
+        first = store_blob(b"patch data")
+        second = store_blob(b"patch data")
+        self.assertTrue(is_reference(first))
+        self.assertEqual(first, second)
+        self.assertEqual(load_blob(first), b"patch data")
+        self.assertEqual(load_blob(b"\x03not a reference"), b"\x03not a reference")
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(self.folder.name)), 1)
+
+    def test_streamed_download(self) -> None:
+        """Tests that slot files stored as blobs are served from disk, including partial content"""
+        from pony.orm import db_session
+        from WebHostLib.blobstore import store_blob
+        from WebHostLib.models import Room, Seed, Slot
+
+        with db_session:
+            seed = Seed(multidata=b"", owner=uuid4())
+            Slot(player_id=1, player_name="Player1", game="VVVVVV", seed=seed, data=store_blob(b"0123456789"))
+            room_id = Room(seed=seed, owner=uuid4()).id
+        try:
+            with self.app.app_context(), self.app.test_request_context():
+                url = url_for("download_slot_file", room_id=room_id, player_id=1)
+            response = self.client.get(url)
+            self.assertEqual(response.data, b"0123456789")
+            response = self.client.get(url, headers={"Range": "bytes=2-4"})
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response.data, b"234")
+        finally:
+            with db_session:
+                seed = Room.get(id=room_id).seed
+                seed.rooms.select().delete()
+                seed.slots.select().delete()
+                seed.delete()
+
+    def test_migrate_and_collect(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.blobstore import collect_blobs, is_reference, load_blob, migrate_blobs, store_blob
+        from WebHostLib.models import Seed
+
+        orphan = store_blob(b"no longer referenced")
+        with db_session:
+            seed_id = Seed(multidata=b"\x03multidata", owner=uuid4()).id
+            # as long as a reference, but not one
+            short_seed_id = Seed(multidata=b"\x03" * len(orphan), owner=uuid4()).id
+        try:
+            references = migrate_blobs()
+            with db_session:
+                multidata = Seed.get(id=seed_id).multidata
+                short_multidata = Seed.get(id=short_seed_id).multidata
+            self.assertTrue(is_reference(multidata))
+            self.assertTrue(is_reference(short_multidata))
+            self.assertEqual(sorted(migrate_blobs()), sorted(references))
+            self.assertIn(multidata, references)
+            self.assertEqual(collect_blobs(references, min_age=-1), 1)
+            self.assertEqual(load_blob(multidata), b"\x03multidata")
+            self.assertEqual(load_blob(short_multidata), b"\x03" * len(orphan))
+            with self.assertRaises(FileNotFoundError):
+                load_blob(orphan)
+        finally:
+            with db_session:
+                Seed.get(id=seed_id).delete()
+                Seed.get(id=short_seed_id).delete()
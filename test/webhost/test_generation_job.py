@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import unittest
+from typing import Any, Dict
+from unittest import mock
+from uuid import uuid4
+
+from . import TestBase
+
+
+class TestGenerationJob(TestBase):
+    def gen_options(self) -> Dict[str, Dict[str, Any]]:
+        from WebHostLib.check import roll_options
+
+        results, gen_options = roll_options({"test.yaml": "name: Player1\ngame: Clique\nClique: {}\n"})
+        self.assertEqual(results, {"test.yaml": True})
+        return {name: vars(options) for name, options in gen_options.items()}
+
+    def test_generates(self) -> None:
+        import json
+
+        from pony.orm import db_session
+
+        import MultiServer
+        from WebHostLib.generate import gen_game
+        from WebHostLib.models import GameDataPackage, Seed
+
+        with self.app.app_context(), self.app.test_request_context():
+            seed_id = gen_game(self.gen_options(), owner=uuid4())
+        with db_session:
+            seed = Seed.get(id=seed_id)
+            self.assertIsNotNone(seed)
+            self.assertIn("wall_time", json.loads(seed.meta)["resources"])
+            # data packages are stored separately instead of being stripped from the multidata after generation
+            for game, game_data in MultiServer.Context.decompress(seed.multidata)["datapackage"].items():
+                self.assertEqual(game_data.keys(), {"version", "checksum"})
+                self.assertTrue(GameDataPackage.exists(checksum=game_data["checksum"]), game)
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "patch needs to reach the job process")
+    def test_limits(self) -> None:
+        """Tests that a generation exceeding its limits is aborted and its usage recorded"""
+        import json
+        import time
+
+        from pony.orm import db_session
+        from WebHostLib.generate import gen_game, get_cpu_time, get_rss, JobLimitExceeded
+        from WebHostLib.models import Generation
+
+        limits = [("JOB_TIME", 0.001)]
+        if get_rss() is not None:
+            limits.append(("JOB_MEMORY_LIMIT", 1))
+        for key, limit in limits:
+            with self.subTest(key), self.app.app_context(), self.app.test_request_context():
+                with db_session:
+                    sid = Generation(options=b"", owner=uuid4()).id
+                old_limit = self.app.config[key]
+                self.app.config[key] = limit
+                try:
+                    with self.assertRaises(JobLimitExceeded), \
+                            mock.patch("WebHostLib.generate.ERmain", lambda *args, **kwargs: time.sleep(10)):
+                        gen_game(self.gen_options(), owner=uuid4(), sid=sid)
+                finally:
+                    self.app.config[key] = old_limit
+                with db_session:
+                    meta = json.loads(Generation.get(id=sid).meta)
+                    Generation.get(id=sid).delete()
+                self.assertIn("error", meta)
+                self.assertIn("wall_time", meta["resources"])
+                if get_cpu_time(os.getpid()) is not None:  # measured by the waiting process, even for killed jobs
+                    self.assertIn("cpu_time", meta["resources"])
+
+    def test_no_fork_with_threads(self) -> None:
+        """Tests that a job started while other threads run, like from a request thread, is not forked"""
+        import threading
+
+        from WebHostLib.generate import GenerationJob
+
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait)
+        thread.start()
+        try:
+            self.assertNotEqual(GenerationJob.get_context().get_start_method(), "fork")
+        finally:
+            stop.set()
+            thread.join()
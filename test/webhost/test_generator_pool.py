@@ -0,0 +1,98 @@
+import multiprocessing
+import os
+import unittest
+from typing import Optional
+from unittest import mock
+from uuid import UUID, uuid4
+
+from . import TestBase
+
+
+def finish_job(options: dict, sid: Optional[UUID] = None, **kwargs) -> Optional[UUID]:
+    return sid
+
+
+def die(options: dict, **kwargs) -> None:
+    os._exit(3)
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "patches need to reach the workers")
+class TestGeneratorPool(TestBase):
+    timeout: float = 30
+
+    def setUp(self) -> None:
+        from WebHostLib.autolauncher import GeneratorPool
+
+        super().setUp()
+        config = {key: self.app.config[key] for key in ("PONY", "JOB_TIME", "JOB_CPU_TIME", "JOB_MEMORY_LIMIT",
+                                                         "BLOB_FOLDER")}
+        config.update({"GENERATORS": 1, "GENERATOR_RECYCLE": 1, "GENERATOR_MEMORY_LIMIT": None})
+        patches = [
+            # the forked workers share the test's database, which needs no second binding
+            mock.patch("WebHostLib.autolauncher.init_db"),
+            mock.patch.object(GeneratorPool, "get_context", staticmethod(lambda: multiprocessing.get_context("fork"))),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.pool = GeneratorPool(config)
+        self.addCleanup(self.pool.close)
+
+    def wait_for_worker_exit(self) -> multiprocessing.Process:
+        worker, _ = self.pool.workers[0]
+        worker.join(self.timeout)
+        self.assertFalse(worker.is_alive())
+        return worker
+
+    def start_generation(self) -> UUID:
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, STATE_STARTED
+
+        with db_session:
+            sid = Generation(options=b"", owner=uuid4(), state=STATE_STARTED).id
+        self.pool.submit({}, sid=sid, owner=uuid4())
+        return sid
+
+    def get_state(self, sid: UUID) -> int:
+        from pony.orm import db_session
+        from WebHostLib.models import Generation
+
+        with db_session:
+            return Generation[sid].state
+
+    def test_recycle(self) -> None:
+        """Tests that a worker exits after GENERATOR_RECYCLE jobs and gets replaced"""
+        from WebHostLib.models import STATE_STARTED
+
+        with mock.patch("WebHostLib.autolauncher.gen_game", finish_job):
+            self.pool.maintain()
+            for _ in range(2):
+                sid = self.start_generation()
+                worker = self.wait_for_worker_exit()
+                self.assertEqual(worker.exitcode, 0)
+                self.pool.maintain()
+                self.assertEqual(len(self.pool.workers), 1)
+                self.assertIsNot(self.pool.workers[0][0], worker)
+                self.assertTrue(self.pool.workers[0][0].is_alive())
+                # a finished job is not taken for a lost one
+                self.assertEqual(self.get_state(sid), STATE_STARTED)
+
+    def test_worker_death(self) -> None:
+        """Tests that the Generation of a worker that died is queued again once, then marked as failed"""
+        from pony.orm import db_session
+        from WebHostLib.models import Generation, STATE_ERROR, STATE_QUEUED, STATE_STARTED
+
+        with mock.patch("WebHostLib.autolauncher.gen_game", die):
+            self.pool.maintain()
+            sid = self.start_generation()
+            self.assertEqual(self.wait_for_worker_exit().exitcode, 3)
+            self.pool.maintain()
+            self.assertEqual(self.get_state(sid), STATE_QUEUED)
+            self.assertTrue(self.pool.workers[0][0].is_alive())
+
+            with db_session:
+                Generation[sid].state = STATE_STARTED
+            self.pool.submit({}, sid=sid, owner=uuid4())
+            self.wait_for_worker_exit()
+            self.pool.maintain()
+            self.assertEqual(self.get_state(sid), STATE_ERROR)
@@ -0,0 +1,239 @@
+import datetime
+import time
+from typing import List, Set
+from uuid import UUID, uuid4
+
+from . import TestBase
+
+
+class FakeHoster:
+    name = "FakeHoster"
+
+    def __init__(self) -> None:
+        self.room_ids: Set[UUID] = set()
+        self.started: List[UUID] = []
+        self.shut_down: List[UUID] = []
+        self.released: List[UUID] = []
+        self.running: Set[UUID] = set()
+        self.kept: List[UUID] = []
+
+    def start_room(self, room_id: UUID) -> None:
+        if room_id not in self.room_ids:
+            self.room_ids.add(room_id)
+            self.started.append(room_id)
+
+    def collect_shutdowns(self) -> List[UUID]:
+        shut_down, self.shut_down = self.shut_down, []
+        self.room_ids.difference_update(shut_down)
+        return shut_down
+
+    def running_rooms(self) -> Set[UUID]:
+        return self.running & self.room_ids
+
+    def collect_kept_rooms(self) -> List[UUID]:
+        kept, self.kept = self.kept, []
+        return kept
+
+    def release_room(self, room_id: UUID) -> None:
+        self.released.append(room_id)
+
+
+class TestRoomScheduler(TestBase):
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import RoomScheduler
+        from WebHostLib.models import Seed
+
+        super().setUp()
+        self.hoster = FakeHoster()
+        self.scheduler = RoomScheduler([self.hoster])  # type: ignore
+        with db_session:
+            self.seed_id = Seed(multidata=b"", owner=uuid4()).id
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Seed
+
+        with db_session:
+            seed = Seed.get(id=self.seed_id)
+            for room in seed.rooms:
+                room.delete()
+            seed.delete()
+
+    def create_room(self, idle: datetime.timedelta, timeout: int = 60) -> UUID:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, Seed
+
+        with db_session:
+            room = Room(seed=Seed.get(id=self.seed_id), owner=uuid4(), timeout=timeout,
+                        last_activity=datetime.datetime.utcnow() - idle)
+            return room.id
+
+    def set_last_activity(self, room_id: UUID, last_activity: datetime.datetime) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+
+        with db_session:
+            Room.get(id=room_id).last_activity = last_activity
+
+    def test_starts_active_rooms_once(self) -> None:
+        active = self.create_room(datetime.timedelta(seconds=10))
+        self.create_room(datetime.timedelta(minutes=10))  # timed out
+        self.scheduler.refresh()
+        self.assertEqual(self.hoster.started, [active])
+        self.scheduler.refresh()
+        self.assertEqual(self.hoster.started, [active])
+
+    def test_new_activity(self) -> None:
+        """Tests that activity on an idle room starts it, and that expired rooms are forgotten"""
+        room_id = self.create_room(datetime.timedelta(minutes=10))
+        self.scheduler.refresh()
+        self.assertEqual(self.hoster.started, [])
+        self.set_last_activity(room_id, datetime.datetime.utcnow())
+        self.scheduler.refresh()
+        self.assertEqual(self.hoster.started, [room_id])
+        self.assertIn(room_id, self.scheduler.deadlines)
+
+        # pretend the room's timeout passed
+        deadline = datetime.datetime.utcnow()
+        self.scheduler.heap = [(deadline, room_id)]
+        self.scheduler.deadlines[room_id] = deadline
+        self.scheduler.expire()
+        self.assertNotIn(room_id, self.scheduler.deadlines)
+        self.assertEqual(self.scheduler.heap, [])
+
+    def test_shut_down(self) -> None:
+        """Tests that a room reported as shut down is only started again if it is still active"""
+        active = self.create_room(datetime.timedelta(seconds=10))
+        idle = self.create_room(datetime.timedelta(seconds=10))
+        self.scheduler.refresh()
+        # a room marks itself as inactive when it shuts down on its own
+        self.set_last_activity(idle, datetime.datetime.utcnow() - datetime.timedelta(minutes=2))
+        self.hoster.started.clear()
+        self.hoster.shut_down = [active, idle]
+        self.scheduler.restart_shut_down()
+        self.assertEqual(self.hoster.started, [active])
+        self.assertNotIn(idle, self.scheduler.deadlines)
+
+    def test_shut_down_while_scheduling(self) -> None:
+        """Tests that a shutdown reported while another room gets started is still seen by the scheduler"""
+        from WebHostLib.autolauncher import MultiworldInstance, RoomScheduler
+
+        hoster = MultiworldInstance(self.app.config, 0)
+        scheduler = RoomScheduler([hoster])
+        first = self.create_room(datetime.timedelta(seconds=10))
+        scheduler.refresh()
+        self.assertEqual(hoster.rooms_to_start.get(timeout=5), first)
+
+        hoster.rooms_shutting_down.put(first)
+        while hoster.rooms_shutting_down.empty():  # wait for the queue's feeder thread
+            time.sleep(0.01)
+        second = self.create_room(datetime.timedelta(seconds=10))
+        scheduler.schedule(second, datetime.datetime.utcnow(), 60, datetime.datetime.utcnow())
+        self.assertEqual(hoster.rooms_to_start.get(timeout=5), second)
+        scheduler.restart_shut_down()
+        self.assertEqual(hoster.rooms_to_start.get(timeout=5), first)
+        self.assertEqual(hoster.room_ids, {first, second})
+
+    def test_least_busy_placement(self) -> None:
+        """Tests that new rooms are started on the hoster hosting the fewest rooms"""
+        from WebHostLib.autolauncher import RoomScheduler
+
+        busy, idle = FakeHoster(), FakeHoster()
+        busy.room_ids.update((uuid4(), uuid4()))
+        scheduler = RoomScheduler([busy, idle])  # type: ignore
+        first = self.create_room(datetime.timedelta(seconds=10))
+        scheduler.refresh()
+        self.assertEqual(idle.started, [first])
+        self.assertIs(scheduler.hoster_for(first), idle)
+
+    def test_migrate(self) -> None:
+        """Tests that a migrated room is started on its new hoster after the old one handed it over"""
+        from WebHostLib.autolauncher import RoomScheduler
+
+        target = FakeHoster()
+        scheduler = RoomScheduler([self.hoster, target])  # type: ignore
+        room_id = self.create_room(datetime.timedelta(seconds=10))
+        scheduler.refresh()
+        self.assertEqual(self.hoster.started, [room_id])
+        self.assertTrue(scheduler.migrate(room_id, target))
+        self.assertFalse(scheduler.migrate(room_id, target))
+        self.assertEqual(self.hoster.released, [room_id])
+        self.assertIs(scheduler.hoster_for(room_id), self.hoster)
+
+        self.hoster.shut_down = [room_id]
+        scheduler.restart_shut_down()
+        self.assertEqual(target.started, [room_id])
+        self.assertEqual(scheduler.migrations, {})
+
+    def test_rebalance(self) -> None:
+        """Tests that a room is moved once hosters differ by more than the threshold"""
+        from WebHostLib.autolauncher import RoomScheduler
+
+        target = FakeHoster()
+        scheduler = RoomScheduler([self.hoster, target], rebalance_threshold=2)  # type: ignore
+        self.hoster.room_ids.update((uuid4(), uuid4()))
+        self.hoster.running.update(self.hoster.room_ids)
+        scheduler.rebalance()
+        self.assertEqual(self.hoster.released, [])
+        starting = uuid4()
+        self.hoster.room_ids.add(starting)
+        scheduler.rebalance()
+        self.assertEqual(len(self.hoster.released), 1)
+        self.assertNotEqual(self.hoster.released[0], starting)
+        self.assertEqual(scheduler.migrations, {self.hoster.released[0]: target})
+        scheduler.rebalance()  # one room at a time
+        self.assertEqual(len(self.hoster.released), 1)
+
+    def test_rebalance_starting(self) -> None:
+        """Tests that rooms are not moved while they are still starting"""
+        from WebHostLib.autolauncher import RoomScheduler
+
+        scheduler = RoomScheduler([self.hoster, FakeHoster()], rebalance_threshold=1)  # type: ignore
+        self.hoster.room_ids.update((uuid4(), uuid4()))
+        scheduler.rebalance()
+        self.assertEqual(self.hoster.released, [])
+        self.assertEqual(scheduler.migrations, {})
+
+    def test_kept_room(self) -> None:
+        """Tests that a release the hoster rejects ends the handover, so rebalancing goes on"""
+        from WebHostLib.autolauncher import RoomScheduler
+
+        target = FakeHoster()
+        scheduler = RoomScheduler([self.hoster, target], rebalance_threshold=1)  # type: ignore
+        kept, other = uuid4(), uuid4()
+        self.hoster.room_ids.update((kept, other))
+        self.hoster.running.add(kept)
+        scheduler.rebalance()
+        self.assertEqual(self.hoster.released, [kept])
+
+        self.hoster.kept = [kept]
+        scheduler.forget_kept_rooms()
+        self.assertEqual(scheduler.migrations, {})
+        self.assertIs(scheduler.hoster_for(kept), self.hoster)
+        self.hoster.running.add(other)
+        self.hoster.running.discard(kept)
+        scheduler.rebalance()
+        self.assertEqual(self.hoster.released, [kept, other])
+
+    def test_kept_room_reported(self) -> None:
+        """Tests that a hoster process reports a release of a room it is not running"""
+        from WebHostLib.autolauncher import MultiworldInstance, RoomScheduler
+
+        hoster = MultiworldInstance(self.app.config, 0)
+        target = MultiworldInstance(self.app.config, 1)
+        scheduler = RoomScheduler([hoster, target])
+        room_id = uuid4()
+        hoster.room_ids.add(room_id)
+        self.assertEqual(hoster.running_rooms(), set())
+        hoster.rooms_running.put(room_id)
+        while hoster.rooms_running.empty():  # wait for the queue's feeder thread
+            time.sleep(0.01)
+        self.assertEqual(hoster.running_rooms(), {room_id})
+
+        self.assertTrue(scheduler.migrate(room_id, target))
+        hoster.rooms_kept.put(room_id)
+        while hoster.rooms_kept.empty():
+            time.sleep(0.01)
+        scheduler.forget_kept_rooms()
+        self.assertEqual(scheduler.migrations, {})
@@ -0,0 +1,73 @@
+import datetime
+from uuid import uuid4
+
+from flask import url_for
+
+from . import TestBase
+
+
+class TestStats(TestBase):
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import DailyGameStats, Seed, Slot, StatsCursor
+
+        super().setUp()
+        with db_session:
+            DailyGameStats.select().delete(bulk=True)
+            StatsCursor.select().delete(bulk=True)
+            seed = Seed(multidata=b"", owner=uuid4())
+            Slot(player_id=1, player_name="Player1", game="Clique", seed=seed)
+            Slot(player_id=2, player_name="Player2", game="Clique", seed=seed)
+            Slot(player_id=3, player_name="Player3", game="Archipelago", seed=seed)
+            self.seed_id = seed.id
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Seed
+
+        with db_session:
+            seed = Seed.get(id=self.seed_id)
+            for room in list(seed.rooms):
+                room.delete()
+            for slot in list(seed.slots):
+                slot.delete()
+            seed.delete()
+
+    def create_room(self, age: datetime.timedelta) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, Seed
+
+        with db_session:
+            Room(seed=Seed.get(id=self.seed_id), owner=uuid4(), creation_time=datetime.datetime.utcnow() - age)
+
+    def test_daily_counts(self) -> None:
+        """Tests that rooms are counted into the daily stats once and only while within the requested days"""
+        from pony.orm import db_session
+        from WebHostLib.models import StatsCursor
+        from WebHostLib.stats import get_db_data
+
+        known_games = {"Clique", "Archipelago"}
+        self.create_room(datetime.timedelta(days=2))
+        self.create_room(datetime.timedelta(days=2))
+        self.create_room(datetime.timedelta(days=40))
+        with db_session:
+            total_games, games_played = get_db_data(known_games)
+        day = (datetime.datetime.utcnow() - datetime.timedelta(days=2)).date()
+        self.assertEqual(total_games, {"Clique": 4, "Archipelago": 2})
+        self.assertEqual(games_played[day], {"Clique": 4, "Archipelago": 2})
+
+        # pretend the last update happened two hours ago
+        with db_session:
+            StatsCursor.get(name="rooms").position -= datetime.timedelta(hours=2)
+        self.create_room(datetime.timedelta(hours=1))
+        with db_session:
+            total_games, _ = get_db_data({"Clique"}, 60)
+        self.assertEqual(total_games, {"Clique": 8})
+
+    def test_api(self) -> None:
+        self.create_room(datetime.timedelta(days=1))
+        with self.app.app_context(), self.app.test_request_context():
+            response = self.client.get(url_for("api.get_stats", days=7))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["days"], 7)
+        self.assertEqual(response.json["total"], {"Clique": 2, "Archipelago": 1})
@@ -0,0 +1,147 @@
+import types
+from uuid import UUID, uuid4
+
+from flask import url_for
+
+from . import TestBase
+
+
+clique_locations = (69696969, 69696968)
+clique_item = 69696969
+
+
+class TestTrackerVersions(TestBase):
+    room_id: UUID
+    tracker: UUID
+
+    def setUp(self) -> None:
+        from pony.orm import db_session
+        from MultiServer import ServerMetrics
+        from WebHostLib.check import roll_options
+        from WebHostLib.generate import gen_game
+        from WebHostLib.models import Room, Seed
+
+        super().setUp()
+        with self.app.app_context(), self.app.test_request_context():
+            _, gen_options = roll_options({f"Player{player}.yaml": f"name: Player{player}\ngame: Clique\nClique: {{}}\n"
+                                           for player in (1, 2)})
+            seed_id = gen_game({name: vars(options) for name, options in gen_options.items()}, owner=uuid4())
+        with db_session:
+            room = Room(seed=Seed.get(id=seed_id), owner=uuid4(), tracker=uuid4())
+            self.room_id, self.tracker = room.id, room.tracker
+        self.ctx = types.SimpleNamespace(
+            room_id=self.room_id, player_names={(0, 1): "Player1", (0, 2): "Player2"}, location_checks={},
+            received_items={}, client_game_state={}, hints={}, name_aliases={}, tracker_fingerprints={},
+            metrics=ServerMetrics())
+
+    def tearDown(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room, TrackerState
+
+        with db_session:
+            state = TrackerState.get(room_id=self.room_id)
+            if state:
+                state.delete()
+            room = Room.get(id=self.room_id)
+            seed = room.seed
+            room.delete()
+            for slot in list(seed.slots):
+                slot.delete()
+            seed.delete()
+
+    def get_save(self) -> dict:
+        return {key: getattr(self.ctx, key) for key in ("location_checks", "received_items", "client_game_state",
+                                                        "hints", "name_aliases")}
+
+    def save(self) -> None:
+        """Saves the room like its server does"""
+        from pony.orm import db_session
+        from WebHostLib.customserver import WebHostContext
+
+        self.ctx.get_save = self.get_save
+        self.ctx.get_tracker_fingerprints = lambda: WebHostContext.get_tracker_fingerprints(self.ctx)
+        self.ctx.update_tracker_state = lambda: WebHostContext.update_tracker_state(self.ctx)
+        with db_session:
+            WebHostContext._save(self.ctx)
+
+    def check_location(self, player: int) -> None:
+        """Lets player find the item at their first location, which the other player receives"""
+        from NetUtils import NetworkItem
+
+        location = min(clique_locations)
+        self.ctx.location_checks.setdefault((0, player), set()).add(location)
+        self.ctx.received_items.setdefault((0, 3 - player, True), []).append(
+            NetworkItem(clique_item, location, player, 0))
+
+    def get(self, endpoint: str, etag: str = "", **kwargs):
+        with self.app.app_context(), self.app.test_request_context():
+            url = url_for(endpoint, tracker=self.tracker, **kwargs)
+        return self.client.get(url, headers={"If-None-Match": etag} if etag else {})
+
+    def test_player_tracker(self) -> None:
+        """Tests that a player tracker is only sent again after its own slot changed"""
+        self.save()
+        first = self.get("get_player_tracker", tracked_team=0, tracked_player=1)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers["ETag"]
+        self.assertEqual(self.get("get_player_tracker", etag, tracked_team=0, tracked_player=1).status_code, 304)
+
+        self.ctx.location_checks[0, 2] = {min(clique_locations)}
+        self.save()
+        self.assertEqual(self.get("get_player_tracker", etag, tracked_team=0, tracked_player=1).status_code, 304)
+        self.check_location(1)
+        self.save()
+        response = self.get("get_player_tracker", etag, tracked_team=0, tracked_player=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_save_metrics(self) -> None:
+        """Tests that saving the room is measured for the room host's metrics"""
+        self.save()
+        self.assertEqual(self.ctx.metrics.timings["save"][0], 1)
+        self.assertGreater(self.ctx.metrics.save_size, 0)
+
+    def test_multiworld_tracker(self) -> None:
+        first = self.get("get_multiworld_tracker", game="Generic")
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers["ETag"]
+        self.assertEqual(self.get("get_multiworld_tracker", etag, game="Generic").status_code, 304)
+        self.save()
+        self.assertEqual(self.get("get_multiworld_tracker", etag, game="Generic").status_code, 200)
+
+    def test_api_delta(self) -> None:
+        """Tests that the tracker API only lists slots that changed since the requested version"""
+        full = self.get("api.tracker_data").json
+        self.assertEqual(full["version"], 0)
+        self.assertEqual([slot["player"] for slot in full["slots"]], [1, 2])
+        self.assertIn("Clique", full["datapackage"])
+
+        self.save()
+        self.ctx.location_checks[0, 2] = {min(clique_locations)}
+        self.save()
+        delta = self.get("api.tracker_data", since=1).json
+        self.assertEqual(delta["version"], 2)
+        self.assertEqual([(slot["player"], slot["checked_locations"]) for slot in delta["slots"]],
+                         [(2, [min(clique_locations)])])
+        self.check_location(2)
+        self.save()
+        delta = self.get("api.tracker_data", since=2).json
+        self.assertEqual([(slot["player"], slot["received_items"]) for slot in delta["slots"]],
+                         [(1, [[clique_item, min(clique_locations), 2, 0]])])
+        self.assertEqual(self.get("api.tracker_data", since=3).json["slots"], [])
+        # unknown versions, such as of a room that was reset, get the full state
+        self.assertEqual(len(self.get("api.tracker_data", since=5).json["slots"]), 2)
+
+    def test_cleanup(self) -> None:
+        """Tests that the tracker state of a deleted room is removed by the autohost's cleanup"""
+        from pony.orm import db_session
+        from WebHostLib.autolauncher import cleanup
+        from WebHostLib.models import TrackerState
+
+        self.save()
+        with db_session:
+            deleted_room = TrackerState(room_id=uuid4()).room_id
+        cleanup()
+        with db_session:
+            self.assertIsNone(TrackerState.get(room_id=deleted_room))
+            self.assertIsNotNone(TrackerState.get(room_id=self.room_id))
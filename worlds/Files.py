@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import abc
 import json
+import struct
 import zipfile
 from enum import IntEnum
 import os
@@ -295,6 +296,32 @@ class APTokenTypes(IntEnum):
     XOR_8 = 5
 
 
+token_header = struct.Struct("<BII")
+"""type, offset and size of the data of a token"""
+bitwise_token_types = (APTokenTypes.AND_8, APTokenTypes.OR_8, APTokenTypes.XOR_8)
+
+
+def apply_token_run(rom_data: bytearray, token_type: int, start: int, data: bytearray) -> None:
+    """Applies the data of consecutive tokens of the same type, starting at start, as a single slice operation."""
+    if not data:
+        return
+    end = start + len(data)
+    if token_type == APTokenTypes.WRITE:
+        rom_data[start:end] = data
+        return
+    if end > len(rom_data):
+        raise IndexError("bytearray index out of range")
+    current = int.from_bytes(rom_data[start:end], "little")
+    argument = int.from_bytes(data, "little")
+    if token_type == APTokenTypes.AND_8:
+        current &= argument
+    elif token_type == APTokenTypes.OR_8:
+        current |= argument
+    else:
+        current ^= argument
+    rom_data[start:end] = current.to_bytes(len(data), "little")
+
+
 class APTokenMixin:
     """
     A class that defines functions for generating a token binary, for use in patches.
@@ -387,33 +414,38 @@ class APPatchExtension(metaclass=AutoPatchExtensionRegister):
     @staticmethod
     def apply_tokens(caller: APProcedurePatch, rom: bytes, token_file: str) -> bytes:
         """Applies the given token file from the patch onto the current file."""
-        token_data = caller.get_file(token_file)
+        token_data = memoryview(caller.get_file(token_file))
         rom_data = bytearray(rom)
         token_count = int.from_bytes(token_data[0:4], "little")
         bpr = 4
+        # consecutive tokens of the same kind on consecutive bytes are collected into a run and applied as one slice
+        run_type = APTokenTypes.WRITE
+        run_start = 0
+        run_data = bytearray()
         for _ in range(token_count):
-            token_type = token_data[bpr:bpr + 1][0]
-            offset = int.from_bytes(token_data[bpr + 1:bpr + 5], "little")
-            size = int.from_bytes(token_data[bpr + 5:bpr + 9], "little")
-            data = token_data[bpr + 9:bpr + 9 + size]
-            if token_type in [APTokenTypes.AND_8, APTokenTypes.OR_8, APTokenTypes.XOR_8]:
-                arg = data[0]
-                if token_type == APTokenTypes.AND_8:
-                    rom_data[offset] = rom_data[offset] & arg
-                elif token_type == APTokenTypes.OR_8:
-                    rom_data[offset] = rom_data[offset] | arg
-                else:
-                    rom_data[offset] = rom_data[offset] ^ arg
-            elif token_type in [APTokenTypes.COPY, APTokenTypes.RLE]:
-                length = int.from_bytes(data[:4], "little")
-                value = int.from_bytes(data[4:], "little")
+            token_type, offset, size = token_header.unpack_from(token_data, bpr)
+            bpr += 9
+            if token_type == APTokenTypes.COPY or token_type == APTokenTypes.RLE:
+                apply_token_run(rom_data, run_type, run_start, run_data)
+                run_data = bytearray()
+                length = int.from_bytes(token_data[bpr:bpr + 4], "little")
+                value = int.from_bytes(token_data[bpr + 4:bpr + size], "little")
                 if token_type == APTokenTypes.COPY:
                     rom_data[offset: offset + length] = rom_data[value: value + length]
                 else:
-                    rom_data[offset: offset + length] = bytes([value] * length)
+                    rom_data[offset: offset + length] = bytes((value,)) * length
             else:
-                rom_data[offset:offset + len(data)] = data
-            bpr += 9 + size
+                if token_type in bitwise_token_types:
+                    data = token_data[bpr:bpr + 1]
+                else:
+                    token_type, data = APTokenTypes.WRITE, token_data[bpr:bpr + size]
+                if token_type == run_type and offset == run_start + len(run_data):
+                    run_data += data
+                else:
+                    apply_token_run(rom_data, run_type, run_start, run_data)
+                    run_type, run_start, run_data = token_type, offset, bytearray(data)
+            bpr += size
+        apply_token_run(rom_data, run_type, run_start, run_data)
         return bytes(rom_data)
 
     @staticmethod
@@ -43,19 +43,119 @@ class SyncError(Exception):
     pass
 
 
+class MemoryWatch:
+    """A range of memory that the connector script sends the changes of as they happen. See `watch`."""
+    watch_id: int
+    address: int
+    size: int
+    domain: str
+    value: bytearray
+    """The content of the range as of the last update received from the connector script"""
+
+    def __init__(self, watch_id: int, address: int, size: int, domain: str, value: bytes) -> None:
+        self.watch_id = watch_id
+        self.address = address
+        self.size = size
+        self.domain = domain
+        self.value = bytearray(value)
+
+
 class BizHawkContext:
     streams: typing.Optional[typing.Tuple[asyncio.StreamReader, asyncio.StreamWriter]]
     connection_status: ConnectionStatus
+    watches: typing.Dict[int, MemoryWatch]
     _lock: asyncio.Lock
     _port: typing.Optional[int]
+    _next_request_id: int
+    _pending: typing.Dict[int, "asyncio.Future[typing.List[typing.Dict[str, typing.Any]]]"]
+    _receive_task: typing.Optional["asyncio.Task[None]"]
 
     def __init__(self) -> None:
         self.streams = None
         self.connection_status = ConnectionStatus.NOT_CONNECTED
+        self.watches = {}
         self._lock = asyncio.Lock()
         self._port = None
+        self._next_request_id = 0
+        self._pending = {}
+        self._receive_task = None
+
+    def _close(self, exc: Exception) -> None:
+        """Drops the connection, failing all requests still waiting for a response with exc"""
+        if self.streams is not None:
+            self.streams[1].close()
+            self.streams = None
+        self.connection_status = ConnectionStatus.NOT_CONNECTED
+        self.watches.clear()
+        if self._receive_task is not None and self._receive_task is not asyncio.current_task():
+            self._receive_task.cancel()
+        self._receive_task = None
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    async def _receive(self) -> None:
+        """Dispatches the connector script's messages: responses to the requests waiting for them by id, and memory
+        watch updates to `watches`"""
+        assert self.streams is not None
+        reader = self.streams[0]
+        try:
+            while True:
+                line = await reader.readline()
+                if line == b"":
+                    raise RequestFailedError("Connection closed")
+
+                if self.connection_status == ConnectionStatus.TENTATIVE:
+                    self.connection_status = ConnectionStatus.CONNECTED
+
+                message = json.loads(line)
+                if message.get("type") == "WATCH_UPDATE":
+                    for watch_id, offset, data in message["changes"]:
+                        watch = self.watches.get(watch_id)
+                        if watch is not None:
+                            data = base64.b64decode(data)
+                            watch.value[offset:offset + len(data)] = data
+                else:
+                    future = self._pending.pop(message["id"], None)
+                    if future is not None and not future.done():
+                        future.set_result(message["responses"])
+        except RequestFailedError as exc:
+            self._close(exc)
+        except (ConnectionResetError, ValueError):
+            self._close(RequestFailedError("Connection reset"))
+
+    async def _send_requests(self, req_list: typing.List[typing.Dict[str, typing.Any]]) \
+            -> typing.List[typing.Dict[str, typing.Any]]:
+        """Sends a list of requests tagged with a new id and waits for the responses with that id. Other requests can
+        be sent meanwhile, the connector script handles them in the order they were sent."""
+        if self.streams is None:
+            raise NotConnectedError("You tried to send a request before a connection to BizHawk was made")
+
+        if self._receive_task is None:
+            self._receive_task = asyncio.create_task(self._receive(), name="BizHawkReceive")
+
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            writer = self.streams[1]
+            writer.write(json.dumps({"id": request_id, "requests": req_list}).encode("utf-8") + b"\n")
+            await asyncio.wait_for(writer.drain(), timeout=5)
+            return await asyncio.wait_for(future, timeout=5)
+        except asyncio.TimeoutError as exc:
+            self._close(RequestFailedError("Connection timed out"))
+            raise RequestFailedError("Connection timed out") from exc
+        except ConnectionResetError as exc:
+            self._close(RequestFailedError("Connection reset"))
+            raise RequestFailedError("Connection reset") from exc
+        finally:
+            self._pending.pop(request_id, None)
 
     async def _send_message(self, message: str):
+        """Sends a single line and waits for the single line response, for messages outside of the request protocol
+        sent before any request"""
         async with self._lock:
             if self.streams is None:
                 raise NotConnectedError("You tried to send a request before a connection to BizHawk was made")
@@ -112,10 +212,7 @@ async def connect(ctx: BizHawkContext) -> bool:
 
 def disconnect(ctx: BizHawkContext) -> None:
     """Closes the connection to the connector script."""
-    if ctx.streams is not None:
-        ctx.streams[1].close()
-        ctx.streams = None
-    ctx.connection_status = ConnectionStatus.NOT_CONNECTED
+    ctx._close(RequestFailedError("Disconnected"))
 
 
 async def get_script_version(ctx: BizHawkContext) -> int:
@@ -125,8 +222,10 @@ async def get_script_version(ctx: BizHawkContext) -> int:
 async def send_requests(ctx: BizHawkContext, req_list: typing.List[typing.Dict[str, typing.Any]]) -> typing.List[typing.Dict[str, typing.Any]]:
     """Sends a list of requests to the BizHawk connector and returns their responses.
 
+    Requests sent from different tasks don't wait for each other's responses.
+
     It's likely you want to use the wrapper functions instead of this."""
-    responses = json.loads(await ctx._send_message(json.dumps(req_list)))
+    responses = await ctx._send_requests(req_list)
     errors: typing.List[ConnectorError] = []
 
     for response in responses:
@@ -324,3 +423,27 @@ async def write(ctx: BizHawkContext, write_list: typing.Sequence[typing.Tuple[in
     - `value` is a list of bytes to write, in order, starting at `address`
     - `domain` is the name of the region of memory the address corresponds to"""
     await guarded_write(ctx, write_list, [])
+
+
+async def watch(ctx: BizHawkContext, address: int, size: int, domain: str) -> MemoryWatch:
+    """Subscribes to a range of memory. From then on, the connector script sends only the bytes of the range that
+    changed, once per frame, and the returned watch's `value` is kept up to date without further requests.
+
+    Watches end with the connection to the connector script."""
+    res = (await send_requests(ctx, [{"type": "WATCH", "address": address, "size": size, "domain": domain}]))[0]
+
+    if res["type"] != "WATCH_RESPONSE":
+        raise SyncError(f"Expected response of type WATCH_RESPONSE but got {res['type']}")
+
+    memory_watch = MemoryWatch(res["watch"], address, size, domain, base64.b64decode(res["value"]))
+    ctx.watches[memory_watch.watch_id] = memory_watch
+    return memory_watch
+
+
+async def unwatch(ctx: BizHawkContext, memory_watch: MemoryWatch) -> None:
+    """Ends a subscription made with `watch`."""
+    ctx.watches.pop(memory_watch.watch_id, None)
+    res = (await send_requests(ctx, [{"type": "UNWATCH", "watch": memory_watch.watch_id}]))[0]
+
+    if res["type"] != "UNWATCH_RESPONSE":
+        raise SyncError(f"Expected response of type UNWATCH_RESPONSE but got {res['type']}")
@@ -17,7 +17,7 @@ from . import BizHawkContext, ConnectionStatus, NotConnectedError, RequestFailed
 from .client import BizHawkClient, AutoBizHawkClientRegister
 
 
-EXPECTED_SCRIPT_VERSION = 1
+EXPECTED_SCRIPT_VERSION = 2
 
 
 class AuthStatus(enum.IntEnum):
@@ -0,0 +1,457 @@
+"""
+Declarative access rules that can be used anywhere an access rule callable is expected.
+
+Unlike lambdas, rules built here expose the items and regions they depend on and simplify themselves when combined
+with ``&`` and ``|``. On first evaluation a rule compiles itself against the multiworld, resolving item names to the
+interned indexes of :class:`BaseClasses.ItemCounts` and region names to Regions, so evaluation skips name lookups.
+A rule evaluated for another multiworld is compiled again, so rules can be shared between multiworlds.
+
+Example::
+
+    set_rule(location, Has("Hookshot", player) & (HasAny(("Bombs", "Pegasus Boots"), player) | CanReach("Cave", player)))
+"""
+import typing
+import weakref
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import CollectionState, Entrance, MultiWorld
+
+CompiledRule = typing.Callable[["CollectionState"], bool]
+Dependencies = typing.Dict[int, typing.FrozenSet[str]]
+
+
+def _merge_dependencies(rules: typing.Iterable["Rule"], attribute: str) -> Dependencies:
+    merged: typing.Dict[int, typing.Set[str]] = {}
+    for rule in rules:
+        for player, names in getattr(rule, attribute).items():
+            merged.setdefault(player, set()).update(names)
+    return {player: frozenset(names) for player, names in merged.items()}
+
+
+class Rule:
+    """Base class of all rules. Calling a rule with a CollectionState evaluates it."""
+    __slots__ = ("_compiled",)
+
+    _compiled: typing.Optional[typing.Tuple["weakref.ref[MultiWorld]", CompiledRule]]
+    """the compiled rule and the multiworld it was compiled for"""
+
+    def __init__(self) -> None:
+        self._compiled = None
+
+    def __call__(self, state: "CollectionState") -> bool:
+        compiled = self._compiled
+        if compiled is None or compiled[0]() is not state.multiworld:
+            compiled = self._compiled = weakref.ref(state.multiworld), self.compile(state.multiworld)
+        return compiled[1](state)
+
+    def compile(self, multiworld: "MultiWorld") -> CompiledRule:
+        """Returns a callable evaluating this rule for states of multiworld."""
+        raise NotImplementedError
+
+    @property
+    def item_dependencies(self) -> Dependencies:
+        """Item names this rule depends on, per player."""
+        return {}
+
+    @property
+    def region_dependencies(self) -> Dependencies:
+        """Region names this rule depends on, per player."""
+        return {}
+
+    @property
+    def group_dependencies(self) -> Dependencies:
+        """Item name groups this rule depends on, per player.
+        Their items are not part of item_dependencies, as only the player's world knows them."""
+        return {}
+
+    def __and__(self, other: "Rule") -> "Rule":
+        return And(self, other)
+
+    def __or__(self, other: "Rule") -> "Rule":
+        return Or(self, other)
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        raise NotImplementedError
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and self._key() == other._key()  # type: ignore[attr-defined]
+
+    def __hash__(self) -> int:
+        return hash((type(self), self._key()))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}{self._key()}"
+
+
+class _Constant(Rule):
+    __slots__ = ("value",)
+
+    value: bool
+
+    def __init__(self, value: bool) -> None:
+        super().__init__()
+        self.value = value
+
+    def compile(self, multiworld: "MultiWorld") -> CompiledRule:
+        return (lambda state: True) if self.value else (lambda state: False)
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.value,
+
+    def __repr__(self) -> str:
+        return "True_" if self.value else "False_"
+
+
+True_ = _Constant(True)
+False_ = _Constant(False)
+
+
+class Has(Rule):
+    """Player has at least count copies of item."""
+    __slots__ = ("item", "player", "count")
+
+    def __init__(self, item: str, player: int, count: int = 1) -> None:
+        super().__init__()
+        self.item = item
+        self.player = player
+        self.count = count
+
+    def compile(self, multiworld: "MultiWorld") -> CompiledRule:
+        index = multiworld.item_name_indexes[multiworld.game[self.player]].intern(self.item)
+        player = self.player
+        count = self.count
+
+        def has(state: "CollectionState") -> bool:
+            counts = state.prog_items[player].counts
+            return index < len(counts) and counts[index] >= count
+        return has
+
+    @property
+    def item_dependencies(self) -> Dependencies:
+        return {self.player: frozenset((self.item,))}
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.item, self.player, self.count
+
+
+# reads better for rules about item counts
+Count = Has
+
+
+class _HasMultiple(Rule):
+    __slots__ = ("items", "player")
+
+    items: typing.Tuple[str, ...]
+
+    def __init__(self, items: typing.Iterable[str], player: int) -> None:
+        super().__init__()
+        self.items = tuple(dict.fromkeys(items))
+        self.player = player
+
+    def _indexes(self, multiworld: "MultiWorld") -> typing.Tuple[int, ...]:
+        name_index = multiworld.item_name_indexes[multiworld.game[self.player]]
+        return tuple(name_index.intern(item) for item in self.items)
+
+    @property
+    def item_dependencies(self) -> Dependencies:
+        return {self.player: frozenset(self.items)}
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.items, self.player
+
+
+class HasAll(_HasMultiple):
+    """Player has each of items at least once."""
+    __slots__ = ()
+
+    def compile(self, multiworld: "MultiWorld") -> CompiledRule:
+        indexes = self._indexes(multiworld)
+        player = self.player
+
+        def has_all(state: "CollectionState") -> bool:
+            counts = state.prog_items[player].counts
+            size = len(counts)
+            for index in indexes:
+                if index >= size or not counts[index]:
+                    return False
+            return True
+        return has_all
+
+
+class HasAny(_HasMultiple):
+    """Player has at least one of items."""
+    __slots__ = ()
+
+    def compile(self, multiworld: "MultiWorld") -> CompiledRule:
+        indexes = self._indexes(multiworld)
+        player = self.player
+
+        def has_any(state: "CollectionState") -> bool:
+            counts = state.prog_items[player].counts
+            size = len(counts)
+            for index in indexes:
+                if index < size and counts[index]:
+                    return True
+            return False
+        return has_any
+
+
+class HasFromList(_HasMultiple):
+    """Player has at least count items out of items, duplicates included unless unique is set."""
+    __slots__ = ("count", "unique")
+
+    def __init__(self, items: typing.Iterable[str], player: int, count: int = 1, unique: bool = False) -> None:
+        super().__init__(items, player)
+        self.count = count
+        self.unique = unique
+
+    def compile(self, multiworld: "MultiWorld") -> CompiledRule:
+        indexes = self._indexes(multiworld)
+        player = self.player
+        count = self.count
+        unique = self.unique
+
+        def has_from_list(state: "CollectionState") -> bool:
+            counts = state.prog_items[player].counts
+            size = len(counts)
+            found = 0
+            for index in indexes:
+                if index < size:
+                    found += (counts[index] > 0) if unique else counts[index]
+                    if found >= count:
+                        return True
+            return found >= count
+        return has_from_list
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.items, self.player, self.count, self.unique
+
+
+class HasGroup(Rule):
+    """Player has at least count items of an item name group, duplicates included unless unique is set."""
+    __slots__ = ("group", "player", "count", "unique")
+
+    def __init__(self, group: str, player: int, count: int = 1, unique: bool = False) -> None:
+        super().__init__()
+        self.group = group
+        self.player = player
+        self.count = count
+        self.unique = unique
+
+    def _resolve(self, multiworld: "MultiWorld") -> HasFromList:
+        items = sorted(multiworld.worlds[self.player].item_name_groups[self.group])
+        return HasFromList(items, self.player, self.count, self.unique)
+
+    def compile(self, multiworld: "MultiWorld") -> CompiledRule:
+        return self._resolve(multiworld).compile(multiworld)
+
+    def resolve_items(self, multiworld: "MultiWorld") -> Dependencies:
+        """Returns the group's item names, which are only known to the player's world."""
+        return self._resolve(multiworld).item_dependencies
+
+    @property
+    def group_dependencies(self) -> Dependencies:
+        return {self.player: frozenset((self.group,))}
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.group, self.player, self.count, self.unique
+
+
+class CanReach(Rule):
+    """A Region, Location or Entrance of player is reachable, resolved like CollectionState.can_reach."""
+    __slots__ = ("spot", "player", "resolution_hint")
+
+    def __init__(self, spot: str, player: int, resolution_hint: str = "Region") -> None:
+        super().__init__()
+        self.spot = spot
+        self.player = player
+        self.resolution_hint = resolution_hint
+
+    def compile(self, multiworld: "MultiWorld") -> CompiledRule:
+        if self.resolution_hint == "Location":
+            return multiworld.get_location(self.spot, self.player).can_reach
+        if self.resolution_hint == "Entrance":
+            return multiworld.get_entrance(self.spot, self.player).can_reach
+        return multiworld.get_region(self.spot, self.player).can_reach
+
+    @property
+    def region_dependencies(self) -> Dependencies:
+        if self.resolution_hint == "Region":
+            return {self.player: frozenset((self.spot,))}
+        # Locations and Entrances depend on their parent region, which is only known once regions exist
+        return {}
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.spot, self.player, self.resolution_hint
+
+
+class _Combined(Rule):
+    __slots__ = ("rules",)
+
+    rules: typing.Tuple[Rule, ...]
+    absorbing: typing.ClassVar[_Constant]
+    neutral: typing.ClassVar[_Constant]
+
+    def __new__(cls, *rules: Rule) -> Rule:  # type: ignore[misc]
+        flattened: typing.Dict[Rule, None] = {}
+        for rule in rules:
+            if type(rule) is cls:
+                flattened.update(dict.fromkeys(rule.rules))  # type: ignore[attr-defined]
+            elif rule == cls.absorbing:
+                return cls.absorbing
+            elif rule != cls.neutral:
+                flattened[rule] = None
+        simplified = cls._simplify(list(flattened))
+        if not simplified:
+            return cls.neutral
+        if len(simplified) == 1:
+            return simplified[0]
+        combined = super().__new__(cls)
+        Rule.__init__(combined)
+        combined.rules = tuple(simplified)
+        return combined
+
+    def __init__(self, *rules: Rule) -> None:
+        # everything is set up in __new__
+        pass
+
+    @classmethod
+    def _simplify(cls, rules: typing.List[Rule]) -> typing.List[Rule]:
+        raise NotImplementedError
+
+    @property
+    def item_dependencies(self) -> Dependencies:
+        return _merge_dependencies(self.rules, "item_dependencies")
+
+    @property
+    def region_dependencies(self) -> Dependencies:
+        return _merge_dependencies(self.rules, "region_dependencies")
+
+    @property
+    def group_dependencies(self) -> Dependencies:
+        return _merge_dependencies(self.rules, "group_dependencies")
+
+    def _key(self) -> typing.Tuple[typing.Any, ...]:
+        return self.rules
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({', '.join(map(repr, self.rules))})"
+
+
+def _merge_has(rules: typing.List[Rule], pick_count: typing.Callable[[int, int], int]) -> typing.List[Rule]:
+    """Merges Has rules for the same item and player into one, using pick_count to combine their counts."""
+    merged: typing.Dict[typing.Tuple[str, int], int] = {}
+    for rule in rules:
+        if type(rule) is Has:
+            key = rule.item, rule.player  # type: ignore[attr-defined]
+            count = rule.count  # type: ignore[attr-defined]
+            merged[key] = pick_count(merged[key], count) if key in merged else count
+    result: typing.List[Rule] = []
+    for rule in rules:
+        if type(rule) is Has:
+            key = rule.item, rule.player  # type: ignore[attr-defined]
+            if key in merged:
+                result.append(Has(key[0], key[1], merged.pop(key)))
+        else:
+            result.append(rule)
+    return result
+
+
+class And(_Combined):
+    """All rules are fulfilled."""
+    __slots__ = ()
+
+    absorbing = False_
+    neutral = True_
+
+    @classmethod
+    def _simplify(cls, rules: typing.List[Rule]) -> typing.List[Rule]:
+        rules = _merge_has(rules, max)
+        # single copies of items of the same player are checked together
+        singles: typing.Dict[int, typing.List[str]] = {}
+        for rule in rules:
+            if type(rule) is Has and rule.count == 1:  # type: ignore[attr-defined]
+                singles.setdefault(rule.player, []).append(rule.item)  # type: ignore[attr-defined]
+            elif type(rule) is HasAll:
+                singles.setdefault(rule.player, []).extend(rule.items)  # type: ignore[attr-defined]
+        result: typing.List[Rule] = []
+        for rule in rules:
+            if (type(rule) is Has and rule.count == 1) or type(rule) is HasAll:  # type: ignore[attr-defined]
+                player = rule.player  # type: ignore[attr-defined]
+                if player in singles:
+                    items = singles.pop(player)
+                    result.append(Has(items[0], player) if len(items) == 1 else HasAll(items, player))
+            else:
+                result.append(rule)
+        return result
+
+    def compile(self, multiworld: "MultiWorld") -> CompiledRule:
+        compiled = tuple(rule.compile(multiworld) for rule in self.rules)
+        if len(compiled) == 2:
+            first, second = compiled
+            return lambda state: first(state) and second(state)
+
+        def all_of(state: "CollectionState") -> bool:
+            for rule in compiled:
+                if not rule(state):
+                    return False
+            return True
+        return all_of
+
+
+class Or(_Combined):
+    """At least one of rules is fulfilled."""
+    __slots__ = ()
+
+    absorbing = True_
+    neutral = False_
+
+    @classmethod
+    def _simplify(cls, rules: typing.List[Rule]) -> typing.List[Rule]:
+        rules = _merge_has(rules, min)
+        singles: typing.Dict[int, typing.List[str]] = {}
+        for rule in rules:
+            if type(rule) is Has and rule.count == 1:  # type: ignore[attr-defined]
+                singles.setdefault(rule.player, []).append(rule.item)  # type: ignore[attr-defined]
+            elif type(rule) is HasAny:
+                singles.setdefault(rule.player, []).extend(rule.items)  # type: ignore[attr-defined]
+        result: typing.List[Rule] = []
+        for rule in rules:
+            if (type(rule) is Has and rule.count == 1) or type(rule) is HasAny:  # type: ignore[attr-defined]
+                player = rule.player  # type: ignore[attr-defined]
+                if player in singles:
+                    items = singles.pop(player)
+                    result.append(Has(items[0], player) if len(items) == 1 else HasAny(items, player))
+            else:
+                result.append(rule)
+        return result
+
+    def compile(self, multiworld: "MultiWorld") -> CompiledRule:
+        compiled = tuple(rule.compile(multiworld) for rule in self.rules)
+        if len(compiled) == 2:
+            first, second = compiled
+            return lambda state: first(state) or second(state)
+
+        def any_of(state: "CollectionState") -> bool:
+            for rule in compiled:
+                if rule(state):
+                    return True
+            return False
+        return any_of
+
+
+def get_item_dependencies(multiworld: "MultiWorld", rule: Rule) -> Dependencies:
+    """Item names rule depends on, per player, including the items of the item name groups it depends on."""
+    merged = {player: set(names) for player, names in rule.item_dependencies.items()}
+    for player, groups in rule.group_dependencies.items():
+        item_name_groups = multiworld.worlds[player].item_name_groups
+        for group in groups:
+            merged.setdefault(player, set()).update(item_name_groups[group])
+    return {player: frozenset(names) for player, names in merged.items()}
+
+
+def register_region_dependencies(multiworld: "MultiWorld", entrance: "Entrance", rule: Rule) -> None:
+    """Registers indirect conditions for every region rule depends on, so entrance is rechecked when they change."""
+    for player, region_names in rule.region_dependencies.items():
+        for region_name in region_names:
+            multiworld.register_indirect_condition(multiworld.get_region(region_name, player), entrance)
@@ -3,6 +3,7 @@ import logging
 import typing
 
 from BaseClasses import LocationProgressType, MultiWorld, Location, Region, Entrance
+from .RuleBuilder import Rule
 
 if typing.TYPE_CHECKING:
     import BaseClasses
@@ -105,6 +106,9 @@ def add_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"],
     # empty rule, replace instead of add
     if old_rule is spot.__class__.access_rule:
         spot.access_rule = rule if combine == "and" else old_rule
+    elif isinstance(rule, Rule) and isinstance(old_rule, Rule):
+        # keep declarative rules introspectable
+        spot.access_rule = rule & old_rule if combine == "and" else rule | old_rule
     else:
         if combine == "and":
             spot.access_rule = lambda state: rule(state) and old_rule(state)
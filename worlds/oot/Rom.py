@@ -1,12 +1,17 @@
+import hashlib
 import json
+import logging
 import os
 import platform
+import shutil
 import struct
 import subprocess
 import copy
+import tempfile
 import threading
+import zlib
 from .Utils import subprocess_args, data_path, get_version_bytes, __version__
-from Utils import user_path
+from Utils import cache_path, user_path
 from .ntype import BigStream
 from .crc import calculate_crc
 
@@ -33,32 +38,36 @@ class Rom(BigStream):
             symbols = json.load(stream)
             self.symbols = {name: int(addr, 16) for name, addr in symbols.items()}
 
-        # If decompressed file already exists, read from it
-        if not force_use:
-            if os.path.exists(decomp_file):
-                file = decomp_file
-
-            if file == '':
-                # if not specified, try to read from the previously decompressed rom
-                file = decomp_file
-                try:
+        if Rom.original is not None and not force_use:
+            # the base rom was already read and decompressed in this process
+            self.buffer = copy.copy(Rom.original.buffer)
+        else:
+            # If decompressed file already exists, read from it
+            if not force_use:
+                if os.path.exists(decomp_file):
+                    file = decomp_file
+
+                if file == '':
+                    # if not specified, try to read from the previously decompressed rom
+                    file = decomp_file
+                    try:
+                        self.read_rom(file)
+                    except FileNotFoundError:
+                        # could not find the decompressed rom either
+                        raise FileNotFoundError('Must specify path to base ROM')
+                else:
                     self.read_rom(file)
-                except FileNotFoundError:
-                    # could not find the decompressed rom either
-                    raise FileNotFoundError('Must specify path to base ROM')
             else:
                 self.read_rom(file)
-        else:
-            self.read_rom(file)
 
-        # decompress rom, or check if it's already decompressed
-        self.decompress_rom_file(file, decomp_file, force_use)
+            # decompress rom, or check if it's already decompressed
+            self.decompress_rom_file(file, decomp_file, force_use)
 
-        # Add file to maximum size
-        self.buffer.extend(bytearray([0x00] * (0x4000000 - len(self.buffer))))
-        with double_cache_prevention:
-            if not self.original:
-                Rom.original = self.copy()
+            # Add file to maximum size
+            self.buffer.extend(bytearray([0x00] * (0x4000000 - len(self.buffer))))
+            with double_cache_prevention:
+                if not self.original:
+                    Rom.original = self.copy()
 
         # Add version number to header.
         self.write_bytes(0x35, get_version_bytes(__version__))
@@ -281,9 +290,16 @@ class Rom(BigStream):
         return max_end
 
 
-def compress_rom_file(input_file, output_file):
-    compressor_path = "."
+compressed_files = {}
+"""compressed dma files of the last compression by the hash of their decompressed contents"""
+compressed_cache_size = 256 * 1024 * 1024
+"""size in bytes the compressed file cache is pruned to, removing the least recently used files first"""
+compression_lock = threading.Lock()
+empty_yaz0 = b"Yaz0" + bytes(28)
+"""what the Compress tool makes of an empty file"""
+
 
+def get_compressor_path():
     if platform.system() == 'Windows':
         executable_path = "Compress.exe"
     elif platform.system() == 'Linux':
@@ -295,9 +311,178 @@ def compress_rom_file(input_file, output_file):
         executable_path = "Compress.out"
     else:
         raise RuntimeError('Unsupported operating system for compression.')
-    compressor_path = os.path.join(compressor_path, executable_path)
+    compressor_path = data_path("Compress", executable_path)
     if not os.path.exists(compressor_path):
         raise RuntimeError(f'Compressor does not exist! Please place it at {compressor_path}.')
-    import logging
-    logging.info(subprocess.check_output([compressor_path, input_file, output_file],
+    return compressor_path
+
+
+def find_dma_table(rom):
+    # the dma table starts with the entry of the makerom, which ends at 0x1060, like the Compress tool finds it
+    for address in range(0x1060, len(rom) - 0x10, 0x10):
+        if rom[address:address + 8] == b"\x00\x00\x00\x00\x00\x00\x10\x60":
+            return address
+    raise RuntimeError("Couldn't find dma table in ROM!")
+
+
+def get_compression_modes(count):
+    # 1 to compress the file, 0 to copy it, 2 to leave it out, as set by the Compress tool's dmaTable.dat
+    # the tool's list leaves out the last file, which it ends up copying
+    modes = [1] * (count - 1) + [0]
+    modes[:3] = [0, 0, 0]
+    with open(data_path("Compress", "dmaTable.dat"), 'r') as stream:
+        for index in map(int, stream.read().split()):
+            if index < 0:
+                modes[-index] = 2
+            else:
+                modes[index] = 0
+    return modes
+
+
+def load_compressed_file(digest):
+    file = cache_path("oot", "compressed", digest)
+    data = compressed_files.get(digest)
+    if data is None:
+        try:
+            with open(file, 'rb') as stream:
+                data = stream.read()
+        except FileNotFoundError:
+            return None
+    # the modification time marks when a file was last used, for prune_compressed_files
+    try:
+        os.utime(file)
+    except OSError:
+        pass
+    return data
+
+
+def store_compressed_file(digest, data):
+    file = cache_path("oot", "compressed", digest)
+    os.makedirs(os.path.dirname(file), exist_ok=True)
+    # write next to the target and rename, so that a concurrent patcher never reads a partial file
+    temp_file = f"{file}.{os.getpid()}.{threading.get_ident()}"
+    with open(temp_file, 'wb') as stream:
+        stream.write(data)
+    os.replace(temp_file, file)
+
+
+def prune_compressed_files(keep):
+    """Removes the least recently used files from the cache until it fits in compressed_cache_size.
+    The files in keep are never removed."""
+    files = []
+    with os.scandir(cache_path("oot", "compressed")) as entries:
+        for entry in entries:
+            # skip the temporary files of concurrent patchers
+            if "." in entry.name or entry.name in keep:
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    size = sum(file_size for _, file_size, _ in files) + sum(map(len, keep.values()))
+    for _, file_size, path in sorted(files):
+        if size <= compressed_cache_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        size -= file_size
+
+
+def run_compressor(rom, table_start, compressed, missing):
+    """Compresses the missing files with the Compress tool.
+    The files that are already compressed are emptied in the tool's input, which makes it skip them."""
+    rom = bytearray(rom)
+    for index in compressed:
+        entry = table_start + 0x10 * index
+        rom[entry + 4:entry + 8] = rom[entry:entry + 4]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        shutil.copyfile(data_path("Compress", "dmaTable.dat"), os.path.join(temp_dir, "dmaTable.dat"))
+        with open(os.path.join(temp_dir, "input.z64"), 'wb') as stream:
+            stream.write(rom)
+        logging.info(subprocess.check_output([get_compressor_path(), "input.z64", "output.z64"], cwd=temp_dir,
                                              **subprocess_args(include_stdout=False)))
+        with open(os.path.join(temp_dir, "output.z64"), 'rb') as stream:
+            output = stream.read()
+    result = {}
+    for index in missing:
+        start, end = struct.unpack_from(">II", output, table_start + 0x10 * index + 8)
+        result[index] = output[start:end]
+    return result
+
+
+def compress_rom(rom):
+    """Compresses a decompressed rom like the Compress tool does.
+    Files that were compressed before are taken from the cache, only new ones are given to the tool."""
+    table_start = find_dma_table(rom)
+    dmadata_start, dmadata_end, _, _ = struct.unpack_from(">IIII", rom, table_start + 0x20)
+    table_size = dmadata_end - dmadata_start
+    count = table_size // 0x10
+    table = [struct.unpack_from(">IIII", rom, table_start + 0x10 * index) for index in range(count)]
+    modes = get_compression_modes(count)
+
+    with compression_lock:
+        compressed = {}
+        digests = {}
+        for index in range(3, count):
+            start, end, _, _ = table[index]
+            if modes[index] != 1:
+                continue
+            if start == end:
+                compressed[index] = empty_yaz0
+                continue
+            digests[index] = hashlib.sha1(rom[start:end]).hexdigest()
+            data = load_compressed_file(digests[index])
+            if data is not None:
+                compressed[index] = data
+        missing = [index for index in digests if index not in compressed]
+        if missing:
+            logging.info(f"Compressing {len(missing)} of {len(digests)} files.")
+            for index, data in run_compressor(rom, table_start, compressed, missing).items():
+                store_compressed_file(digests[index], data)
+                compressed[index] = data
+        # only the files of this rom stay in memory, as the next rom is usually patched from the same base rom
+        compressed_files.clear()
+        compressed_files.update((digests[index], compressed[index]) for index in digests)
+        if missing:
+            prune_compressed_files(compressed_files)
+
+    files = []
+    for index in range(3, count):
+        start, end, _, _ = table[index]
+        if modes[index] == 1:
+            files.append(compressed[index])
+        elif modes[index] == 2:
+            files.append(b"")
+        else:
+            files.append(rom[start:end])
+    output = bytearray(max(0x2000000, table_start + table_size + sum(map(len, files))))
+    output[:table_start + table_size] = rom[:table_start + table_size]
+    address = table_start + table_size
+    for index, data in enumerate(files, 3):
+        start, end, physical_start, physical_end = table[index]
+        if start != end:
+            physical_start = address
+            if modes[index] == 1:
+                physical_end = physical_start + len(data)
+            elif modes[index] == 2:
+                physical_start = physical_end = 0xFFFFFFFF
+            if physical_start != 0xFFFFFFFF:
+                output[physical_start:physical_start + len(data)] = data
+            struct.pack_into(">IIII", output, table_start + 0x10 * index, start, end, physical_start, physical_end)
+        address += len(data)
+
+    # only CIC-6105 boot code, which OoT uses, gets its crc fixed like the Compress tool does
+    if zlib.crc32(output[0x40:0x1000]) == 0x98BC2C86:
+        output[0x10:0x18] = calculate_crc(BigStream(output))
+    return output
+
+
+def compress_rom_file(input_file, output_file):
+    with open(input_file, 'rb') as stream:
+        rom = stream.read()
+    output = compress_rom(rom)
+    with open(output_file, 'wb') as stream:
+        stream.write(output)
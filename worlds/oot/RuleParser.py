@@ -1,6 +1,7 @@
 import ast
 from collections import defaultdict
 from inspect import signature, _ParameterKind
+from types import FunctionType
 import logging
 import re
 
@@ -30,6 +31,14 @@ kwarg_defaults = {
 
 allowed_globals = {'TimeOfDay': TimeOfDay}
 
+# Parsed rules don't refer to a player, so players with the same settings share them.
+# rule string -> list of (the settings and spot details the rule read, events it added, ast dump of the rule)
+parsed_rules = defaultdict(list)
+# ast dump of a rule -> its lambda, which each player gets a copy of with their own keyword defaults
+compiled_rules = {}
+# stands for a setting the world doesn't have
+missing = object()
+
 rule_aliases = {}
 nonaliases = set()
 
@@ -67,10 +76,14 @@ class Rule_AST_Transformer(ast.NodeTransformer):
         self.rule_cache = {}
         self.kwarg_defaults = kwarg_defaults.copy()  # otherwise this gets contaminated between players
         self.kwarg_defaults['player'] = self.player
+        # what the rule being parsed depends on, to know which players can share it
+        self.rule_dependencies = {}
+        self.rule_events = set()
+        self.rule_shareable = True
 
 
     def visit_Name(self, node):
-        if node.id in dir(self):
+        if hasattr(self, node.id):
             return getattr(self, node.id)(node)
         elif node.id in rule_aliases:
             args, repl = rule_aliases[node.id]
@@ -84,23 +97,23 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                     value=ast.Name(id='state', ctx=ast.Load()),
                     attr='has',
                     ctx=ast.Load()),
-                args=[ast.Str(escaped_items[node.id]), ast.Constant(self.player)],
+                args=[ast.Str(escaped_items[node.id]), ast.Name(id='player', ctx=ast.Load())],
                 keywords=[])
-        elif node.id in self.world.__dict__:
+        elif self.setting(node.id) is not missing:
             # Settings are constant
-            return ast.parse('%r' % self.world.__dict__[node.id], mode='eval').body
+            return ast.parse('%r' % self.setting(node.id), mode='eval').body
         elif node.id in State.__dict__:
             return self.make_call(node, node.id, [], [])
         elif node.id in self.kwarg_defaults or node.id in allowed_globals:
             return node
         elif event_name.match(node.id):
-            self.events.add(node.id.replace('_', ' '))
+            self.add_event(node.id.replace('_', ' '))
             return ast.Call(
                 func=ast.Attribute(
                     value=ast.Name(id='state', ctx=ast.Load()),
                     attr='has',
                     ctx=ast.Load()),
-                args=[ast.Str(node.id.replace('_', ' ')), ast.Constant(self.player)],
+                args=[ast.Str(node.id.replace('_', ' ')), ast.Name(id='player', ctx=ast.Load())],
                 keywords=[])
         else:
             raise Exception('Parse Error: invalid node name %s' % node.id, self.current_spot.name, ast.dump(node, False))
@@ -111,7 +124,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                 value=ast.Name(id='state', ctx=ast.Load()),
                 attr='has',
                 ctx=ast.Load()),
-            args=[ast.Str(node.s), ast.Constant(self.player)],
+            args=[ast.Str(node.s), ast.Name(id='player', ctx=ast.Load())],
             keywords=[])
 
     # python 3.8 compatibility: ast walking now uses visit_Constant for Constant subclasses
@@ -137,20 +150,20 @@ class Rule_AST_Transformer(ast.NodeTransformer):
 
         if isinstance(count, ast.Name):
             # Must be a settings constant
-            count = ast.parse('%r' % self.world.__dict__[count.id], mode='eval').body
+            count = ast.parse('%r' % self.setting(count.id), mode='eval').body
 
         if iname in escaped_items:
             iname = escaped_items[iname]
 
         if iname not in item_table:
-            self.events.add(iname)
+            self.add_event(iname)
 
         return ast.Call(
             func=ast.Attribute(
                 value=ast.Name(id='state', ctx=ast.Load()),
                 attr='has',
                 ctx=ast.Load()),
-            args=[ast.Str(iname), ast.Constant(self.player), count],
+            args=[ast.Str(iname), ast.Name(id='player', ctx=ast.Load()), count],
             keywords=[])
 
 
@@ -158,7 +171,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
         if not isinstance(node.func, ast.Name):
             return node
 
-        if node.func.id in dir(self):
+        if hasattr(self, node.func.id):
             return getattr(self, node.func.id)(node)
         elif node.func.id in rule_aliases:
             args, repl = rule_aliases[node.func.id]
@@ -182,7 +195,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
         new_args = []
         for child in node.args:
             if isinstance(child, ast.Name):
-                if child.id in self.world.__dict__:
+                if self.setting(child.id) is not missing:
                     # child = ast.Attribute(
                     #     value=ast.Attribute(
                     #         value=ast.Name(id='state', ctx=ast.Load()),
@@ -190,7 +203,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                     #         ctx=ast.Load()),
                     #     attr=child.id,
                     #     ctx=ast.Load())
-                    child = ast.Constant(getattr(self.world, child.id))
+                    child = ast.Constant(self.setting(child.id))
                 elif child.id in rule_aliases:
                     child = self.visit(child)
                 elif child.id in escaped_items:
@@ -221,7 +234,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                                 ctx=ast.Load()),
                             attr='worlds',
                             ctx=ast.Load()),
-                        slice=ast.Index(value=ast.Constant(self.player)),
+                        slice=ast.Index(value=ast.Name(id='player', ctx=ast.Load())),
                         ctx=ast.Load()),
                     attr=node.value.id,
                     ctx=ast.Load()),
@@ -242,7 +255,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
         # Fast check for json can_use
         if (len(node.ops) == 1 and isinstance(node.ops[0], ast.Eq)
                 and isinstance(node.left, ast.Name) and isinstance(node.comparators[0], ast.Name)
-                and node.left.id not in self.world.__dict__ and node.comparators[0].id not in self.world.__dict__):
+                and self.setting(node.left.id) is missing and self.setting(node.comparators[0].id) is missing):
             return ast.NameConstant(node.left.id == node.comparators[0].id)
 
         node.left = escape_or_string(node.left)
@@ -325,7 +338,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                     value=ast.Name(id='state', ctx=ast.Load()),
                     attr='has_any' if early_return else 'has_all',
                     ctx=ast.Load()),
-                args=[ast.Tuple(elts=[ast.Str(i) for i in items], ctx=ast.Load()), ast.Constant(self.player)],
+                args=[ast.Tuple(elts=[ast.Str(i) for i in items], ctx=ast.Load()), ast.Name(id='player', ctx=ast.Load())],
                 keywords=[])] + new_values
         else:
             node.values = new_values
@@ -341,8 +354,9 @@ class Rule_AST_Transformer(ast.NodeTransformer):
         if not hasattr(State, name):
             raise Exception('Parse Error: No such function State.%s' % name, self.current_spot.name, ast.dump(node, False))
 
-        for (k, v) in self.kwarg_defaults.items():
-            keywords.append(ast.keyword(arg=f'{k}', value=ast.Constant(v)))
+        # pass on the lambda's own keyword args, which hold the values for this player
+        for k in self.kwarg_defaults.keys():
+            keywords.append(ast.keyword(arg=f'{k}', value=ast.Name(id=k, ctx=ast.Load())))
 
         return ast.Call(
             func=ast.Attribute(
@@ -354,6 +368,8 @@ class Rule_AST_Transformer(ast.NodeTransformer):
 
 
     def replace_subrule(self, target, node):
+        # subrules are numbered per player, so rules with them can't be shared
+        self.rule_shareable = False
         rule = ast.dump(node, False)
         if rule in self.replaced_rules[target]:
             return self.replaced_rules[target][rule]
@@ -367,7 +383,7 @@ class Rule_AST_Transformer(ast.NodeTransformer):
                 value=ast.Name(id='state', ctx=ast.Load()),
                 attr='has',
                 ctx=ast.Load()),
-            args=[ast.Str(subrule_name), ast.Constant(self.player)],
+            args=[ast.Str(subrule_name), ast.Name(id='player', ctx=ast.Load())],
             keywords=[])
         # Cache the subrule for any others in this region
         # (and reserve the item name in the process)
@@ -401,30 +417,61 @@ class Rule_AST_Transformer(ast.NodeTransformer):
 
 
     def make_access_rule(self, body):
-        rule_str = ast.dump(body, False)
+        return self.get_access_rule(ast.dump(body, False), body)
+
+
+    def get_access_rule(self, rule_str, body=None):
         if rule_str not in self.rule_cache:
-            # requires consistent iteration on dicts
-            kwargs = [ast.arg(arg=k) for k in self.kwarg_defaults.keys()]
-            kwd = list(map(ast.Constant, self.kwarg_defaults.values()))
-            try:
-                self.rule_cache[rule_str] = eval(compile(
-                    ast.fix_missing_locations(
-                        ast.Expression(ast.Lambda(
-                            args=ast.arguments(
-                                posonlyargs=[],
-                                args=[ast.arg(arg='state')],
-                                defaults=[],
-                                kwonlyargs=kwargs,
-                                kw_defaults=kwd),
-                            body=body))),
-                    '<string>', 'eval'),
-                    # globals/locals. if undefined, everything in the namespace *now* would be allowed
-                    allowed_globals)
-            except TypeError as e:
-                raise Exception('Parse Error: %s' % e, self.current_spot.name, ast.dump(body, False))
+            if rule_str not in compiled_rules:
+                # requires consistent iteration on dicts
+                kwargs = [ast.arg(arg=k) for k in self.kwarg_defaults.keys()]
+                kwd = list(map(ast.Constant, self.kwarg_defaults.values()))
+                try:
+                    compiled_rules[rule_str] = eval(compile(
+                        ast.fix_missing_locations(
+                            ast.Expression(ast.Lambda(
+                                args=ast.arguments(
+                                    posonlyargs=[],
+                                    args=[ast.arg(arg='state')],
+                                    defaults=[],
+                                    kwonlyargs=kwargs,
+                                    kw_defaults=kwd),
+                                body=body))),
+                        '<string>', 'eval'),
+                        # globals/locals. if undefined, everything in the namespace *now* would be allowed
+                        allowed_globals)
+                except TypeError as e:
+                    raise Exception('Parse Error: %s' % e, self.current_spot.name, ast.dump(body, False))
+            shared_rule = compiled_rules[rule_str]
+            rule = FunctionType(shared_rule.__code__, shared_rule.__globals__, shared_rule.__name__)
+            rule.__kwdefaults__ = self.kwarg_defaults.copy()
+            self.rule_cache[rule_str] = rule
         return self.rule_cache[rule_str]
 
 
+    # Settings and details of the current spot are looked up through these,
+    # so that a rule can be shared with the players that have the same ones.
+    def setting(self, name):
+        value = self.world.__dict__.get(name, missing)
+        self.rule_dependencies[name] = value
+        return value
+
+    def get_spot_detail(self, detail):
+        if detail == 'type':
+            return self.current_spot.type
+        return (self.current_spot if type(self.current_spot) == OOTRegion else self.current_spot.parent_region).name
+
+    def spot_detail(self, detail):
+        value = self.get_spot_detail(detail)
+        # spot details are told apart from settings by not being valid names
+        self.rule_dependencies['spot ' + detail] = value
+        return value
+
+    def add_event(self, event):
+        self.events.add(event)
+        self.rule_events.add(event)
+
+
     ## Handlers for specific internal functions used in the json logic.
 
     # at(region_name, rule)
@@ -448,30 +495,30 @@ class Rule_AST_Transformer(ast.NodeTransformer):
     ## Handlers for compile-time optimizations (former State functions)
 
     def at_day(self, node):
-        if self.world.ensure_tod_access:
+        if self.setting('ensure_tod_access'):
             # tod has DAY or (tod == NONE and (ss or find a path from a provider))
             # parsing is better than constructing this expression by hand
-            r = self.current_spot if type(self.current_spot) == OOTRegion else self.current_spot.parent_region
-            return ast.parse(f"(state.has('Ocarina', player) and state.has('Suns Song', player)) or state._oot_reach_at_time('{r.name}', TimeOfDay.DAY, [], player)", mode='eval').body
+            r = self.spot_detail('region')
+            return ast.parse(f"(state.has('Ocarina', player) and state.has('Suns Song', player)) or state._oot_reach_at_time('{r}', TimeOfDay.DAY, [], player)", mode='eval').body
         return ast.NameConstant(True)
 
     def at_dampe_time(self, node):
-        if self.world.ensure_tod_access:
+        if self.setting('ensure_tod_access'):
             # tod has DAMPE or (tod == NONE and (find a path from a provider))
             # parsing is better than constructing this expression by hand
-            r = self.current_spot if type(self.current_spot) == OOTRegion else self.current_spot.parent_region
-            return ast.parse(f"state._oot_reach_at_time('{r.name}', TimeOfDay.DAMPE, [], player)", mode='eval').body
+            r = self.spot_detail('region')
+            return ast.parse(f"state._oot_reach_at_time('{r}', TimeOfDay.DAMPE, [], player)", mode='eval').body
         return ast.NameConstant(True)
 
     def at_night(self, node):
-        if self.current_spot.type == 'GS Token' and self.world.logic_no_night_tokens_without_suns_song:
+        if self.spot_detail('type') == 'GS Token' and self.setting('logic_no_night_tokens_without_suns_song'):
             # Using visit here to resolve 'can_play' rule
             return self.visit(ast.parse('can_play(Suns_Song)', mode='eval').body)
-        if self.world.ensure_tod_access:
+        if self.setting('ensure_tod_access'):
             # tod has DAMPE or (tod == NONE and (ss or find a path from a provider))
             # parsing is better than constructing this expression by hand
-            r = self.current_spot if type(self.current_spot) == OOTRegion else self.current_spot.parent_region
-            return ast.parse(f"(state.has('Ocarina', player) and state.has('Suns Song', player)) or state._oot_reach_at_time('{r.name}', TimeOfDay.DAMPE, [], player)", mode='eval').body
+            r = self.spot_detail('region')
+            return ast.parse(f"(state.has('Ocarina', player) and state.has('Suns Song', player)) or state._oot_reach_at_time('{r}', TimeOfDay.DAMPE, [], player)", mode='eval').body
         return ast.NameConstant(True)
 
 
@@ -479,7 +526,31 @@ class Rule_AST_Transformer(ast.NodeTransformer):
     # If spot is None, here() rules won't work.
     def parse_rule(self, rule_string, spot=None):
         self.current_spot = spot
-        return self.make_access_rule(self.visit(ast.parse(rule_string, mode='eval').body))
+        for dependencies, events, rule_str in parsed_rules[rule_string]:
+            if all(self.depends_on(key, value) for key, value in dependencies.items()):
+                self.events.update(events)
+                return self.get_access_rule(rule_str)
+
+        self.rule_dependencies = dependencies = {}
+        self.rule_events = events = set()
+        self.rule_shareable = True
+        body = self.visit(ast.parse(rule_string, mode='eval').body)
+        rule_str = ast.dump(body, False)
+        access_rule = self.get_access_rule(rule_str, body)
+        if self.rule_shareable:
+            parsed_rules[rule_string].append((dependencies, events, rule_str))
+        # delayed rules are visited outside of this, and must not add to what was saved
+        self.rule_dependencies = {}
+        self.rule_events = set()
+        return access_rule
+
+    def depends_on(self, key, value):
+        if key.startswith('spot '):
+            current = self.get_spot_detail(key[5:])
+        else:
+            current = self.world.__dict__.get(key, missing)
+        # True and 1 are equal, but are different settings for a rule
+        return type(current) is type(value) and current == value
 
     def parse_spot_rule(self, spot):
         rule = spot.rule_string.split('#', 1)[0].strip()
@@ -493,21 +564,21 @@ class Rule_AST_Transformer(ast.NodeTransformer):
 
     # Hijacking functions
     def current_spot_child_access(self, node): 
-        r = self.current_spot if type(self.current_spot) == OOTRegion else self.current_spot.parent_region
-        return ast.parse(f"state._oot_reach_as_age('{r.name}', 'child', {self.player})", mode='eval').body
+        r = self.spot_detail('region')
+        return ast.parse(f"state._oot_reach_as_age('{r}', 'child', player)", mode='eval').body
 
     def current_spot_adult_access(self, node): 
-        r = self.current_spot if type(self.current_spot) == OOTRegion else self.current_spot.parent_region
-        return ast.parse(f"state._oot_reach_as_age('{r.name}', 'adult', {self.player})", mode='eval').body
+        r = self.spot_detail('region')
+        return ast.parse(f"state._oot_reach_as_age('{r}', 'adult', player)", mode='eval').body
 
     def current_spot_starting_age_access(self, node): 
-        return self.current_spot_child_access(node) if self.world.starting_age == 'child' else self.current_spot_adult_access(node)
+        return self.current_spot_child_access(node) if self.setting('starting_age') == 'child' else self.current_spot_adult_access(node)
 
     def has_bottle(self, node): 
-        return ast.parse(f"state._oot_has_bottle({self.player})", mode='eval').body
+        return ast.parse("state._oot_has_bottle(player)", mode='eval').body
 
     def can_live_dmg(self, node):
-        return ast.parse(f"state._oot_can_live_dmg({self.player}, {node.args[0].value})", mode='eval').body
+        return ast.parse(f"state._oot_can_live_dmg(player, {node.args[0].value})", mode='eval').body
 
     def region_has_shortcuts(self, node):
-        return ast.parse(f"state._oot_region_has_shortcuts({self.player}, '{node.args[0].value}')", mode='eval').body
+        return ast.parse(f"state._oot_region_has_shortcuts(player, '{node.args[0].value}')", mode='eval').body
@@ -0,0 +1,99 @@
+import importlib
+import os
+import random
+import shutil
+import struct
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+# the package exports the Rom class under the module's name
+rom_module = importlib.import_module("worlds.oot.Rom")
+
+table_start = 0x7430
+file_count = 1600
+
+
+def make_rom() -> bytearray:
+    """Makes a rom with a dma table like OoT's, with small files to compress"""
+    random_ = random.Random(0)
+    rom = bytearray(table_start + file_count * 0x10)
+    table = [(0, 0x1060), (0x1060, table_start), (table_start, len(rom))]
+    for index in range(3, file_count):
+        size = random_.choice((0, 16, 100, 256))
+        table.append((len(rom), len(rom) + size))
+        rom += bytes(byte % 5 if random_.random() < 0.8 else random_.getrandbits(8) for byte in range(size))
+        rom += bytes(-len(rom) % 0x10)
+    for index, (start, end) in enumerate(table):
+        struct.pack_into(">IIII", rom, table_start + 0x10 * index, start, end, start, 0)
+    rom += bytes(0x2000000 - len(rom))
+    return rom
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        cache_path = mock.patch.object(rom_module, "cache_path",
+                                       lambda *path: os.path.join(self.temp_dir.name, "cache", *path))
+        cache_path.start()
+        self.addCleanup(cache_path.stop)
+        rom_module.compressed_files.clear()
+        self.addCleanup(rom_module.compressed_files.clear)
+        self.addCleanup(self.temp_dir.cleanup)
+        self.rom = make_rom()
+
+    def run_tool(self) -> bytes:
+        """Compresses the rom with the Compress tool alone"""
+        try:
+            compressor_path = rom_module.get_compressor_path()
+        except RuntimeError as error:
+            self.skipTest(str(error))
+        shutil.copyfile(rom_module.data_path("Compress", "dmaTable.dat"),
+                        os.path.join(self.temp_dir.name, "dmaTable.dat"))
+        with open(os.path.join(self.temp_dir.name, "input.z64"), "wb") as stream:
+            stream.write(self.rom)
+        try:
+            subprocess.check_output([compressor_path, "input.z64", "output.z64"], cwd=self.temp_dir.name)
+        except OSError as error:
+            self.skipTest(f"Compressor can't run here: {error}")
+        with open(os.path.join(self.temp_dir.name, "output.z64"), "rb") as stream:
+            return stream.read()
+
+    def test_matches_compressor(self) -> None:
+        """Tests that the rom is compressed exactly like the Compress tool does, with and without the cache"""
+        expected = self.run_tool()
+        self.assertEqual(rom_module.compress_rom(self.rom), expected)
+        rom_module.compressed_files.clear()
+        with mock.patch.object(rom_module, "run_compressor") as run_compressor:
+            self.assertEqual(rom_module.compress_rom(self.rom), expected)
+        run_compressor.assert_not_called()
+
+    def test_changed_file(self) -> None:
+        """Tests that only the files that changed since the last compression are compressed again"""
+        self.run_tool()
+        rom_module.compress_rom(self.rom)
+        start = struct.unpack_from(">I", self.rom, table_start + 0x10 * 1100)[0]
+        self.rom[start] ^= 0xFF
+        with mock.patch.object(rom_module, "run_compressor", wraps=rom_module.run_compressor) as run_compressor:
+            rom_module.compress_rom(self.rom)
+        self.assertEqual(run_compressor.call_args.args[3], [1100])
+
+    def test_prune(self) -> None:
+        """Tests that the least recently used files are removed from the cache once it's too big"""
+        for index, digest in enumerate(("a", "b", "c", "d")):
+            rom_module.store_compressed_file(digest, bytes(100))
+            os.utime(rom_module.cache_path("oot", "compressed", digest), (index, index))
+        self.assertIsNotNone(rom_module.load_compressed_file("a"))
+        with mock.patch.object(rom_module, "compressed_cache_size", 250):
+            rom_module.prune_compressed_files({"e": bytes(50)})
+        self.assertEqual(sorted(os.listdir(rom_module.cache_path("oot", "compressed"))), ["a", "d"])
+
+    def test_memory(self) -> None:
+        """Tests that only the files of the last compressed rom are kept in memory"""
+        rom_module.compressed_files["old"] = bytes(100)
+        with mock.patch.object(rom_module, "run_compressor",
+                               lambda rom, table_start, compressed, missing: dict.fromkeys(missing, b"Yaz0")):
+            rom_module.compress_rom(self.rom)
+        self.assertNotIn("old", rom_module.compressed_files)
+        self.assertEqual(set(rom_module.compressed_files.values()), {b"Yaz0"})
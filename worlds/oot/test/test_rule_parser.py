@@ -0,0 +1,31 @@
+import unittest
+
+from BaseClasses import CollectionState
+from test.general import setup_multiworld
+
+from .. import OOTWorld
+
+
+class TestSharedRules(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = setup_multiworld([OOTWorld, OOTWorld], ("generate_early",))
+
+    def test_shared_between_players(self) -> None:
+        """Tests that players with the same settings share a rule, which still checks each player's own items"""
+        rule_1 = self.multiworld.worlds[1].parser.parse_rule("(Progressive_Wallet, 2)")
+        rule_2 = self.multiworld.worlds[2].parser.parse_rule("(Progressive_Wallet, 2)")
+        self.assertIs(rule_1.__code__, rule_2.__code__)
+
+        state = CollectionState(self.multiworld)
+        for _ in range(2):
+            state.collect(self.multiworld.worlds[2].create_item("Progressive Wallet"), True)
+        self.assertFalse(rule_1(state))
+        self.assertTrue(rule_2(state))
+
+    def test_depends_on_settings(self) -> None:
+        """Tests that a rule is parsed again for a player whose settings it depends on differ"""
+        self.multiworld.worlds[2].logic_grottos_without_agony = True
+        rule_1 = self.multiworld.worlds[1].parser.parse_rule("logic_grottos_without_agony")
+        rule_2 = self.multiworld.worlds[2].parser.parse_rule("logic_grottos_without_agony")
+        self.assertIsNot(rule_1.__code__, rule_2.__code__)
+        self.assertTrue(rule_2(CollectionState(self.multiworld)))
@@ -1,5 +1,3 @@
-from collections import Counter
-
 from .. import SVTestBase
 from ... import Event, options
 from ...options import ToolProgression, SeasonRandomization
@@ -15,7 +13,7 @@ class TestProgressiveToolsLogic(SVTestBase):
     }
 
     def test_sturgeon(self):
-        self.multiworld.state.prog_items = {1: Counter()}
+        self.multiworld.state.prog_items[1].clear()
 
         sturgeon_rule = self.world.logic.has("Sturgeon")
         self.assert_rule_false(sturgeon_rule, self.multiworld.state)
@@ -51,7 +49,7 @@ class TestProgressiveToolsLogic(SVTestBase):
         self.assert_rule_false(sturgeon_rule, self.multiworld.state)
 
     def test_old_master_cannoli(self):
-        self.multiworld.state.prog_items = {1: Counter()}
+        self.multiworld.state.prog_items[1].clear()
 
         self.multiworld.state.collect(self.create_item("Progressive Axe"), prevent_sweep=False)
         self.multiworld.state.collect(self.create_item("Progressive Axe"), prevent_sweep=False)
@@ -348,7 +348,7 @@ class TunicWorld(World):
         if self.options.entrance_rando:
             hint_data.update({self.player: {}})
             # all state seems to have efficient paths
-            all_state = self.multiworld.get_all_state(True)
+            all_state = self.multiworld.get_all_state(True, track_paths=True)
             all_state.update_reachable_regions(self.player)
             paths = all_state.path
             portal_names = [portal.name for portal in portal_mapping]
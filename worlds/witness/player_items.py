@@ -48,7 +48,10 @@ class WitnessPlayerItems:
         self._locations: WitnessPlayerLocations = player_locations
 
         # Duplicate the static item data, then make any player-specific adjustments to classification.
-        self.item_data: Dict[str, ItemData] = copy.deepcopy(static_witness_items.ITEM_DATA)
+        # Item definitions are shared, since only the classification gets adjusted.
+        self.item_data: Dict[str, ItemData] = {
+            name: copy.copy(data) for name, data in static_witness_items.ITEM_DATA.items()
+        }
 
         # Remove all progression items that aren't actually in the game.
         self.item_data = {
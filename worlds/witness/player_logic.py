@@ -15,7 +15,6 @@ On __init__, the base logic is read and all panels are given Location IDs.
 When the world has parsed its options, a second function is called to finalize the logic.
 """
 
-import copy
 from collections import defaultdict
 from typing import TYPE_CHECKING, Dict, List, Set, Tuple, cast
 
@@ -96,13 +95,14 @@ class WitnessPlayerLogic:
         elif self.DIFFICULTY == "none":
             self.REFERENCE_LOGIC = static_witness_logic.vanilla
 
-        self.CONNECTIONS_BY_REGION_NAME_THEORETICAL: Dict[str, Set[Tuple[str, WitnessRule]]] = copy.deepcopy(
-            self.REFERENCE_LOGIC.STATIC_CONNECTIONS_BY_REGION_NAME
-        )
-        self.CONNECTIONS_BY_REGION_NAME: Dict[str, Set[Tuple[str, WitnessRule]]] = copy.deepcopy(
-            self.REFERENCE_LOGIC.STATIC_CONNECTIONS_BY_REGION_NAME
-        )
-        self.DEPENDENT_REQUIREMENTS_BY_HEX: Dict[str, Dict[str, WitnessRule]] = copy.deepcopy(
+        # Rules are immutable and requirement dicts are only ever replaced as a whole, so these copies can be shallow.
+        # Only the connection sets get modified in place.
+        self.CONNECTIONS_BY_REGION_NAME_THEORETICAL: Dict[str, Set[Tuple[str, WitnessRule]]] = {
+            region_name: set(connections)
+            for region_name, connections in self.REFERENCE_LOGIC.STATIC_CONNECTIONS_BY_REGION_NAME.items()
+        }
+        self.CONNECTIONS_BY_REGION_NAME: Dict[str, Set[Tuple[str, WitnessRule]]] = {}
+        self.DEPENDENT_REQUIREMENTS_BY_HEX: Dict[str, Dict[str, WitnessRule]] = dict(
             self.REFERENCE_LOGIC.STATIC_DEPENDENT_REQUIREMENTS_BY_HEX
         )
         self.REQUIREMENTS_BY_HEX: Dict[str, WitnessRule] = {}
@@ -142,11 +142,11 @@ class WitnessPlayerLogic:
         # However, for any given world, the options (e.g. which item shuffles are enabled) affect the requirements.
         self.make_options_adjustments(world)
         self.determine_unrequired_entities(world)
-        self.find_unsolvable_entities(world)
 
         # After we have adjusted the raw requirements, we perform a dependency reduction for the entity requirements.
         # This will make the access conditions way faster, instead of recursively checking dependent entities each time.
-        self.make_dependency_reduced_checklist()
+        # Finding unsolvable entities repeats this reduction until nothing changes, so its last result is final.
+        self.find_unsolvable_entities(world)
 
         if world.options.victory_condition == "panel_hunt":
             picker = EntityHuntPicker(self, world, self.PRE_PICKED_HUNT_ENTITIES)
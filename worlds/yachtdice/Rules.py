@@ -1,5 +1,9 @@
 import math
+from bisect import bisect_left
 from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import accumulate, repeat
+from operator import add, mul
 from typing import List, Optional
 
 from BaseClasses import MultiWorld
@@ -75,114 +79,166 @@ def extract_progression(state, player, frags_per_dice, frags_per_roll, allowed_c
     )
 
 
-# We will store the results of this function as it is called often for the same parameters.
+# function to add two discrete distribution.
+# defaultdict is a dict where you don't need to check if an id is present, you can just use += (lot faster)
+def add_distributions(dist1, dist2):
+    combined_dist = defaultdict(float)
+    for val1, prob1 in dist1.items():
+        for val2, prob2 in dist2.items():
+            combined_dist[val1 + val2] += prob1 * prob2
+    return dict(combined_dist)
+
+
+@lru_cache(maxsize=16384)
+def category_distribution(name, num_dice, num_rolls, mults):
+    """
+    Returns the distribution of the maximum of the category's score with each of the multipliers.
+    This only depends on the category, so it is calculated once for all states and players.
+    """
+    if num_dice <= 0 or num_rolls <= 0:
+        dist = {0: 100000}
+    else:
+        dist = yacht_weights[name, num_dice, num_rolls].copy()
+
+    for key in dist.keys():
+        dist[key] /= 100000
+
+    # function to take the maximum of "times" i.i.d. dist1.
+    # (I have tried using defaultdict here too but this made it slower.)
+    new_dist = {0: 1}
+    for mult in mults:
+        temp_dist = {}
+        for val1, prob1 in new_dist.items():
+            for val2, prob2 in dist.items():
+                new_val = int(max(val1, val2 * mult))
+                new_prob = prob1 * prob2
+
+                # Update the probability for the new value
+                if new_val in temp_dist:
+                    temp_dist[new_val] += new_prob
+                else:
+                    temp_dist[new_val] = new_prob
+        new_dist = temp_dist
+
+    return new_dist
+
+
+# Returns percentile value of a distribution.
+def percentile_distribution(dist, percentile):
+    sorted_values = sorted(dist.keys())
+    cumulative_prob = 0
+
+    for val in sorted_values:
+        cumulative_prob += dist[val]
+        if cumulative_prob >= percentile:
+            return val
+
+    # Return the last value if percentile is higher than all probabilities
+    return sorted_values[-1]
+
+
+# The fast way to calculate the total distribution keeps it as a list of probabilities indexed by score,
+# and adds each value of a category to all of it at once.
+# This adds up probabilities in another order than add_distributions does, which may change them by rounding.
+# That is far below this tolerance, so percentiles that are further away from any step in the cumulative
+# distribution come out the same either way.
+rounding_tolerance = 1e-9
+
+
+def add_distribution_to_list(probs, dist):
+    combined = [0.0] * (len(probs) + max(dist))
+    for val, prob in dist.items():
+        end = val + len(probs)
+        combined[val:end] = map(add, combined[val:end], map(mul, repeat(prob), probs))
+    return combined
+
+
+def percentile_list(cumulative_probs, percentile):
+    """
+    Returns percentile value of a distribution kept as a list of cumulative probabilities,
+    or None if rounding could make a difference in which value it is.
+    """
+    val = bisect_left(cumulative_probs, percentile)
+    if (
+        val == len(cumulative_probs)
+        or cumulative_probs[val] < percentile + rounding_tolerance
+        or (val and cumulative_probs[val - 1] > percentile - rounding_tolerance)
+    ):
+        return None
+    return val
 
 
-yachtdice_cache = {}
+def exact_distribution_percentiles(dists, percentiles):
+    """
+    Returns percentile values of the total score of categories with the given distributions,
+    calculated in the exact same way the logic always did.
+    """
+    total_dist = {0: 1}
+    for dist in dists:
+        total_dist = add_distributions(total_dist, dist)
+    return [percentile_distribution(total_dist, perc) for perc in percentiles]
+
+
+def distribution_percentiles(dists, percentiles):
+    """
+    Returns percentile values of the total score of categories with the given distributions,
+    falling back to exact_distribution_percentiles when rounding could make a difference.
+    """
+    total_probs = [1.0]
+    for dist in dists:
+        total_probs = add_distribution_to_list(total_probs, dist)
+    cumulative_probs = list(accumulate(total_probs))
+    values = [percentile_list(cumulative_probs, perc) for perc in percentiles]
+    if None in values:
+        return exact_distribution_percentiles(dists, percentiles)
+    return values
 
 
 def dice_simulation_strings(categories, num_dice, num_rolls, fixed_mult, step_mult, diff, player):
     """
     Function that returns the feasible score in logic based on items obtained.
     """
-    tup = (
-        tuple([c.name + str(c.quantity) for c in categories]),
+    return dice_simulation_score(
+        tuple((category.name, category.quantity) for category in categories),
         num_dice,
         num_rolls,
         fixed_mult,
         step_mult,
         diff,
-    )  # identifier
+    )
 
-    if player not in yachtdice_cache:
-        yachtdice_cache[player] = {}
 
-    if tup in yachtdice_cache[player]:
-        return yachtdice_cache[player][tup]
+# We will store the results of this function as it is called often for the same parameters.
+# The results don't depend on the player, so all players share them. The cache is bounded,
+# as it lives as long as the process, which may generate many multiworlds.
+@lru_cache(maxsize=65536)
+def dice_simulation_score(category_counts, num_dice, num_rolls, fixed_mult, step_mult, diff):
+    categories = [Category(name, quantity) for name, quantity in category_counts]
 
     # sort categories because for the step multiplier, you will want low-scoring categories first
     categories.sort(key=lambda category: category.mean_score(num_dice, num_rolls))
 
-    # function to add two discrete distribution.
-    # defaultdict is a dict where you don't need to check if an id is present, you can just use += (lot faster)
-    def add_distributions(dist1, dist2):
-        combined_dist = defaultdict(float)
-        for val1, prob1 in dist1.items():
-            for val2, prob2 in dist2.items():
-                combined_dist[val1 + val2] += prob1 * prob2
-        return dict(combined_dist)
-
-    # function to take the maximum of "times" i.i.d. dist1.
-    # (I have tried using defaultdict here too but this made it slower.)
-    def max_dist(dist1, mults):
-        new_dist = {0: 1}
-        for mult in mults:
-            temp_dist = {}
-            for val1, prob1 in new_dist.items():
-                for val2, prob2 in dist1.items():
-                    new_val = int(max(val1, val2 * mult))
-                    new_prob = prob1 * prob2
-
-                    # Update the probability for the new value
-                    if new_val in temp_dist:
-                        temp_dist[new_val] += new_prob
-                    else:
-                        temp_dist[new_val] = new_prob
-            new_dist = temp_dist
-
-        return new_dist
-
-    # Returns percentile value of a distribution.
-    def percentile_distribution(dist, percentile):
-        sorted_values = sorted(dist.keys())
-        cumulative_prob = 0
-
-        for val in sorted_values:
-            cumulative_prob += dist[val]
-            if cumulative_prob >= percentile:
-                return val
-
-        # Return the last value if percentile is higher than all probabilities
-        return sorted_values[-1]
-
     # parameters for logic.
     # perc_return is, per difficulty, the percentages of total score it returns (it averages out the values)
     # diff_divide determines how many shots the logic gets per category. Lower = more shots.
     perc_return = [[0], [0.1, 0.5], [0.3, 0.7], [0.55, 0.85], [0.85, 0.95]][diff]
     diff_divide = [0, 9, 7, 3, 2][diff]
 
-    # calculate total distribution
-    total_dist = {0: 1}
+    # get the distribution of each category
+    dists = []
     for j, category in enumerate(categories):
-        if num_dice <= 0 or num_rolls <= 0:
-            dist = {0: 100000}
-        else:
-            dist = yacht_weights[category.name, min(8, num_dice), min(8, num_rolls)].copy()
-
-        for key in dist.keys():
-            dist[key] /= 100000
-
         cat_mult = 2 ** (category.quantity - 1)
 
         # for higher difficulties, the simulation gets multiple tries for categories.
         max_tries = j // diff_divide
-        mults = [(1 + fixed_mult + step_mult * ii) * cat_mult for ii in range(max(0, j - max_tries), j + 1)]
-        dist = max_dist(dist, mults)
-
-        total_dist = add_distributions(total_dist, dist)
+        mults = tuple((1 + fixed_mult + step_mult * ii) * cat_mult for ii in range(max(0, j - max_tries), j + 1))
+        dists.append(category_distribution(category.name, min(8, num_dice), min(8, num_rolls), mults))
 
-    # save result into the cache, then return it
-    outcome = sum([percentile_distribution(total_dist, perc) for perc in perc_return]) / len(perc_return)
-    yachtdice_cache[player][tup] = max(5, math.floor(outcome))  # at least 5.
-
-    # cache management; we rarely/never need more than 400 entries. But if for some reason it became large,
-    # delete the first entry of the player cache.
-    if len(yachtdice_cache[player]) > 400:
-        # Remove the oldest item
-        oldest_tup = next(iter(yachtdice_cache[player]))
-        del yachtdice_cache[player][oldest_tup]
+    # calculate total distribution
+    percentiles = distribution_percentiles(dists, perc_return)
 
-    return yachtdice_cache[player][tup]
+    outcome = sum(percentiles) / len(perc_return)
+    return max(5, math.floor(outcome))  # at least 5.
 
 
 def dice_simulation_fill_pool(state, frags_per_dice, frags_per_roll, allowed_categories, difficulty, player):
@@ -0,0 +1,30 @@
+import unittest
+
+from ..Rules import (category_distribution, distribution_percentiles, exact_distribution_percentiles,
+                     percentile_list)
+from ..YachtWeights import yacht_weights
+
+
+class TestDistributionPercentiles(unittest.TestCase):
+    percentiles = (0.1, 0.3, 0.5, 0.55, 0.7, 0.85, 0.95)
+
+    def test_same_as_exact(self) -> None:
+        """Tests that the list based calculation gives the same percentiles as adding up distributions"""
+        names = sorted({name for name, _, _ in yacht_weights})
+        for num_dice in range(1, 9, 2):
+            for num_rolls in range(1, 9, 3):
+                for count in (1, 4, len(names)):
+                    for fixed_mult in (0.0, 0.3):
+                        dists = [category_distribution(name, num_dice, num_rolls,
+                                                       tuple(1 + fixed_mult + 0.01 * ii for ii in range(j // 3 + 1)))
+                                 for j, name in enumerate(names[:count])]
+                        with self.subTest(num_dice=num_dice, num_rolls=num_rolls, count=count, mult=fixed_mult):
+                            self.assertEqual(distribution_percentiles(dists, self.percentiles),
+                                             exact_distribution_percentiles(dists, self.percentiles))
+
+    def test_fallback(self) -> None:
+        """Tests that a percentile right at a step of the cumulative distribution is calculated the exact way"""
+        dists = [{0: 0.5, 1: 0.5}, {0: 0.5, 2: 0.5}]
+        self.assertIsNone(percentile_list([0.25, 0.5, 0.75, 1.0], 0.5))
+        self.assertEqual(distribution_percentiles(dists, [0.5]), exact_distribution_percentiles(dists, [0.5]))
+        self.assertEqual(distribution_percentiles(dists, [0.5]), [1])
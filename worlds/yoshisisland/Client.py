@@ -71,12 +71,13 @@ class YoshisIslandSNIClient(SNIClient):
         return True
 
     async def game_watcher(self, ctx: "SNIContext") -> None:
-        from SNIClient import snes_buffered_write, snes_flush_writes, snes_read
+        from SNIClient import snes_buffered_write, snes_flush_writes, snes_read, snes_read_many
 
-        game_mode = await snes_read(ctx, GAME_MODE, 0x1)
-        item_received = await snes_read(ctx, ITEM_RECEIVED, 0x1)
-        game_music = await snes_read(ctx, DEATHMUSIC_FLAG, 0x1)
-        goal_flag = await snes_read(ctx, GOALFLAG, 0x1)
+        flags = await snes_read_many(ctx, [(GAME_MODE, 0x1), (ITEM_RECEIVED, 0x1), (DEATHMUSIC_FLAG, 0x1),
+                                           (GOALFLAG, 0x1)])
+        if flags is None:
+            return
+        game_mode, item_received, game_music, goal_flag = flags
 
         if "DeathLink" in ctx.tags and ctx.last_death_link + 1 < time.time():
             death_flag = await snes_read(ctx, DEATHFLAG, 0x1)